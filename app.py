@@ -1,10 +1,55 @@
-from flask import Flask
-import sys
+from flask import Flask, request, jsonify
+import sys, io
+import pandas as pd
 from housing.logger import logging
 from housing.exception import HousingException
+from housing.config.configuration import Configuration
+from housing.entity.housing_predictor import HousingData, HousingPredictor, get_housing_predictor
+from housing.util.micro_batcher import MicroBatcher
+from housing.util.model_registry import ModelRegistry
+from housing.util.model_reloader import ModelReloader
 
 app = Flask(__name__)
 
+# current model version is loaded once per worker process at startup, newly published
+# versions are loaded, warmed up and swapped in by a background thread
+model_serving_config = Configuration().get_model_serving_config()
+housing_data = HousingData(schema_file_path=model_serving_config.schema_file_path)
+model_registry = ModelRegistry(export_dir_path=model_serving_config.export_dir_path)
+
+
+def load_housing_predictor(model_dir:str) -> HousingPredictor:
+    return get_housing_predictor(model_dir=model_dir,
+                                 model_file_name=model_serving_config.model_file_name,
+                                 preprocessed_object_file_name=model_serving_config.preprocessed_object_file_name,
+                                 preprocessing_kernel_file_name=model_serving_config.preprocessing_kernel_file_name)
+
+
+def warm_up_housing_predictor(housing_predictor:HousingPredictor) -> None:
+    housing_predictor.predict(housing_data.get_warm_up_data_frame())
+
+
+model_reloader = ModelReloader(get_current_model_dir=model_registry.get_current_model_dir,
+                               load_predictor=load_housing_predictor,
+                               warm_up_predictor=warm_up_housing_predictor,
+                               poll_interval_seconds=model_serving_config.model_poll_interval_seconds)
+if model_reloader.predictor is None:
+    logging.info(f"No model found in: [{model_serving_config.export_dir_path}], /predict is unavailable until one is published")
+
+micro_batcher = MicroBatcher(predict_function=model_reloader.predict,
+                             max_batch_size=model_serving_config.max_batch_size,
+                             max_batch_wait_ms=model_serving_config.max_batch_wait_ms)
+
+
+def get_error_message(e:Exception) -> str:
+    """
+    Message of the error HousingException was raised for, its own text holds server paths and line numbers
+    """
+    while isinstance(e, HousingException) and e.__cause__ is not None:
+        e = e.__cause__
+    return str(e)
+
+
 @app.route("/",methods=['GET','POST'])
 def index():
     try:
@@ -13,8 +58,40 @@ def index():
         he = HousingException(e,sys)
         logging.info(he.error_message)
         logging.info("We are testing logging module")
-    
+
     return "Starting Machine Learning Project"
 
+
+@app.route("/predict",methods=['POST'])
+def predict():
+    """
+    Accepts one row or a batch of rows as json (object, list of objects or {"instances": [...]})
+    or as csv with header, returns {"predictions": [...]} in input order.
+    """
+    if model_reloader.predictor is None:
+        return jsonify({"error": "No trained model is available"}), 503
+
+    try:
+        if request.mimetype == "text/csv":
+            input_data_frame = pd.read_csv(io.StringIO(request.get_data(as_text=True)))
+            input_data_frame = housing_data.get_housing_input_data_frame(dataframe=input_data_frame)
+        else:
+            records = request.get_json(force=True)
+            if isinstance(records, dict) and "instances" in records:
+                records = records["instances"]
+            input_data_frame = housing_data.get_data_frame_from_records(records=records)
+    except Exception as e:
+        logging.info(f"Invalid prediction request: [{e}]")
+        return jsonify({"error": get_error_message(e)}), 400
+
+    try:
+        predictions = micro_batcher.submit(input_data_frame).result()
+        return jsonify({"predictions": predictions.tolist()})
+    except Exception as e:
+        he = HousingException(e,sys)
+        logging.info(he.error_message)
+        return jsonify({"error": get_error_message(e)}), 500
+
+
 if __name__ == "__main__":
-    app.run(debug = True) 
\ No newline at end of file
+    app.run(debug = True)
\ No newline at end of file
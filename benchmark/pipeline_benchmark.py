@@ -0,0 +1,207 @@
+"""
+Offline benchmark of ingestion, validation, transformation and inference on synthetic housing data
+of growing size. Every size runs in a fresh interpreter with its own working dir holding a copy of
+config/, the dataset is served from a local file:// url and stages are measured by the run profiler,
+so throughput and peak RSS of one size do not leak into the next one.
+
+Results are compared with a stored baseline, the benchmark exits with status 1 when throughput drops
+or peak memory grows by more than --tolerance.
+
+usage: python benchmark/pipeline_benchmark.py --rows 20000 200000 2000000 [--save-baseline]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import yaml
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from synthetic_housing import DATASET_FILE_NAME, TGZ_FILE_NAME, write_synthetic_housing_data, write_tgz_file
+
+DEFAULT_ROWS = [20000, 200000, 2000000]
+DEFAULT_WORK_DIR = os.path.join(ROOT_DIR, "benchmark_runs")
+DEFAULT_BASELINE_FILE_PATH = os.path.join(BENCHMARK_DIR, "results", "baseline.json")
+BENCHMARK_STAGES = ["data_ingestion", "data_validation", "data_transformation", "inference"]
+# rows beyond which ingestion and transformation work in chunks and drift is computed on a sample
+CHUNKED_ROW_COUNT = 1000000
+INFERENCE_TRAINING_ROW_COUNT = 100000
+
+
+def get_dataset_tgz_file_path(work_dir:str, row_count:int, random_state:int) -> str:
+    """
+    Generate dataset of row_count rows once, later runs reuse it
+    """
+    data_dir = os.path.join(work_dir, "data", f"{row_count}_{random_state}")
+    tgz_file_path = os.path.join(data_dir, TGZ_FILE_NAME)
+    if not os.path.exists(tgz_file_path):
+        print(f"Generating {row_count} synthetic rows into: [{data_dir}]", file=sys.stderr)
+        file_path = write_synthetic_housing_data(file_path=os.path.join(data_dir, DATASET_FILE_NAME),
+                                                 row_count=row_count, random_state=random_state)
+        write_tgz_file(file_path=file_path, tgz_file_path=tgz_file_path)
+        os.remove(file_path)
+    return tgz_file_path
+
+
+def prepare_run_dir(work_dir:str, row_count:int, tgz_file_path:str, drift_backend:str) -> str:
+    """
+    Working dir of one size with config/ adapted to read the local dataset and profile stages
+    """
+    run_dir = os.path.join(work_dir, "runs", str(row_count))
+    if os.path.exists(run_dir):
+        shutil.rmtree(run_dir)
+    shutil.copytree(os.path.join(ROOT_DIR, "config"), os.path.join(run_dir, "config"))
+
+    config_file_path = os.path.join(run_dir, "config", "config.yaml")
+    with open(config_file_path, "r") as config_file:
+        config = yaml.safe_load(config_file)
+    chunk_size = CHUNKED_ROW_COUNT if row_count > CHUNKED_ROW_COUNT else None
+    config["training_pipeline_config"].update({"use_stage_cache": False, "run_profile": True})
+    config["data_ingestion_config"].update({"dataset_download_url": f"file://{tgz_file_path}",
+                                            "split_chunk_size": chunk_size,
+                                            "incremental_partition_dir": None})
+    config["data_validation_config"].update({"drift_backend": drift_backend,
+                                             "drift_sample_size": CHUNKED_ROW_COUNT if chunk_size else None})
+    config["data_transformation_config"].update({"transform_chunk_size": chunk_size, "incremental": False})
+    with open(config_file_path, "w") as config_file:
+        yaml.safe_dump(config, config_file, sort_keys=False)
+    return run_dir
+
+
+def run_stages(row_count:int) -> None:
+    """
+    Run benchmark stages in current working dir under the run profiler, print profile.json path
+    """
+    import numpy as np
+    import pandas as pd
+    from sklearn.linear_model import LinearRegression
+    from housing.pipeline.pipeline import Pipeline
+    from housing.util.preprocessing_kernel import PreprocessingKernel
+    from housing.util.run_profiler import profile_stage
+    from housing.util.dataset_schema import get_dataset_schema
+    from housing.util.util import load_numpy_array_data
+
+    pipeline = Pipeline()
+    with pipeline.run_profiler:
+        with profile_stage("data_ingestion") as step:
+            data_ingestion_artifact = pipeline.start_data_ingestion()
+            step.add(rows=row_count)
+        with profile_stage("data_validation") as step:
+            data_validation_artifact = pipeline.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
+            pipeline.start_data_drift(data_ingestion_artifact=data_ingestion_artifact)
+            step.add(rows=row_count)
+        with profile_stage("data_transformation") as step:
+            data_transformation_artifact = pipeline.start_data_transformation(data_ingstion_artifact=data_ingestion_artifact,
+                                                                              data_validation_artifact=data_validation_artifact)
+            step.add(rows=row_count)
+
+        # model quality is not measured, a linear model fit on a prefix gives realistic predict cost
+        train_array = load_numpy_array_data(file_path=data_transformation_artifact.transformed_train_file_path, mmap_mode="r")
+        training_rows = np.asarray(train_array[:INFERENCE_TRAINING_ROW_COUNT])
+        model = LinearRegression().fit(training_rows[:, :-1], training_rows[:, -1])
+        preprocessing_kernel = PreprocessingKernel.load(file_path=data_transformation_artifact.preprocessing_kernel_file_path)
+        dataset_schema = get_dataset_schema(schema_file_path=data_validation_artifact.schema_file_path)
+        read_options = dataset_schema.get_read_options(columns=dataset_schema.input_columns)
+
+        with profile_stage("inference") as step:
+            for chunk in pd.read_csv(data_ingestion_artifact.test_file_path, chunksize=CHUNKED_ROW_COUNT, **read_options):
+                model.predict(preprocessing_kernel.transform(chunk))
+                step.add(rows=len(chunk))
+    print(pipeline.run_profiler.profile_file_path)
+
+
+def measure(row_count:int, work_dir:str, drift_backend:str, random_state:int) -> dict:
+    tgz_file_path = get_dataset_tgz_file_path(work_dir=work_dir, row_count=row_count, random_state=random_state)
+    run_dir = prepare_run_dir(work_dir=work_dir, row_count=row_count, tgz_file_path=tgz_file_path,
+                              drift_backend=drift_backend)
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIR, os.environ.get("PYTHONPATH")])))
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-stages", str(row_count)],
+                            check=True, capture_output=True, text=True, cwd=run_dir, env=environment).stdout
+    with open(output.strip().splitlines()[-1], "r") as profile_file:
+        profile = json.load(profile_file)
+
+    result = {}
+    for stage in profile["stages"]:
+        if stage["name"] not in BENCHMARK_STAGES:
+            continue
+        rows = stage.get("rows", row_count)
+        result[stage["name"]] = {"rows": rows,
+                                 "wall_seconds": stage["wall_seconds"],
+                                 "rows_per_second": round(rows / stage["wall_seconds"], 1) if stage["wall_seconds"] > 0 else None,
+                                 "peak_rss_mb": stage["peak_rss_mb"]}
+    return result
+
+
+def compare_with_baseline(results:dict, baseline:dict, tolerance:float, min_seconds:float) -> list:
+    """
+    Stages of every size slower or using more memory than baseline by more than tolerance, throughput
+    of stages shorter than min_seconds in baseline is too noisy to compare
+    """
+    regressions = []
+    for row_count, stages in results.items():
+        for stage_name, result in stages.items():
+            baseline_result = baseline.get(row_count, {}).get(stage_name)
+            if baseline_result is None:
+                continue
+            result["baseline_rows_per_second"] = baseline_result["rows_per_second"]
+            result["baseline_peak_rss_mb"] = baseline_result["peak_rss_mb"]
+            if baseline_result["wall_seconds"] >= min_seconds and \
+                    result["rows_per_second"] < baseline_result["rows_per_second"] * (1 - tolerance):
+                regressions.append(f"{row_count} rows {stage_name}: {result['rows_per_second']} rows/s, "
+                                   f"baseline {baseline_result['rows_per_second']} rows/s")
+            # peak rss is None on platforms where it cannot be measured
+            if None not in (result["peak_rss_mb"], baseline_result["peak_rss_mb"]) and \
+                    result["peak_rss_mb"] > baseline_result["peak_rss_mb"] * (1 + tolerance):
+                regressions.append(f"{row_count} rows {stage_name}: {result['peak_rss_mb']} MB peak rss, "
+                                   f"baseline {baseline_result['peak_rss_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic housing data")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR)
+    parser.add_argument("--drift-backend", default="native")
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_FILE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-seconds", type=float, default=1.0,
+                        help="throughput of stages faster than this in baseline is not compared")
+    parser.add_argument("--run-stages", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stages is not None:
+        return run_stages(row_count=args.run_stages)
+
+    work_dir = os.path.abspath(args.work_dir)
+    results = {}
+    for row_count in args.rows:
+        print(f"Benchmarking {row_count} rows", file=sys.stderr)
+        results[str(row_count)] = measure(row_count=row_count, work_dir=work_dir,
+                                          drift_backend=args.drift_backend, random_state=args.random_state)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r") as baseline_file:
+            regressions = compare_with_baseline(results=results, baseline=json.load(baseline_file), tolerance=args.tolerance,
+                                                min_seconds=args.min_seconds)
+
+    print(json.dumps(results, indent=2))
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print(f"Baseline saved: [{args.baseline}]", file=sys.stderr)
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cold load time and memory of the preprocessing object of one model version, dill pickled
+ColumnTransformer against the array bundle PreprocessingKernel. Every load runs in a fresh
+interpreter, so the time includes the imports each format pulls in, as in a starting worker.
+
+usage: python benchmark/preprocessing_load.py [model_dir] [--repeat 5]
+model_dir defaults to the model version currently published in saved_models.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE_CODE = """
+import json, resource, sys, time
+def get_rss_kb():
+    with open("/proc/self/status") as status_file:
+        for line in status_file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+rss_before = get_rss_kb()
+start = time.perf_counter()
+{load_code}
+obj.transform
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "rss_mb": get_rss_kb() / 1024, "rss_delta_mb": (get_rss_kb() - rss_before) / 1024}}))
+"""
+
+LOAD_CODE = {
+    "dill_column_transformer": "import dill\nwith open(sys.argv[1], 'rb') as file_obj:\n    obj = dill.load(file_obj)",
+    "array_bundle_kernel": "from housing.util.preprocessing_kernel import PreprocessingKernel\nobj = PreprocessingKernel.load(sys.argv[1])",
+}
+
+
+def get_default_model_dir() -> str:
+    sys.path.insert(0, ROOT_DIR)
+    from housing.config.configuration import Configuration
+    from housing.util.model_registry import ModelRegistry
+    model_serving_config = Configuration().get_model_serving_config()
+    return ModelRegistry(export_dir_path=model_serving_config.export_dir_path).get_current_model_dir()
+
+
+def measure(load_name:str, file_path:str, repeat:int) -> dict:
+    code = MEASURE_CODE.format(load_code=LOAD_CODE[load_name])
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIR, os.environ.get("PYTHONPATH")])))
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code, file_path], check=True, capture_output=True,
+                                text=True, cwd=ROOT_DIR, env=environment).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {"file_path": file_path,
+            "file_size_kb": round(os.path.getsize(file_path) / 1024, 1),
+            "median_seconds": round(statistics.median(run["seconds"] for run in runs), 4),
+            "median_rss_mb": round(statistics.median(run["rss_mb"] for run in runs), 1),
+            "median_rss_delta_mb": round(statistics.median(run["rss_delta_mb"] for run in runs), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold load of preprocessing object formats")
+    parser.add_argument("model_dir", nargs="?", default=None)
+    parser.add_argument("--preprocessed-object-file-name", default="preprocessed.pkl")
+    parser.add_argument("--preprocessing-kernel-file-name", default="preprocessing_kernel.bundle")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    model_dir = os.path.abspath(args.model_dir) if args.model_dir else get_default_model_dir()
+    if model_dir is None:
+        raise SystemExit("No published model version found, pass a model dir")
+
+    results = {"dill_column_transformer": measure("dill_column_transformer",
+                                                  os.path.join(model_dir, args.preprocessed_object_file_name), args.repeat),
+               "array_bundle_kernel": measure("array_bundle_kernel",
+                                              os.path.join(model_dir, args.preprocessing_kernel_file_name), args.repeat)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
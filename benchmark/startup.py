@@ -0,0 +1,81 @@
+"""
+Import time and memory of the housing package entry points, each imported in a fresh interpreter.
+Every entry point has a budget of heavy dependencies it must not load at import, the benchmark exits
+with status 1 when one of them is loaded or an import is slower than --max-seconds.
+
+usage: python benchmark/startup.py [--repeat 5] [--max-seconds 1.0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "sklearn", "scipy", "evidently", "dill", "flask"]
+
+# entry point -> heavy modules allowed to be loaded by importing it
+STARTUP_BUDGET = {
+    "housing": [],
+    "housing.config.configuration": [],
+    "housing.pipeline.pipeline": [],
+    "demo": [],
+    # serving worker loads the published model at import, which needs its pickled dependencies
+    "app": ["pandas", "sklearn", "scipy", "dill", "flask"],
+}
+
+MEASURE_CODE = """
+import importlib, json, resource, sys, time
+def get_rss_kb():
+    with open("/proc/self/status") as status_file:
+        for line in status_file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+heavy_modules = [module_name for module_name in json.loads(sys.argv[2]) if module_name in sys.modules]
+print(json.dumps({"seconds": seconds, "rss_mb": get_rss_kb() / 1024, "heavy_modules": heavy_modules}))
+"""
+
+
+def measure(module_name:str, repeat:int) -> dict:
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIR, os.environ.get("PYTHONPATH")])))
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", MEASURE_CODE, module_name, json.dumps(HEAVY_MODULES)],
+                                check=True, capture_output=True, text=True, cwd=ROOT_DIR, env=environment).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {"median_seconds": round(statistics.median(run["seconds"] for run in runs), 4),
+            "median_rss_mb": round(statistics.median(run["rss_mb"] for run in runs), 1),
+            "heavy_modules": runs[-1]["heavy_modules"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and memory of housing entry points")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    parser.add_argument("--module", action="append", default=None, help="entry point to measure, all by default")
+    args = parser.parse_args()
+
+    results = {}
+    is_within_budget = True
+    for module_name in args.module or STARTUP_BUDGET.keys():
+        result = measure(module_name=module_name, repeat=args.repeat)
+        allowed_modules = STARTUP_BUDGET.get(module_name, HEAVY_MODULES)
+        result["over_budget_modules"] = [heavy_module for heavy_module in result["heavy_modules"]
+                                         if heavy_module not in allowed_modules]
+        result["is_within_budget"] = len(result["over_budget_modules"]) == 0 and \
+            (args.max_seconds is None or result["median_seconds"] <= args.max_seconds)
+        is_within_budget = is_within_budget and result["is_within_budget"]
+        results[module_name] = result
+
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if is_within_budget else 1)
+
+
+if __name__ == "__main__":
+    main()
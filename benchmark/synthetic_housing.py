@@ -0,0 +1,145 @@
+"""
+Synthetic housing dataset conforming to config/schema.yaml, written chunk by chunk so any row count
+fits in memory. Columns, categories and value ranges come from the schema. Known housing columns get
+distributions resembling the California housing data, other numerical columns are drawn uniformly in
+their schema value range and other categorical columns uniformly from their domain values.
+
+usage: python benchmark/synthetic_housing.py ROWS OUTPUT_DIR [--tgz] [--random-state 42]
+"""
+import argparse
+import os
+import sys
+import tarfile
+
+import numpy as np
+import pandas as pd
+import yaml
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_FILE_PATH = os.path.join(ROOT_DIR, "config", "schema.yaml")
+DATASET_FILE_NAME = "housing.csv"
+TGZ_FILE_NAME = "housing.tgz"
+
+# share of each ocean proximity category in the original dataset
+CATEGORY_WEIGHTS = {"ocean_proximity": {"<1H OCEAN": 0.443, "INLAND": 0.317, "ISLAND": 0.001,
+                                        "NEAR BAY": 0.111, "NEAR OCEAN": 0.128}}
+# value added to median house value by ocean proximity
+PROXIMITY_VALUE = {"<1H OCEAN": 60000.0, "INLAND": -20000.0, "ISLAND": 180000.0,
+                   "NEAR BAY": 80000.0, "NEAR OCEAN": 70000.0}
+MISSING_RATIO = {"total_bedrooms": 0.01}
+
+
+def get_value_range(dataset_schema:dict, column:str, default_min:float = 0.0, default_max:float = 1.0) -> tuple:
+    value_range = dataset_schema.get("value_range", {}).get(column, {})
+    return value_range.get("min", default_min), value_range.get("max", default_max)
+
+
+def generate_housing_chunk(dataset_schema:dict, row_count:int, random_generator:np.random.Generator) -> pd.DataFrame:
+    """
+    Rows of every schema column, in schema column order
+    """
+    columns = {}
+    for column, categories in dataset_schema.get("domain_value", {}).items():
+        weights = CATEGORY_WEIGHTS.get(column, {})
+        probabilities = np.array([weights.get(category, 1.0) for category in categories])
+        columns[column] = random_generator.choice(categories, size=row_count, p=probabilities / probabilities.sum())
+
+    # rooms drive bedrooms, population and households like in the original districts
+    total_rooms = np.round(random_generator.lognormal(mean=7.6, sigma=0.75, size=row_count)).clip(2, 40000)
+    population = np.round(total_rooms * random_generator.lognormal(mean=-0.75, sigma=0.35, size=row_count)).clip(3, 36000)
+    median_income = random_generator.lognormal(mean=1.25, sigma=0.45, size=row_count).clip(0.5, 15.0001).round(4)
+    known_columns = {
+        "longitude": random_generator.uniform(-124.35, -114.31, row_count).round(2),
+        "latitude": random_generator.uniform(32.54, 41.95, row_count).round(2),
+        "housing_median_age": random_generator.integers(1, 53, row_count).astype(np.float64),
+        "total_rooms": total_rooms,
+        "total_bedrooms": np.round(total_rooms * random_generator.normal(0.21, 0.04, row_count).clip(0.05, 0.6)).clip(1, None),
+        "population": population,
+        "households": np.round(population / random_generator.normal(2.9, 0.5, row_count).clip(1.0, 8.0)).clip(1, None),
+        "median_income": median_income,
+    }
+    if "median_house_value" in dataset_schema["columns"]:
+        proximity = columns.get("ocean_proximity")
+        proximity_value = 0.0 if proximity is None else pd.Series(proximity).map(PROXIMITY_VALUE).fillna(0.0).to_numpy()
+        known_columns["median_house_value"] = (45000.0 + 40000.0 * median_income + proximity_value
+                                               + random_generator.normal(0, 40000, row_count)).clip(14999, 500001).round(0)
+
+    dataframe = {}
+    for column, column_type in dataset_schema["columns"].items():
+        if column in columns:
+            dataframe[column] = columns[column]
+        elif column in known_columns:
+            dataframe[column] = known_columns[column]
+        elif column_type in ("category", "str"):
+            dataframe[column] = random_generator.choice([f"{column}_{number}" for number in range(5)], size=row_count)
+        else:
+            minimum, maximum = get_value_range(dataset_schema=dataset_schema, column=column)
+            dataframe[column] = random_generator.uniform(minimum, maximum, row_count)
+            if column_type == "int":
+                dataframe[column] = np.round(dataframe[column]).astype(np.int64)
+
+        missing_ratio = MISSING_RATIO.get(column, 0.0)
+        if missing_ratio > 0:
+            values = dataframe[column].astype(np.float64)
+            values[random_generator.random(row_count) < missing_ratio] = np.nan
+            dataframe[column] = values
+
+        minimum, maximum = get_value_range(dataset_schema=dataset_schema, column=column, default_min=None, default_max=None)
+        if column_type in ("float", "int") and (minimum is not None or maximum is not None):
+            dataframe[column] = np.clip(dataframe[column], minimum, maximum)
+    return pd.DataFrame(dataframe)
+
+
+def write_synthetic_housing_data(file_path:str, row_count:int, schema_file_path:str = SCHEMA_FILE_PATH,
+                                 chunk_size:int = 1000000, random_state:int = 42) -> str:
+    """
+    Write row_count synthetic rows into a csv file, chunk_size rows at a time
+    """
+    with open(schema_file_path, "r") as schema_file:
+        dataset_schema = yaml.safe_load(schema_file)
+    random_generator = np.random.default_rng(random_state)
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_file_path = f"{file_path}.tmp"
+    for start in range(0, row_count, chunk_size):
+        chunk = generate_housing_chunk(dataset_schema=dataset_schema,
+                                       row_count=min(chunk_size, row_count - start),
+                                       random_generator=random_generator)
+        chunk.to_csv(temp_file_path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    os.replace(temp_file_path, file_path)
+    return file_path
+
+
+def write_tgz_file(file_path:str, tgz_file_path:str) -> str:
+    """
+    Pack dataset into a tgz archive like the one data ingestion downloads
+    """
+    temp_file_path = f"{tgz_file_path}.tmp"
+    with tarfile.open(temp_file_path, "w:gz", compresslevel=1) as tgz_file:
+        tgz_file.add(file_path, arcname=os.path.basename(file_path))
+    os.replace(temp_file_path, tgz_file_path)
+    return tgz_file_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic housing data from schema.yaml")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("output_dir")
+    parser.add_argument("--schema-file-path", default=SCHEMA_FILE_PATH)
+    parser.add_argument("--chunk-size", type=int, default=1000000)
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--tgz", action="store_true", help="also pack the csv into housing.tgz")
+    args = parser.parse_args()
+
+    file_path = write_synthetic_housing_data(file_path=os.path.join(args.output_dir, DATASET_FILE_NAME),
+                                             row_count=args.rows,
+                                             schema_file_path=args.schema_file_path,
+                                             chunk_size=args.chunk_size,
+                                             random_state=args.random_state)
+    print(file_path)
+    if args.tgz:
+        print(write_tgz_file(file_path=file_path, tgz_file_path=os.path.join(args.output_dir, TGZ_FILE_NAME)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
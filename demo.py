@@ -3,11 +3,27 @@ from housing.exception import HousingException
 from housing.logger import logging
 import os,sys
 from housing.config.configuration import Configuration
-from housing.component.data_transformation import DataTransformation
+from housing.pipeline.run_state import get_latest_failed_time_stamp
+import argparse
 
 def main():
     try:
-        pipeline = Pipeline()
+        parser = argparse.ArgumentParser(description="Run housing training pipeline")
+        parser.add_argument("--resume", default=None, metavar="TIME_STAMP",
+                            help="resume failed run of this time stamp, 'latest' resumes the latest failed run")
+        args = parser.parse_args()
+
+        if args.resume is None:
+            pipeline = Pipeline()
+        else:
+            time_stamp = args.resume
+            if time_stamp == "latest":
+                artifact_dir = Configuration().training_pipeline_config.artifact_dir
+                time_stamp = get_latest_failed_time_stamp(artifact_dir=artifact_dir)
+                if time_stamp is None:
+                    raise Exception(f"No failed run to resume in: [{artifact_dir}]")
+            logging.info(f"Resuming run: [{time_stamp}]")
+            pipeline = Pipeline(config=Configuration(current_time_stamp=time_stamp), resume=True)
         pipeline.run_pipeline()
         # data_validation_config = Configuration().get_data_transformation_config()
         # print(data_validation_config)
@@ -4,7 +4,13 @@ from housing.entity.config_entity import DataIngestionConfig
 from housing.entity.artifact_entity import DataIngestionArtifact
 from housing.exception import HousingException
 from housing.logger import logging
+from housing.constant import *
+from housing.util.run_profiler import profile_step
+from housing.util.util import save_dataframe, DataFrameChunkWriter, read_dataframe, get_file_checksum
+from housing.util.download_cache import DownloadCache
+from contextlib import contextmanager
 import tarfile
+import json
 from six.moves import urllib
 import pandas as pd
 import numpy as np
@@ -20,104 +26,385 @@ class DataIngestion:
         except Exception as e:
             raise HousingException(e,sys) from e
 
-    def download_housing_data(self) -> str:
+    def get_dataset_source_signature(self) -> str:
+        """
+        Cheap signature of the dataset at download url, changes whenever the source data changes.
+        Local files use size and modification time, remote files use http headers.
+        return: str signature or None if source can not be inspected without downloading
+        """
         try:
-            # extract remote url to download dataset
-            download_url = self.data_ingestion_config.dataset_download_url
-
-            # folder location to download file
-            tgz_download_dir = self.data_ingestion_config.tgz_download_dir
+            if self.data_ingestion_config.incremental_partition_dir is not None:
+                partition_stats = [(os.path.basename(file_path), os.stat(file_path)) for file_path in self.get_partition_file_paths()]
+                return ";".join(f"{file_name}-{file_stat.st_size}-{file_stat.st_mtime_ns}" for file_name, file_stat in partition_stats)
 
-            if os.path.exists(tgz_download_dir):
-                os.remove(tgz_download_dir)
+            download_url = self.data_ingestion_config.dataset_download_url
+            parsed_url = urllib.parse.urlparse(download_url)
 
-            os.makedirs(tgz_download_dir, exist_ok= True)
+            if parsed_url.scheme in ("", "file"):
+                file_path = urllib.request.url2pathname(parsed_url.path)
+                file_stat = os.stat(file_path)
+                return f"{file_stat.st_size}-{file_stat.st_mtime_ns}"
 
-            housing_file_name = os.path.basename(download_url)
+            request = urllib.request.Request(download_url, method="HEAD")
+            with urllib.request.urlopen(request, timeout=10) as response:
+                headers = [response.headers.get(name) for name in ("ETag", "Last-Modified", "Content-Length")]
+            if not any(headers):
+                return None
+            return "-".join(str(header) for header in headers)
 
-            tgz_file_path = os.path.join(tgz_download_dir, housing_file_name)
+        except Exception as e:
+            logging.info(f"Unable to get signature of dataset source: [{e}]")
+            return None
 
-            logging.info(f"Downloading file from: [{download_url}] into: [{tgz_file_path}]")
-            urllib.request.urlretrieve(download_url,tgz_file_path)
-            logging.info(f"File : [{tgz_file_path}] has been downloaded successfully.")
-            return tgz_file_path
+    def download_housing_data(self) -> str:
+        """
+        Local copy of dataset at download url, served from download cache when the source did not change
+        return: str path of dataset file, tgz archive or csv
+        """
+        try:
+            download_cache = DownloadCache(cache_dir=self.data_ingestion_config.download_cache_dir)
+            return download_cache.get_file(url=self.data_ingestion_config.dataset_download_url,
+                                           checksum=self.data_ingestion_config.dataset_checksum)
+        except Exception as e:
+            raise HousingException(e,sys) from e
 
+    def get_housing_member(self, housing_tgz_file_obj:tarfile.TarFile) -> tarfile.TarInfo:
+        """
+        First csv file of archive, members are read in archive order so the rest of the archive is not scanned
+        """
+        try:
+            first_file_member = None
+            for member in housing_tgz_file_obj:
+                if not member.isfile():
+                    continue
+                if member.name.lower().endswith(FILE_FORMAT_EXTENSION[FILE_FORMAT_CSV]):
+                    return member
+                first_file_member = first_file_member or member
+            if first_file_member is None:
+                raise Exception(f"No dataset file found in archive: [{housing_tgz_file_obj.name}]")
+            return first_file_member
         except Exception as e:
             raise HousingException(e,sys) from e
 
-    def extract_tgz_file(self,tgz_file_path:str):
+    def get_housing_file_name(self, dataset_file_path:str) -> str:
+        """
+        Name of the csv file inside the archive, or of the dataset file itself when it is not an archive
+        """
         try:
-            raw_data_dir = self.data_ingestion_config.raw_data_dir
+            if not tarfile.is_tarfile(dataset_file_path):
+                return os.path.basename(dataset_file_path)
+            with tarfile.open(dataset_file_path, "r:*") as housing_tgz_file_obj:
+                return os.path.basename(self.get_housing_member(housing_tgz_file_obj).name)
+        except Exception as e:
+            raise HousingException(e,sys) from e
 
-            if os.path.exists(raw_data_dir):
-                os.remove(raw_data_dir)
-            os.makedirs(raw_data_dir, exist_ok=True)   
-            
-            logging.info(f"Extracting tgz file: [{tgz_file_path}] into dir: [{raw_data_dir}]")
-            with tarfile.open(tgz_file_path) as housing_tgz_file_obj:
-                housing_tgz_file_obj.extractall(path=raw_data_dir)
-            logging.info(f"Extraction Completed")
+    @contextmanager
+    def open_housing_file(self, dataset_file_path:str):
+        """
+        Binary file object of the csv, decompressed from the archive member while it is read
+        so no extracted copy is written to disk
+        """
+        if not tarfile.is_tarfile(dataset_file_path):
+            with open(dataset_file_path, "rb") as housing_file_obj:
+                yield housing_file_obj
+            return
 
+        logging.info(f"Streaming csv out of tgz file: [{dataset_file_path}]")
+        with tarfile.open(dataset_file_path, "r:*") as housing_tgz_file_obj:
+            member = self.get_housing_member(housing_tgz_file_obj)
+            with housing_tgz_file_obj.extractfile(member) as housing_file_obj:
+                yield housing_file_obj
+
+    def get_income_category(self, median_income:pd.Series) -> np.ndarray:
+        """
+        Map median income to stratum index used for stratified split.
+        Rows whose income falls outside the bins get an extra stratum of their own.
+        median_income: pd.Series median income column
+        return: np.ndarray int stratum index of every row
+        """
+        try:
+            income_category = pd.cut(median_income,
+                                     bins=INCOME_CATEGORY_BINS,
+                                     labels=False)
+            income_category = np.nan_to_num(np.asarray(income_category, dtype=float),
+                                             nan=len(INCOME_CATEGORY_LABELS))
+            return income_category.astype(np.int64)
         except Exception as e:
             raise HousingException(e,sys) from e
 
-    def split_data_as_train_test(self) -> DataIngestionArtifact:
+    def split_data_in_memory(self, dataset_file_path:str, train_file_path:str, test_file_path:str):
         try:
-            raw_data_dir = self.data_ingestion_config.raw_data_dir
-            file_name= os.listdir(raw_data_dir)[0]
+            logging.info(f"Reading csv file [ {dataset_file_path} ]")
+            with self.open_housing_file(dataset_file_path) as housing_file_obj:
+                housing_data_frame = pd.read_csv(housing_file_obj)
 
-            housing_file_path = os.path.join(raw_data_dir,file_name)
-
-            logging.info(f"Reading csv file [ {housing_file_path} ]")
-            housing_data_frame = pd.read_csv(housing_file_path)
-
-            housing_data_frame["income_cat"] = pd.cut(
-                                                        housing_data_frame["median_income"],
-                                                        bins = [0.0, 1.5, 3.0, 4.5, 6.0, np.inf],
-                                                        labels = [1,2,3,4,5]
+            housing_data_frame[COLUMN_INCOME_CATEGORY] = pd.cut(
+                                                        housing_data_frame[COLUMN_MEDIAN_INCOME],
+                                                        bins = INCOME_CATEGORY_BINS,
+                                                        labels = INCOME_CATEGORY_LABELS
                                                      )
             
             logging.info(f"Spliting data into train test")
             strat_train_set = None
             strat_test_set = None
 
-            split = StratifiedShuffleSplit(n_splits = 1, test_size = 0.2, random_state = 42) 
+            split = StratifiedShuffleSplit(n_splits = 1, test_size = DATA_INGESTION_TEST_SIZE, random_state = DATA_INGESTION_RANDOM_STATE) 
 
-            for train_index, test_index in split.split(housing_data_frame, housing_data_frame["income_cat"]):
-                strat_train_set = housing_data_frame.loc[train_index].drop("income_cat", axis=1)
-                strat_test_set = housing_data_frame.loc[test_index].drop("income_cat", axis=1 )
+            for train_index, test_index in split.split(housing_data_frame, housing_data_frame[COLUMN_INCOME_CATEGORY]):
+                strat_train_set = housing_data_frame.loc[train_index].drop(COLUMN_INCOME_CATEGORY, axis=1)
+                strat_test_set = housing_data_frame.loc[test_index].drop(COLUMN_INCOME_CATEGORY, axis=1 )
 
-            train_file_path = os.path.join(self.data_ingestion_config.ingested_train_dir, file_name)
-
-            test_file_path = os.path.join(self.data_ingestion_config.ingested_test_dir, file_name)
-            
             if strat_train_set is not None:
-                os.makedirs(self.data_ingestion_config.ingested_train_dir, exist_ok= True)
                 logging.info(f"Exporting training dataset to file: [ {train_file_path} ]")
-                strat_train_set.to_csv(train_file_path,index=False)
+                save_dataframe(file_path=train_file_path, dataframe=strat_train_set)
 
             if strat_test_set is not None:
-                os.makedirs(self.data_ingestion_config.ingested_test_dir, exist_ok= True)
                 logging.info(f"Exporting test dataset to file: [ {test_file_path} ]")
-                strat_test_set.to_csv(test_file_path,index=False)
+                save_dataframe(file_path=test_file_path, dataframe=strat_test_set)
+
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_test_row_mask(self,
+                          income_category:np.ndarray,
+                          stratum_test_remaining:np.ndarray,
+                          stratum_row_remaining:np.ndarray,
+                          random_generator:np.random.Generator) -> np.ndarray:
+        """
+        Draw test rows of one block of rows, per stratum the number of test rows follows hypergeometric
+        distribution of the test rows still left in the stratum. Remaining counts are updated in place.
+        income_category: np.ndarray stratum index of every row of the block
+        return: np.ndarray bool True for rows going to test set
+        """
+        try:
+            is_test_row = np.zeros(len(income_category), dtype=bool)
+            for stratum in np.unique(income_category):
+                stratum_positions = np.flatnonzero(income_category == stratum)
+                test_remaining = stratum_test_remaining[stratum]
+                test_row_count = random_generator.hypergeometric(ngood=test_remaining,
+                                                                 nbad=stratum_row_remaining[stratum] - test_remaining,
+                                                                 nsample=len(stratum_positions))
+                test_positions = random_generator.choice(stratum_positions, size=test_row_count, replace=False)
+                is_test_row[test_positions] = True
+
+                stratum_test_remaining[stratum] -= test_row_count
+                stratum_row_remaining[stratum] -= len(stratum_positions)
+            return is_test_row
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def split_data_in_chunks(self, dataset_file_path:str, train_file_path:str, test_file_path:str):
+        """
+        Stratified train test split which never holds more than one chunk of the raw file in memory.
+        First pass counts rows of every income stratum, second pass draws for each chunk how many
+        of its rows go to test set from hypergeometric distribution of the rows still left in the
+        stratum, which makes the selected test rows a uniform sample of exact size per stratum.
+        """
+        try:
+            chunk_size = self.data_ingestion_config.split_chunk_size
+            n_strata = len(INCOME_CATEGORY_LABELS) + 1
+
+            logging.info(f"Counting income strata of csv file [ {dataset_file_path} ] in chunks of {chunk_size} rows")
+            stratum_row_count = np.zeros(n_strata, dtype=np.int64)
+            with self.open_housing_file(dataset_file_path) as housing_file_obj:
+                for chunk in pd.read_csv(housing_file_obj, usecols=[COLUMN_MEDIAN_INCOME], chunksize=chunk_size):
+                    income_category = self.get_income_category(chunk[COLUMN_MEDIAN_INCOME])
+                    stratum_row_count += np.bincount(income_category, minlength=n_strata)
+
+            stratum_test_remaining = np.rint(stratum_row_count * DATA_INGESTION_TEST_SIZE).astype(np.int64)
+            stratum_row_remaining = stratum_row_count.copy()
+            logging.info(f"Rows per income stratum: {stratum_row_count.tolist()}, test rows per stratum: {stratum_test_remaining.tolist()}")
+
+            random_generator = np.random.default_rng(DATA_INGESTION_RANDOM_STATE)
+
+            logging.info(f"Spliting data into train test and exporting to [ {train_file_path} ] and [ {test_file_path} ]")
+            with DataFrameChunkWriter(file_path=train_file_path) as train_writer, \
+                 DataFrameChunkWriter(file_path=test_file_path) as test_writer, \
+                 self.open_housing_file(dataset_file_path) as housing_file_obj:
+                for chunk in pd.read_csv(housing_file_obj, chunksize=chunk_size):
+                    income_category = self.get_income_category(chunk[COLUMN_MEDIAN_INCOME])
+                    is_test_row = self.get_test_row_mask(income_category=income_category,
+                                                         stratum_test_remaining=stratum_test_remaining,
+                                                         stratum_row_remaining=stratum_row_remaining,
+                                                         random_generator=random_generator)
+
+                    train_writer.write(chunk[~is_test_row])
+                    test_writer.write(chunk[is_test_row])
+
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def split_data_as_train_test(self, dataset_file_path:str) -> DataIngestionArtifact:
+        """
+        dataset_file_path: str downloaded tgz archive or csv file
+        """
+        try:
+            file_name = self.get_housing_file_name(dataset_file_path)
+
+            ingested_file_extension = FILE_FORMAT_EXTENSION[self.data_ingestion_config.ingested_file_format]
+            ingested_file_name = f"{os.path.splitext(file_name)[0]}{ingested_file_extension}"
+
+            train_file_path = os.path.join(self.data_ingestion_config.ingested_train_dir, ingested_file_name)
+
+            test_file_path = os.path.join(self.data_ingestion_config.ingested_test_dir, ingested_file_name)
+
+            if self.data_ingestion_config.split_chunk_size:
+                self.split_data_in_chunks(dataset_file_path=dataset_file_path,
+                                          train_file_path=train_file_path,
+                                          test_file_path=test_file_path)
+            else:
+                self.split_data_in_memory(dataset_file_path=dataset_file_path,
+                                          train_file_path=train_file_path,
+                                          test_file_path=test_file_path)
 
             data_ingestion_artifact = DataIngestionArtifact(train_file_path=train_file_path, 
                                                             test_file_path=test_file_path, 
                                                             is_ingested=True, 
                                                             message="Data ingestion completed Successfully")
             
-            logging.info(f"Data Ingestion Artifact: [ {data_ingestion_artifact} ]")
+            logging.info("Data Ingestion Artifact: [ %s ]", data_ingestion_artifact)
             return data_ingestion_artifact
 
 
         except Exception as e:
             raise HousingException(e,sys) from e
 
+    def get_partition_file_paths(self) -> list:
+        """
+        Raw partition files of incremental mode in name order, which is the order they are appended in
+        """
+        try:
+            partition_dir = self.data_ingestion_config.incremental_partition_dir
+            return [os.path.join(partition_dir, file_name) for file_name in sorted(os.listdir(partition_dir))
+                    if not file_name.startswith(".") and os.path.isfile(os.path.join(partition_dir, file_name))]
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def load_incremental_state(self, state_file_path:str, train_file_path:str, test_file_path:str) -> dict:
+        """
+        Read ingestion state and cut back rows appended by a run which failed before saving its state
+        """
+        try:
+            if not os.path.exists(state_file_path):
+                for file_path in (train_file_path, test_file_path):
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                return {"partitions": {}, "train_file_size": 0, "test_file_size": 0}
+
+            with open(state_file_path, "r") as state_file:
+                incremental_state = json.load(state_file)
+
+            for file_path, file_size_key in ((train_file_path, "train_file_size"), (test_file_path, "test_file_size")):
+                file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+                if file_size < incremental_state[file_size_key]:
+                    raise Exception(f"Incremental dataset file: [{file_path}] is smaller than recorded in: [{state_file_path}]")
+                if file_size > incremental_state[file_size_key]:
+                    logging.info(f"Truncating rows of an unfinished run from: [{file_path}]")
+                    os.truncate(file_path, incremental_state[file_size_key])
+            return incremental_state
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def save_incremental_state(self, state_file_path:str, incremental_state:dict) -> None:
+        try:
+            temp_file_path = f"{state_file_path}.tmp"
+            with open(temp_file_path, "w") as state_file:
+                json.dump(incremental_state, state_file, indent=2)
+            os.replace(temp_file_path, state_file_path)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def split_partition(self, partition_df:pd.DataFrame, random_state:int):
+        """
+        Stratified train test split of one partition
+        return: (train rows, test rows)
+        """
+        try:
+            n_strata = len(INCOME_CATEGORY_LABELS) + 1
+            income_category = self.get_income_category(partition_df[COLUMN_MEDIAN_INCOME])
+            stratum_row_count = np.bincount(income_category, minlength=n_strata)
+            # every row of every stratum is in this one block, so exactly the rounded test share is drawn
+            is_test_row = self.get_test_row_mask(income_category=income_category,
+                                                 stratum_test_remaining=np.rint(stratum_row_count * DATA_INGESTION_TEST_SIZE).astype(np.int64),
+                                                 stratum_row_remaining=stratum_row_count.copy(),
+                                                 random_generator=np.random.default_rng(random_state))
+            return partition_df[~is_test_row], partition_df[is_test_row]
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def ingest_new_partitions(self) -> DataIngestionArtifact:
+        """
+        Incremental ingestion, every partition file not ingested yet is split on its own and its rows are
+        appended to the training and testing files built by previous runs. Rows of earlier partitions are
+        neither read nor moved between training and testing set.
+        """
+        try:
+            state_dir = self.data_ingestion_config.incremental_state_dir
+            state_file_path = os.path.join(state_dir, INCREMENTAL_STATE_FILE_NAME)
+            train_file_path = os.path.join(state_dir, INCREMENTAL_TRAIN_DIR, INCREMENTAL_DATASET_FILE_NAME)
+            test_file_path = os.path.join(state_dir, INCREMENTAL_TEST_DIR, INCREMENTAL_DATASET_FILE_NAME)
+            os.makedirs(os.path.dirname(train_file_path), exist_ok=True)
+            os.makedirs(os.path.dirname(test_file_path), exist_ok=True)
+
+            incremental_state = self.load_incremental_state(state_file_path=state_file_path,
+                                                            train_file_path=train_file_path,
+                                                            test_file_path=test_file_path)
+            partitions = incremental_state["partitions"]
+
+            partition_file_paths = self.get_partition_file_paths()
+            if len(partition_file_paths) == 0 and len(partitions) == 0:
+                raise Exception(f"No partition found in: [{self.data_ingestion_config.incremental_partition_dir}]")
+
+            for partition_file_path in partition_file_paths:
+                partition_name = os.path.basename(partition_file_path)
+                partition_checksum = get_file_checksum(file_path=partition_file_path)
+                if partition_name in partitions:
+                    if partitions[partition_name]["checksum"] != partition_checksum:
+                        raise Exception(f"Partition: [{partition_name}] changed after it was ingested, partitions are append only")
+                    continue
+
+                logging.info(f"Ingesting new partition: [{partition_file_path}]")
+                partition_df = read_dataframe(file_path=partition_file_path)
+                if "columns" in incremental_state:
+                    if sorted(partition_df.columns) != sorted(incremental_state["columns"]):
+                        raise Exception(f"Columns of partition: [{partition_name}] differ from previous partitions")
+                    partition_df = partition_df[incremental_state["columns"]]
+                else:
+                    incremental_state["columns"] = list(partition_df.columns)
+
+                train_df, test_df = self.split_partition(partition_df=partition_df,
+                                                         random_state=int(partition_checksum[:16], 16))
+                for dataframe, file_path in ((train_df, train_file_path), (test_df, test_file_path)):
+                    is_new_file = not os.path.exists(file_path) or os.path.getsize(file_path) == 0
+                    dataframe.to_csv(file_path, mode="a", header=is_new_file, index=False)
+
+                partitions[partition_name] = {"checksum": partition_checksum,
+                                              "train_row_count": len(train_df),
+                                              "test_row_count": len(test_df)}
+                incremental_state["train_file_size"] = os.path.getsize(train_file_path)
+                incremental_state["test_file_size"] = os.path.getsize(test_file_path)
+                # state is saved after every partition, an interrupted run resumes from the next one
+                self.save_incremental_state(state_file_path=state_file_path, incremental_state=incremental_state)
+                logging.info(f"Partition: [{partition_name}] added {len(train_df)} training and {len(test_df)} testing rows")
+
+            data_ingestion_artifact = DataIngestionArtifact(train_file_path=train_file_path,
+                                                            test_file_path=test_file_path,
+                                                            is_ingested=True,
+                                                            message=f"Incremental data ingestion completed, {len(partitions)} partitions ingested")
+            logging.info("Data Ingestion Artifact: [ %s ]", data_ingestion_artifact)
+            return data_ingestion_artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
     def initiate_data_ingestion(self) -> DataIngestionArtifact:
         try:
-            tgz_file_path= self.download_housing_data()
-            self.extract_tgz_file(tgz_file_path= tgz_file_path)
-            return self.split_data_as_train_test()
+            if self.data_ingestion_config.incremental_partition_dir is not None:
+                return self.ingest_new_partitions()
+
+            with profile_step("download"):
+                dataset_file_path = self.download_housing_data()
+            with profile_step("split"):
+                return self.split_data_as_train_test(dataset_file_path=dataset_file_path)
 
         except Exception as e:
             raise HousingException(e,sys) from e
@@ -11,7 +11,14 @@ from sklearn.impute import SimpleImputer
 import pandas as pd
 import numpy as np
 
-from housing.util.util import read_yaml_file, save_preprocessing_obj, save_numpy_array_data, load_data
+from housing.util.dataset_schema import get_dataset_schema
+from housing.util.util import save_preprocessing_obj, save_numpy_array_data, load_data, save_object, \
+    load_object, create_numpy_array_memmap, append_numpy_array_data, read_appended_csv_rows
+from housing.util.preprocessing_kernel import PreprocessingKernel
+from housing.util.incremental_preprocessing import IncrementalPreprocessingState
+from housing.util.run_profiler import profile_step
+import shutil
+from housing.util.dataset_registry import DatasetRegistry
 from housing.constant import *
 
 
@@ -21,7 +28,8 @@ class FeatureGenerator(BaseEstimator, TransformerMixin):
                  population_ix = 5,
                  households_ix = 6,
                  total_bedrooms_ix = 4,
-                 columns = None):
+                 columns = None,
+                 dtype = None):
     
         """
         FeatureGenerator Initialization
@@ -30,6 +38,7 @@ class FeatureGenerator(BaseEstimator, TransformerMixin):
         population_ix: int index number of total population columns
         households_ix: int index number of total households columns
         total_bedrooms_ix: int index number of total bedrooms columns
+        dtype: str output dtype (float64 or float32), None keeps float dtype of input
         """
         try:
             self.columns = columns
@@ -44,24 +53,56 @@ class FeatureGenerator(BaseEstimator, TransformerMixin):
             self.population_ix = population_ix
             self.households_ix = households_ix
             self.total_bedrooms_ix = total_bedrooms_ix
+            self.dtype = dtype
         except Exception as e:
             raise HousingException(e,sys) from e
 
+    def get_ratio_indices(self) -> list:
+        """
+        numerator and denominator column index of every generated feature in output order
+        """
+        ratio_indices = [(self.total_rooms_ix, self.households_ix),
+                         (self.population_ix, self.households_ix)]
+        if self.add_bedrooms_per_room:
+            ratio_indices.append((self.total_bedrooms_ix, self.total_rooms_ix))
+        return ratio_indices
+
+    def get_output_dtype(self, X) -> np.dtype:
+        if self.dtype is not None:
+            return np.dtype(self.dtype)
+        if np.issubdtype(X.dtype, np.floating):
+            return X.dtype
+        return np.dtype(np.float64)
+
     def fit(self, X, y=None):
         return self
 
-    def transform(self, X, y=None):
+    def transform(self, X, y=None, out=None):
+        """
+        Input columns followed by generated ratio features, a ratio with zero denominator is 0
+        X: np.ndarray imputed numerical columns
+        out: np.ndarray optional preallocated output of shape (n_rows, n_columns + n_generated_features)
+        """
         try:
-            room_per_household = X[:, self.total_rooms_ix] / X[:, self.households_ix]
-            population_per_household = X[:, self.population_ix] / X[:, self.households_ix]
-            if self.add_bedrooms_per_room:
-                bedroom_per_room = X[:, self.total_bedrooms_ix] / X[:, self.total_rooms_ix]
-
-                generated_feature = np.c_[X,room_per_household,population_per_household,bedroom_per_room]
-            else:
-                generated_feature = np.c_[X,room_per_household,population_per_household]
-            
-            return generated_feature
+            X = np.asarray(X)
+            ratio_indices = self.get_ratio_indices()
+            column_count = X.shape[1]
+            output_shape = (X.shape[0], column_count + len(ratio_indices))
+
+            if out is None:
+                out = np.empty(output_shape, dtype=self.get_output_dtype(X))
+            elif out.shape != output_shape:
+                raise ValueError(f"Output buffer shape {out.shape} does not match expected shape {output_shape}")
+
+            # ratios are computed from the copied columns so they use the output dtype
+            out[:, :column_count] = X
+            for ratio_number, (numerator_ix, denominator_ix) in enumerate(ratio_indices):
+                generated_column = out[:, column_count + ratio_number]
+                generated_column.fill(0)
+                np.divide(out[:, numerator_ix], out[:, denominator_ix], out=generated_column,
+                          where=out[:, denominator_ix] != 0)
+
+            return out
         except Exception as e:
             raise HousingException(e,sys) from e                
 
@@ -70,12 +111,14 @@ class DataTransformation:
     def __init__(self,
                  data_transformation_config: DataTransformationConfig,
                  data_ingestion_artifact: DataIngestionArtifact,
-                 data_validation_artifact: DataValidationArtifact) -> DataTransformationArtifact:
+                 data_validation_artifact: DataValidationArtifact,
+                 dataset_registry: DatasetRegistry = None) -> DataTransformationArtifact:
         try:
             logging.info(f"{'='*20}Data Transformation log started.{'='*20}")
             self.data_transformation_config = data_transformation_config
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_validation_artifact = data_validation_artifact
+            self.dataset_registry = dataset_registry if dataset_registry is not None else DatasetRegistry()
         except Exception as e:
             raise HousingException(e,sys) from e
 
@@ -83,16 +126,17 @@ class DataTransformation:
     def get_data_transformer_object(self) -> ColumnTransformer:
         try:
             schema_file_path = self.data_validation_artifact.schema_file_path
-            dataset_schema = read_yaml_file(file_path=schema_file_path)
+            dataset_schema = get_dataset_schema(schema_file_path=schema_file_path)
 
-            numerical_column = dataset_schema[DATASET_SCHEMA_NUMERICAL_COLUMN]
-            categorical_column = dataset_schema[DATASET_SCHEMA_CATEGORICAL_COLUMN]
+            numerical_column = dataset_schema.numerical_columns
+            categorical_column = dataset_schema.categorical_columns
 
             num_pipeline = Pipeline(steps=[
                                 ('imputer', SimpleImputer(strategy="median")),
                                 ('feature_generator',FeatureGenerator(
                                     add_bedrooms_per_room=self.data_transformation_config.add_bedroom_per_room,
-                                    columns=numerical_column
+                                    columns=numerical_column,
+                                    dtype=self.data_transformation_config.feature_dtype
                                 )),
                                 ('scaling',StandardScaler())
                             ])
@@ -117,8 +161,176 @@ class DataTransformation:
         except Exception as e:
             raise HousingException(e,sys) from e
 
+    def save_transformed_data_in_chunks(self,
+                                        file_path:str,
+                                        preprocessing_obj:ColumnTransformer,
+                                        input_feature_df:pd.DataFrame,
+                                        target_feature:pd.Series) -> None:
+        """
+        Write transformed input features followed by target column into an on-disk .npy array block by block
+        file_path: str location of .npy file
+        preprocessing_obj: ColumnTransformer fitted preprocessing object used to transform each block
+        """
+        try:
+            chunk_size = self.data_transformation_config.transform_chunk_size
+            row_count = len(input_feature_df)
+            if row_count == 0:
+                raise Exception(f"No rows to transform for: [{file_path}]")
+
+            with profile_step("save_transformed_data", file_path=file_path) as step:
+                target_arr = target_feature.to_numpy()
+                transformed_arr = None
+                for start in range(0, row_count, chunk_size):
+                    stop = min(start + chunk_size, row_count)
+                    feature_chunk = preprocessing_obj.transform(input_feature_df.iloc[start:stop])
+
+                    if transformed_arr is None:
+                        transformed_arr = create_numpy_array_memmap(file_path=file_path,
+                                                                    shape=(row_count, feature_chunk.shape[1] + 1),
+                                                                    dtype=self.data_transformation_config.feature_dtype)
+                    transformed_arr[start:stop, :-1] = feature_chunk
+                    transformed_arr[start:stop, -1] = target_arr[start:stop]
+
+                transformed_arr.flush()
+                logging.info(f"Saved transformed array of shape {transformed_arr.shape} to: [{file_path}]")
+                step.add(rows=row_count)
+            del transformed_arr
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_incremental_transformed_file_paths(self, train_file_path:str, test_file_path:str) -> tuple:
+        """
+        Transformed training and testing arrays of incremental runs, kept with the preprocessing state
+        and grown by every run
+        """
+        state_dir = self.data_transformation_config.incremental_state_dir
+        return (os.path.join(state_dir, INCREMENTAL_TRAIN_DIR, f"{os.path.splitext(os.path.basename(train_file_path))[0]}.npy"),
+                os.path.join(state_dir, INCREMENTAL_TEST_DIR, f"{os.path.splitext(os.path.basename(test_file_path))[0]}.npy"))
+
+    def get_incremental_preprocessing_state(self, train_file_path:str, test_file_path:str) -> IncrementalPreprocessingState:
+        """
+        Preprocessing state of previous incremental runs, a new one when settings changed, the
+        training file is not the one the state was built from or a file shrank
+        """
+        try:
+            state_dir = self.data_transformation_config.incremental_state_dir
+            state_file_path = os.path.join(state_dir, INCREMENTAL_PREPROCESSING_STATE_FILE_NAME)
+
+            dataset_schema = get_dataset_schema(schema_file_path=self.data_validation_artifact.schema_file_path)
+            numerical_columns = dataset_schema.numerical_columns
+            categorical_columns = dataset_schema.categorical_columns
+            if len(categorical_columns) != 1:
+                raise Exception(f"Incremental transformation supports one categorical column, got: {categorical_columns}")
+            categorical_column = categorical_columns[0]
+            # every category is known up front so one hot columns never change between runs
+            categories = dataset_schema.domain_value[categorical_column]
+
+            feature_generator = FeatureGenerator(add_bedrooms_per_room=self.data_transformation_config.add_bedroom_per_room,
+                                                 columns=numerical_columns)
+            new_state = IncrementalPreprocessingState(numerical_columns=numerical_columns,
+                                                      ratio_indices=feature_generator.get_ratio_indices(),
+                                                      categorical_column=categorical_column,
+                                                      categories=categories,
+                                                      numerical_dtype=self.data_transformation_config.feature_dtype,
+                                                      sketch_size=self.data_transformation_config.median_sketch_size)
+
+            if os.path.exists(state_file_path):
+                state = load_object(file_path=state_file_path)
+                transformed_file_paths = self.get_incremental_transformed_file_paths(train_file_path=train_file_path,
+                                                                                     test_file_path=test_file_path)
+                if state.get_signature() == new_state.get_signature() and state.train_file_path == train_file_path \
+                        and state.train_file_size <= os.path.getsize(train_file_path) \
+                        and state.test_file_size <= os.path.getsize(test_file_path) \
+                        and all(os.path.exists(file_path) for file_path, row_count
+                                in zip(transformed_file_paths, (state.train_row_count, state.test_row_count)) if row_count > 0):
+                    return state
+                logging.info(f"Incremental preprocessing state: [{state_file_path}] does not match current data or settings, rebuilding it")
+
+            if os.path.exists(state_dir):
+                shutil.rmtree(state_dir)
+            new_state.train_file_path = train_file_path
+            return new_state
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def initiate_incremental_data_transformation(self) -> DataTransformationArtifact:
+        """
+        Only rows appended to training and testing files since the previous run are read, imputed and
+        transformed, preprocessing statistics are updated with the new training rows. Transformed rows
+        are appended to the transformed arrays of previous runs.
+        """
+        try:
+            train_file_path = self.data_ingestion_artifact.train_file_path
+            test_file_path = self.data_ingestion_artifact.test_file_path
+            dataset_schema = get_dataset_schema(schema_file_path=self.data_validation_artifact.schema_file_path)
+            target_column_name = dataset_schema.target_column
+            feature_dtype = self.data_transformation_config.feature_dtype
+
+            state = self.get_incremental_preprocessing_state(train_file_path=train_file_path, test_file_path=test_file_path)
+            transformed_train_file_path, transformed_test_file_path = self.get_incremental_transformed_file_paths(
+                train_file_path=train_file_path, test_file_path=test_file_path)
+
+            # ingestion only appends rows, so rows after the size of the previous run are the new ones
+            train_file_size = os.path.getsize(train_file_path)
+            test_file_size = os.path.getsize(test_file_path)
+            new_train_df = read_appended_csv_rows(file_path=train_file_path, offset=state.train_file_size,
+                                                  dtype=dataset_schema.dtypes)
+            new_test_df = read_appended_csv_rows(file_path=test_file_path, offset=state.test_file_size,
+                                                 dtype=dataset_schema.dtypes)
+            logging.info(f"Preprocessing {len(new_train_df)} new training and {len(new_test_df)} new testing rows")
+
+            if len(new_train_df) > 0:
+                with profile_step("partial_fit") as step:
+                    unscaled_train_arr = state.partial_fit(dataframe=new_train_df.drop(columns=[target_column_name]))
+                    step.add(rows=len(new_train_df))
+                input_feature_train_arr = state.get_preprocessing_kernel().scale_unscaled_output(unscaled_output=unscaled_train_arr)
+                append_numpy_array_data(file_path=transformed_train_file_path,
+                                        array=np.c_[input_feature_train_arr, new_train_df[target_column_name].to_numpy()].astype(feature_dtype),
+                                        row_count=state.train_row_count)
+            preprocessing_kernel = state.get_preprocessing_kernel()
+
+            if len(new_test_df) > 0:
+                with profile_step("transform") as step:
+                    input_feature_test_arr = preprocessing_kernel.transform(new_test_df.drop(columns=[target_column_name]))
+                    step.add(rows=len(new_test_df))
+                append_numpy_array_data(file_path=transformed_test_file_path,
+                                        array=np.c_[input_feature_test_arr, new_test_df[target_column_name].to_numpy()].astype(feature_dtype),
+                                        row_count=state.test_row_count)
+
+            state.train_row_count += len(new_train_df)
+            state.test_row_count += len(new_test_df)
+            state.train_file_size = train_file_size
+            state.test_file_size = test_file_size
+
+            # the kernel is the preprocessing object of incremental runs, there is no fitted ColumnTransformer
+            preprocessing_obj_file_path = self.data_transformation_config.preprocessed_object_file_path
+            preprocessing_kernel_file_path = self.data_transformation_config.preprocessing_kernel_file_path
+            save_preprocessing_obj(file_path=preprocessing_obj_file_path, obj=preprocessing_kernel)
+            preprocessing_kernel.save(file_path=preprocessing_kernel_file_path)
+
+            # state is saved last, rows appended by a failed run are overwritten by the next one
+            state_file_path = os.path.join(self.data_transformation_config.incremental_state_dir,
+                                           INCREMENTAL_PREPROCESSING_STATE_FILE_NAME)
+            save_object(file_path=f"{state_file_path}.tmp", obj=state)
+            os.replace(f"{state_file_path}.tmp", state_file_path)
+
+            data_transformation_artifact = DataTransformationArtifact(
+                                                is_transformed=True,
+                                                message="Incremental Data Transformation Successful",
+                                                transformed_train_file_path=transformed_train_file_path,
+                                                transformed_test_file_path=transformed_test_file_path,
+                                                preprocessed_object_file_path=preprocessing_obj_file_path,
+                                                preprocessing_kernel_file_path=preprocessing_kernel_file_path)
+            logging.info("data_transformation_artifact: %s", data_transformation_artifact)
+            return data_transformation_artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
     def initiate_data_transformation(self) -> DataTransformationArtifact:
         try:
+            if self.data_transformation_config.incremental_state_dir is not None:
+                return self.initiate_incremental_data_transformation()
+
             logging.info(f"Obtaining preprocessing object.")
             preprocessing_obj = self.get_data_transformer_object()
 
@@ -128,12 +340,10 @@ class DataTransformation:
             schema_file_path = self.data_validation_artifact.schema_file_path
 
             logging.info(f"Loading training and testing data as pandas dataframe.")
-            train_df = load_data(file_path=train_file_path, schema_file_path=schema_file_path)
-            test_df = load_data(file_path=test_file_path, schema_file_path=schema_file_path)
+            train_df = load_data(file_path=train_file_path, schema_file_path=schema_file_path, dataset_registry=self.dataset_registry)
+            test_df = load_data(file_path=test_file_path, schema_file_path=schema_file_path, dataset_registry=self.dataset_registry)
 
-            schema = read_yaml_file(file_path=schema_file_path)
-
-            target_column_name = schema[DATASET_SCHEMA_TARGET_COLUMN]
+            target_column_name = get_dataset_schema(schema_file_path=schema_file_path).target_column
 
 
             logging.info(f"Splitting input and target feature from training and testing dataframe.")
@@ -144,43 +354,74 @@ class DataTransformation:
             target_feature_test_df = test_df[target_column_name]
 
 
-            logging.info(f"Applying preprocessing object on training and testing dataframe")
-            input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)
-            input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)
-
-            train_arr = np.c_[input_feature_train_arr, np.array(target_feature_train_df)]
-
-            test_arr = np.c_[input_feature_test_arr, np.array(target_feature_test_df)]
-            
-
             transform_train_dir = self.data_transformation_config.transformed_train_dir
             transform_test_dir = self.data_transformation_config.transformed_test_dir
 
-            train_file_name = os.path.basename(train_file_path).replace(".csv",".npz")
-            test_file_name = os.path.basename(test_file_path).replace(".csv",".npz")
+            train_file_name = f"{os.path.splitext(os.path.basename(train_file_path))[0]}.npy"
+            test_file_name = f"{os.path.splitext(os.path.basename(test_file_path))[0]}.npy"
 
             transformed_train_file_path = os.path.join(transform_train_dir,train_file_name)
             transformed_test_file_path = os.path.join(transform_test_dir,test_file_name)
-            
 
-            logging.info(f"Saving transformed training and testign array.")
-            save_numpy_array_data(file_path=transformed_train_file_path,array=train_arr)
-            save_numpy_array_data(file_path=transformed_test_file_path, array=test_arr)
+            if self.data_transformation_config.transform_chunk_size is None:
+                logging.info(f"Applying preprocessing object on training and testing dataframe")
+                with profile_step("fit_transform") as step:
+                    input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)
+                    step.add(rows=len(input_feature_train_df))
+                with profile_step("transform") as step:
+                    input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)
+                    step.add(rows=len(input_feature_test_df))
+
+                # one hot columns and target are float64, transformed arrays are stored in feature dtype
+                train_arr = np.c_[input_feature_train_arr, np.array(target_feature_train_df)].astype(
+                    self.data_transformation_config.feature_dtype, copy=False)
+
+                test_arr = np.c_[input_feature_test_arr, np.array(target_feature_test_df)].astype(
+                    self.data_transformation_config.feature_dtype, copy=False)
+
+                logging.info(f"Saving transformed training and testign array.")
+                save_numpy_array_data(file_path=transformed_train_file_path,array=train_arr)
+                save_numpy_array_data(file_path=transformed_test_file_path, array=test_arr)
+            else:
+                # only the fitted statistics are kept, training rows are transformed block by block like testing rows
+                logging.info(f"Fitting preprocessing object and writing transformed arrays in chunks of "
+                             f"{self.data_transformation_config.transform_chunk_size} rows")
+                with profile_step("fit") as step:
+                    preprocessing_obj.fit(input_feature_train_df)
+                    step.add(rows=len(input_feature_train_df))
+                self.save_transformed_data_in_chunks(file_path=transformed_train_file_path,
+                                                     preprocessing_obj=preprocessing_obj,
+                                                     input_feature_df=input_feature_train_df,
+                                                     target_feature=target_feature_train_df)
+
+                self.save_transformed_data_in_chunks(file_path=transformed_test_file_path,
+                                                     preprocessing_obj=preprocessing_obj,
+                                                     input_feature_df=input_feature_test_df,
+                                                     target_feature=target_feature_test_df)
 
             preprocessing_obj_file_path = self.data_transformation_config.preprocessed_object_file_path
 
 
             logging.info(f"Saving preprocessing object.")
-            save_preprocessing_obj(file_path=preprocessing_obj_file_path, obj=preprocessing_obj)
+            with profile_step("save_preprocessing_obj"):
+                save_preprocessing_obj(file_path=preprocessing_obj_file_path, obj=preprocessing_obj)
+
+            logging.info(f"Exporting preprocessing object into numpy preprocessing kernel.")
+            preprocessing_kernel = PreprocessingKernel.from_column_transformer(preprocessing_obj=preprocessing_obj)
+            preprocessing_kernel.check_parity(preprocessing_obj=preprocessing_obj, dataframe=input_feature_test_df)
+
+            preprocessing_kernel_file_path = self.data_transformation_config.preprocessing_kernel_file_path
+            preprocessing_kernel.save(file_path=preprocessing_kernel_file_path)
 
             data_transformation_artifact = DataTransformationArtifact(
                                                 is_transformed=True,
                                                 message="Data Transformation Successful",
                                                 transformed_train_file_path=transformed_train_file_path,
                                                 transformed_test_file_path=transformed_test_file_path,
-                                                preprocessed_object_file_path=preprocessing_obj_file_path)
+                                                preprocessed_object_file_path=preprocessing_obj_file_path,
+                                                preprocessing_kernel_file_path=preprocessing_kernel_file_path)
 
-            logging.info(f"data_transformation_artifact: {data_transformation_artifact} ")
+            logging.info("data_transformation_artifact: %s", data_transformation_artifact)
 
             return data_transformation_artifact
             
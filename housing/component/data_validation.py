@@ -1,39 +1,63 @@
 from housing.logger import logging
 from housing.exception import HousingException
 from housing.entity.config_entity import DataValidationConfig
-from housing.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
-from housing.constant import DATASET_SCHEMA_COLUMNS, DATASET_SCHEMA_DOMAIN_VALUE
-from housing.util.util import read_yaml_file
+from housing.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, DataDriftArtifact
+from housing.util.dataset_schema import get_dataset_schema
+from housing.util.schema_validator import SchemaValidator
+from housing.util.dataset_registry import DatasetRegistry
+from housing.util.run_profiler import profile_step, bind_profile_step
+from housing.util.data_drift import get_data_drift_report, get_data_drift_report_page
+from housing.constant import *
 import os, sys
 import pandas as pd
-
-from evidently.model_profile import Profile
-from evidently.model_profile.sections import DataDriftProfileSection
-from evidently.dashboard import Dashboard
-from evidently.dashboard.tabs import DataDriftTab
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 
 class DataValidation:
 
     def __init__(self, 
                  data_validation_config:DataValidationConfig,
-                 data_ingestion_artifact:DataIngestionArtifact) -> None:
+                 data_ingestion_artifact:DataIngestionArtifact,
+                 dataset_registry:DatasetRegistry = None) -> None:
         try:
             logging.info(f"{'='*20}Data Validation log started.{'='*20}")
             self.data_validation_config=data_validation_config
             self.data_ingestion_artifact=data_ingestion_artifact
+            self.dataset_registry = dataset_registry if dataset_registry is not None else DatasetRegistry()
         except Exception as e:
             raise HousingException(e,sys) from e
 
     def get_train_and_test_df(self):
         try:
-            train_df = pd.read_csv(self.data_ingestion_artifact.train_file_path)
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
+            schema_dtypes = get_dataset_schema(schema_file_path=self.data_validation_config.schema_file_path).dtypes
+
+            train_df = self.dataset_registry.get_dataframe(file_path=self.data_ingestion_artifact.train_file_path, dtype=schema_dtypes)
+            test_df = self.dataset_registry.get_dataframe(file_path=self.data_ingestion_artifact.test_file_path, dtype=schema_dtypes)
             return train_df,test_df
         except Exception as e:
             raise HousingException(e,sys) from e
 
+    def get_dataframe_to_validate(self, file_path:str) -> pd.DataFrame:
+        """
+        Dataset read with schema dtypes, shared with later stages. When a value can not be parsed as the
+        dtype of its column, numeric columns are read again with dtypes inferred by pandas so that
+        schema validation counts such values as dtype violations instead of failing on the read
+        file_path: str location of dataset
+        """
+        try:
+            schema_dtypes = get_dataset_schema(schema_file_path=self.data_validation_config.schema_file_path).dtypes
+            try:
+                return self.dataset_registry.get_dataframe(file_path=file_path, dtype=schema_dtypes)
+            except HousingException as e:
+                logging.info(f"Dataset: [{file_path}] can not be read with schema dtypes, reading it for validation "
+                             f"with inferred numeric dtypes: {e}")
+            other_dtypes = {column: dtype for column, dtype in schema_dtypes.items()
+                            if not SchemaValidator.is_numeric_dtype(dtype)}
+            return self.dataset_registry.get_dataframe(file_path=file_path, dtype=other_dtypes)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
     def is_train_test_file_exists(self) -> bool:
         try:
             logging.info("Checking if training and testing file exists?")
@@ -66,79 +90,74 @@ class DataValidation:
             logging.info("validating dataset schema")
             
             schema_file_path = self.data_validation_config.schema_file_path
-            schema_info = read_yaml_file(file_path = schema_file_path )
-
-            # 1. Cheking column count
-            logging.info("Checking if column count in training and testing set matches to column count specified in schema")
-            is_column_count_match = False
-
-            train_file_path = self.data_ingestion_artifact.train_file_path
-            test_file_path = self.data_ingestion_artifact.test_file_path
-
-            train_data_frame,test_data_frame = self.get_train_and_test_df()
-
-            train_column_count = len(train_data_frame.columns)
-            test_column_count = len(test_data_frame.columns)
-
-            schema_column_count = len(schema_info[DATASET_SCHEMA_COLUMNS])
-
-            if (train_column_count == schema_column_count) and (test_column_count == schema_column_count):
-                is_column_count_match = True
-                logging.info(f"is column count of schema matches with taining and testing set column count -> {is_column_count_match}")
-            else:
-                raise Exception(f"Training Dataset Column count: {train_column_count} or Testing Dataset Column count: {test_column_count} does not match to Schema Column count: {schema_column_count}")
-
-            # 2. Checking Values of Categorical columns
-            logging.info(f"checking the values of 'ocean proximity' column of Schema Dataset with Training and Testing Dataset")
-            
-            domain_values_match = False
-            domain_value_colums = schema_info[DATASET_SCHEMA_DOMAIN_VALUE]
-            
-            schema_column_domain_values = list(domain_value_colums.values())[0]
-
-            
-
-            train_column_domain_values = list(set(train_data_frame[domain_value_colums]))
-            test_column_domain_values = list(set(test_data_frame[domain_value_colums]))
-
-            if (train_column_domain_values.sort() == schema_column_domain_values.sort()) and (test_column_domain_values.sort() == schema_column_domain_values.sort()):
-                domain_values_match = True
-                logging.info(f"domain values of schema column matches with taining and testing set domain value column -> {domain_values_match}")
-            else:
-                raise Exception(f"Domain values of Training Dataset: {train_column_domain_values.sort()} or Domain values of Testing Dataset: {test_column_domain_values.sort()} does not match with Domain values of Schema Column: {schema_column_domain_values.sort()}")
-
-            # 3. Checking all column names
-
-            logging.info(f"checking all column names of Schema Dataset with Training and Testing Dataset")
-            
-            all_column_names_match = False
-            
-            schema_columns = schema_info[DATASET_SCHEMA_COLUMNS]
-            schema_columns_list = list(schema_columns.keys())
-
-            train_column_list = list(train_data_frame.columns)
-            test_column_list = list(test_data_frame.columns)
-
-            if (train_column_list.sort() == schema_columns_list.sort()) and (test_column_list.sort() == schema_columns_list.sort()):
-                all_column_names_match = True
-                logging.info(f"all column names of schema matches with taining and testing set column names -> {all_column_names_match}")
-            else:
-                raise Exception(f"Training Dataset Column names: {train_column_list.sort()} or Testing Dataset Column names: {test_column_list.sort()} does not match with Schema Column names: {schema_columns_list.sort()}")
-
-
-            validation_status = all([is_column_count_match, domain_values_match, all_column_names_match])
+            schema_info = get_dataset_schema(schema_file_path=schema_file_path).schema
+
+            # rules of schema (column names, dtype, domain values, null ratio and value range) are compiled once
+            # and evaluated on every column of training and testing set in a single vectorized pass per dataset
+            schema_validator = SchemaValidator(dataset_schema=schema_info)
+
+            train_data_frame = self.get_dataframe_to_validate(file_path=self.data_ingestion_artifact.train_file_path)
+            test_data_frame = self.get_dataframe_to_validate(file_path=self.data_ingestion_artifact.test_file_path)
+
+            schema_report = {
+                "train": schema_validator.validate(dataframe=train_data_frame),
+                "test": schema_validator.validate(dataframe=test_data_frame)
+            }
+
+            schema_report_file_path = self.data_validation_config.schema_report_file_path
+            os.makedirs(os.path.dirname(schema_report_file_path), exist_ok=True)
+            with open(schema_report_file_path,"w") as schema_report_file:
+                json.dump(schema_report, schema_report_file, indent=4)
+            logging.info(f"Schema validation report saved at: [{schema_report_file_path}]")
+
+            error_message = ""
+            for dataset_name, dataset_report in schema_report.items():
+                if len(dataset_report["missing_columns"]) > 0:
+                    error_message = f"{error_message} \n{dataset_name} dataset is missing columns: {dataset_report['missing_columns']}"
+                if len(dataset_report["unexpected_columns"]) > 0:
+                    error_message = f"{error_message} \n{dataset_name} dataset has columns not in schema: {dataset_report['unexpected_columns']}"
+                for column_name, column_report in dataset_report["columns"].items():
+                    if not column_report["is_valid"]:
+                        error_message = f"{error_message} \n{dataset_name} dataset column: [{column_name}] violates schema: {column_report}"
+
+            if len(error_message) > 0:
+                raise Exception(f"Dataset schema validation failed, report: [{schema_report_file_path}] {error_message}")
+
+            validation_status = True
             
             logging.info(f"is dataset schema validation successful -> {validation_status}")
             return validation_status
         except Exception as e:
             raise HousingException(e,sys) from e
 
-    def get_and_save_data_drift_report(self):
+    def get_native_data_drift_report(self) -> dict:
         try:
-            profile = Profile(sections=[DataDriftProfileSection()])
+            dataset_schema = get_dataset_schema(schema_file_path=self.data_validation_config.schema_file_path)
+            categorical_columns = dataset_schema.categorical_columns
+            numerical_columns = [column for column, dtype in dataset_schema.dtypes.items()
+                                 if column not in categorical_columns and dtype != "category"]
+
             train_data_frame,test_data_frame = self.get_train_and_test_df()
-            profile.calculate(train_data_frame,test_data_frame)
-            report = json.loads(profile.json())
+            return get_data_drift_report(reference_df=train_data_frame,
+                                         current_df=test_data_frame,
+                                         numerical_columns=numerical_columns,
+                                         categorical_columns=categorical_columns,
+                                         sample_size=self.data_validation_config.drift_sample_size)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_and_save_data_drift_report(self):
+        try:
+            if self.data_validation_config.drift_backend == DRIFT_BACKEND_NATIVE:
+                report = self.get_native_data_drift_report()
+            else:
+                from evidently.model_profile import Profile
+                from evidently.model_profile.sections import DataDriftProfileSection
+
+                profile = Profile(sections=[DataDriftProfileSection()])
+                train_data_frame,test_data_frame = self.get_train_and_test_df()
+                profile.calculate(train_data_frame,test_data_frame)
+                report = json.loads(profile.json())
 
             report_file_path = self.data_validation_config.report_file_path
 
@@ -151,48 +170,93 @@ class DataValidation:
         except Exception as e:
             raise HousingException(e,sys) from e
 
-    def save_data_drift_report_page(self):
+    def save_data_drift_report_page(self, report:dict = None):
+        """
+        report: dict native drift report to render, computed again when not given
+        """
         try:
-            dashboard = Dashboard(tabs = [DataDriftTab()])
-            train_data_frame,test_data_frame = self.get_train_and_test_df()
-            dashboard.calculate(train_data_frame,test_data_frame)
-
             report_page_file_path = self.data_validation_config.report_page_file_path
 
             report_page_dir = os.path.dirname(report_page_file_path)
             os.makedirs(report_page_dir, exist_ok=True)
 
+            if self.data_validation_config.drift_backend == DRIFT_BACKEND_NATIVE:
+                if report is None:
+                    report = self.get_native_data_drift_report()
+                with open(report_page_file_path,"w") as report_page_file:
+                    report_page_file.write(get_data_drift_report_page(report=report))
+                return
+
+            from evidently.dashboard import Dashboard
+            from evidently.dashboard.tabs import DataDriftTab
+
+            dashboard = Dashboard(tabs = [DataDriftTab()])
+            train_data_frame,test_data_frame = self.get_train_and_test_df()
+            dashboard.calculate(train_data_frame,test_data_frame)
+
             dashboard.save(report_page_file_path)
         except Exception as e:
             raise HousingException(e,sys) from e
     
     def is_data_drift(self) -> bool:
         try:
-            report = self.get_and_save_data_drift_report()
-            self.save_data_drift_report_page()
+            if self.data_validation_config.drift_backend == DRIFT_BACKEND_NATIVE:
+                # native report page is rendered from the json report, so it has to wait for it
+                report = self.get_and_save_data_drift_report()
+                self.save_data_drift_report_page(report=report)
+                return True
+
+            # evidently profile and dashboard are independent computations on the same shared dataframes
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                report_future = executor.submit(bind_profile_step(self.get_and_save_data_drift_report))
+                report_page_future = executor.submit(bind_profile_step(self.save_data_drift_report_page))
+                report_future.result()
+                report_page_future.result()
             return True
         except Exception as e:
             raise HousingException(e,sys) from e
 
 
-    def initiate_data_validation(self) -> DataValidationArtifact:
+    def profile_validation_step(self, step_name:str, validation_function):
+        """
+        Run a validation check as a profiled step of the thread running it
+        """
+        with profile_step(step_name):
+            return validation_function()
+
+    def initiate_schema_validation(self) -> DataValidationArtifact:
+        """
+        Check ingested files against schema.yaml, the drift report is left to initiate_data_drift_report
+        """
         try:
             self.is_train_test_file_exists()
-            self.validate_dataset_schema()
-            self.is_data_drift()
+            self.profile_validation_step("schema_validation", self.validate_dataset_schema)
 
             data_validation_artifact = DataValidationArtifact(schema_file_path=self.data_validation_config.schema_file_path,
-                                                              report_file_path=self.data_validation_config.report_file_path,
-                                                              report_page_file_path=self.data_validation_config.report_page_file_path,
+                                                              schema_report_file_path=self.data_validation_config.schema_report_file_path,
                                                               is_validated=True,
                                                               message="Data Validation performed successfully.")
-            
-            logging.info(f"Data validation artifact: {data_validation_artifact}")
-
+            logging.info("Data validation artifact: %s", data_validation_artifact)
             return data_validation_artifact
         except Exception as e:
             raise HousingException(e,sys) from e
 
+    def initiate_data_drift_report(self) -> DataDriftArtifact:
+        """
+        Save drift report of test data against train data and its html page
+        """
+        try:
+            self.is_train_test_file_exists()
+            self.profile_validation_step("data_drift", self.is_data_drift)
+
+            data_drift_artifact = DataDriftArtifact(report_file_path=self.data_validation_config.report_file_path,
+                                                    report_page_file_path=self.data_validation_config.report_page_file_path,
+                                                    is_report_saved=True,
+                                                    message="Data drift report saved successfully.")
+            logging.info("Data drift artifact: %s", data_drift_artifact)
+            return data_drift_artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
 
     def __del__(self):
         logging.info(f"{'='*20}Data Validation log Completed. {'='*20} \n\n")
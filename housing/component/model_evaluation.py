@@ -0,0 +1,180 @@
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.entity.config_entity import ModelEvaluationConfig
+from housing.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact, \
+    ModelTrainerArtifact, ModelEvaluationArtifact
+from housing.entity.housing_predictor import HousingPredictor
+from housing.util.bootstrap import get_bootstrap_regression_metrics, get_confidence_interval
+from housing.util.dataset_registry import DatasetRegistry
+from housing.util.model_registry import ModelRegistry
+from housing.util.run_profiler import profile_step
+from housing.util.dataset_schema import get_dataset_schema
+from housing.util.util import read_yaml_file, write_yaml_file, load_numpy_array_data, load_object, load_data
+from housing.constant import *
+import os, sys
+import numpy as np
+
+
+class ModelEvaluation:
+
+    def __init__(self,
+                 model_evaluation_config:ModelEvaluationConfig,
+                 data_ingestion_artifact:DataIngestionArtifact,
+                 data_validation_artifact:DataValidationArtifact,
+                 data_transformation_artifact:DataTransformationArtifact,
+                 model_trainer_artifact:ModelTrainerArtifact,
+                 dataset_registry:DatasetRegistry = None):
+        try:
+            logging.info(f"{'='*20}Model Evaluation log started.{'='*20}")
+            self.model_evaluation_config = model_evaluation_config
+            self.data_ingestion_artifact = data_ingestion_artifact
+            self.data_validation_artifact = data_validation_artifact
+            self.data_transformation_artifact = data_transformation_artifact
+            self.model_trainer_artifact = model_trainer_artifact
+            self.dataset_registry = dataset_registry if dataset_registry is not None else DatasetRegistry()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_deployed_model_dir(self) -> str:
+        """
+        Directory of currently deployed model, None when no model is deployed yet
+        """
+        try:
+            model_registry = ModelRegistry(export_dir_path=self.model_evaluation_config.export_dir_path)
+            return model_registry.get_current_model_dir()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_deployed_model_prediction(self, deployed_model_dir:str) -> np.ndarray:
+        """
+        Deployed model prediction of testing rows. Transformed testing array is built by the new
+        preprocessing object, so deployed model scores raw testing rows through its own preprocessing.
+        """
+        try:
+            housing_predictor = HousingPredictor(model_dir=deployed_model_dir,
+                                                 model_file_name=self.model_evaluation_config.model_file_name,
+                                                 preprocessed_object_file_name=self.model_evaluation_config.preprocessed_object_file_name,
+                                                 preprocessing_kernel_file_name=self.model_evaluation_config.preprocessing_kernel_file_name)
+
+            schema_file_path = self.data_validation_artifact.schema_file_path
+            # target column is not needed to predict
+            input_feature_test_df = load_data(file_path=self.data_ingestion_artifact.test_file_path,
+                                              schema_file_path=schema_file_path,
+                                              dataset_registry=self.dataset_registry,
+                                              columns=get_dataset_schema(schema_file_path=schema_file_path).input_columns)
+
+            return housing_predictor.predict(input_feature_test_df)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_metric_summary(self, y_true:np.ndarray, y_pred:np.ndarray, rmse_samples:np.ndarray, r2_samples:np.ndarray) -> dict:
+        """
+        Point estimate and bootstrap confidence interval of rmse and r2 of one model
+        """
+        try:
+            confidence_level = self.model_evaluation_config.confidence_level
+            squared_error = (y_true - y_pred) ** 2
+            return {
+                "rmse": float(np.sqrt(squared_error.mean())),
+                "rmse_confidence_interval": get_confidence_interval(samples=rmse_samples, confidence_level=confidence_level),
+                "r2": float(1.0 - squared_error.sum() / ((y_true - y_true.mean()) ** 2).sum()),
+                "r2_confidence_interval": get_confidence_interval(samples=r2_samples, confidence_level=confidence_level)
+            }
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def update_evaluation_report(self, evaluation_result:dict) -> None:
+        """
+        Add result of current run to model_evaluation.yaml which keeps results of every run
+        """
+        try:
+            model_evaluation_file_path = self.model_evaluation_config.model_evaluation_file_path
+            evaluation_report = {}
+            if os.path.exists(model_evaluation_file_path):
+                evaluation_report = read_yaml_file(file_path=model_evaluation_file_path) or {}
+            evaluation_report[self.model_evaluation_config.time_stamp] = evaluation_result
+            write_yaml_file(file_path=model_evaluation_file_path, data=evaluation_report)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def initiate_model_evaluation(self) -> ModelEvaluationArtifact:
+        try:
+            trained_model_file_path = self.model_trainer_artifact.trained_model_file_path
+            test_array = load_numpy_array_data(file_path=self.data_transformation_artifact.transformed_test_file_path,
+                                               mmap_mode="r")
+            x_test, y_test = test_array[:, :-1], np.asarray(test_array[:, -1], dtype=np.float64)
+
+            logging.info(f"Predicting testing rows with trained model: [{trained_model_file_path}]")
+            trained_model = load_object(file_path=trained_model_file_path)
+            y_pred_list = [np.asarray(trained_model.predict(x_test), dtype=np.float64).ravel()]
+
+            deployed_model_dir = self.get_deployed_model_dir()
+            deployed_model_error = None
+            if deployed_model_dir is not None:
+                logging.info(f"Predicting testing rows with deployed model: [{deployed_model_dir}]")
+                try:
+                    y_pred_list.append(np.asarray(self.get_deployed_model_prediction(deployed_model_dir=deployed_model_dir),
+                                                  dtype=np.float64).ravel())
+                except Exception as e:
+                    # e.g. schema changed since deployment, deployed model can not be compared anymore
+                    deployed_model_error = str(e)
+                    logging.info(f"Deployed model could not score testing rows: [{deployed_model_error}]")
+
+            sample_count = self.model_evaluation_config.bootstrap_sample_count
+            logging.info(f"Bootstrapping {sample_count} resamples of {len(y_test)} testing rows")
+            with profile_step("bootstrap", sample_count=sample_count) as step:
+                bootstrap_metrics = get_bootstrap_regression_metrics(y_true=y_test,
+                                                                     y_pred_list=y_pred_list,
+                                                                     sample_count=sample_count,
+                                                                     random_state=self.model_evaluation_config.random_state)
+                step.add(rows=len(y_test))
+
+            evaluation_result = {
+                "trained_model": {"model_path": trained_model_file_path,
+                                  **self.get_metric_summary(y_true=y_test, y_pred=y_pred_list[0],
+                                                            rmse_samples=bootstrap_metrics["rmse"][0],
+                                                            r2_samples=bootstrap_metrics["r2"][0])},
+                "deployed_model": None,
+                "bootstrap_sample_count": sample_count,
+                "confidence_level": self.model_evaluation_config.confidence_level
+            }
+
+            if len(y_pred_list) == 1:
+                is_model_accepted = True
+                message = "No comparable deployed model, trained model accepted"
+                if deployed_model_error is not None:
+                    evaluation_result["deployed_model"] = {"model_path": deployed_model_dir, "error": deployed_model_error}
+            else:
+                evaluation_result["deployed_model"] = {"model_path": deployed_model_dir,
+                                                       **self.get_metric_summary(y_true=y_test, y_pred=y_pred_list[1],
+                                                                                 rmse_samples=bootstrap_metrics["rmse"][1],
+                                                                                 r2_samples=bootstrap_metrics["r2"][1])}
+                # paired difference, both models are scored on the same resampled rows
+                rmse_difference = bootstrap_metrics["rmse"][0] - bootstrap_metrics["rmse"][1]
+                rmse_difference_interval = get_confidence_interval(samples=rmse_difference,
+                                                                   confidence_level=self.model_evaluation_config.confidence_level)
+                evaluation_result["rmse_difference_confidence_interval"] = rmse_difference_interval
+
+                # accepted only when the whole interval shows lower rmse than deployed model
+                is_model_accepted = rmse_difference_interval[1] < 0
+                if is_model_accepted:
+                    message = f"Trained model rmse is lower than deployed model, difference interval: {rmse_difference_interval}"
+                else:
+                    message = f"Trained model is not significantly better than deployed model, difference interval: {rmse_difference_interval}"
+
+            evaluation_result["is_model_accepted"] = bool(is_model_accepted)
+            evaluation_result["message"] = message
+            logging.info(message)
+            self.update_evaluation_report(evaluation_result=evaluation_result)
+
+            model_evaluation_artifact = ModelEvaluationArtifact(is_model_accepted=bool(is_model_accepted),
+                                                                message=message,
+                                                                trained_model_file_path=trained_model_file_path,
+                                                                model_evaluation_file_path=self.model_evaluation_config.model_evaluation_file_path)
+            logging.info("Model Evaluation Artifact: %s", model_evaluation_artifact)
+            return model_evaluation_artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def __del__(self):
+        logging.info(f"{'='*20}Model Evaluation log completed.{'='*20}\n\n")
@@ -0,0 +1,64 @@
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.entity.config_entity import ModelPusherConfig
+from housing.entity.artifact_entity import DataTransformationArtifact, ModelEvaluationArtifact, ModelPusherArtifact, \
+    PartitionTrainingArtifact
+from housing.util.model_registry import ModelRegistry
+import sys
+
+
+class ModelPusher:
+
+    def __init__(self,
+                 model_pusher_config:ModelPusherConfig,
+                 data_transformation_artifact:DataTransformationArtifact,
+                 model_evaluation_artifact:ModelEvaluationArtifact,
+                 partition_training_artifact:PartitionTrainingArtifact = None):
+        """
+        partition_training_artifact: PartitionTrainingArtifact partition models published along with the global model
+        """
+        try:
+            logging.info(f"{'='*20}Model Pusher log started.{'='*20}")
+            self.model_pusher_config = model_pusher_config
+            self.data_transformation_artifact = data_transformation_artifact
+            self.model_evaluation_artifact = model_evaluation_artifact
+            self.partition_training_artifact = partition_training_artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def export_model(self) -> ModelPusherArtifact:
+        try:
+            model_registry = ModelRegistry(export_dir_path=self.model_pusher_config.export_dir_path)
+            model_version = self.model_pusher_config.model_version
+
+            # model and the preprocessing it was trained on are published together as one version
+            bundle_file_paths = [self.model_evaluation_artifact.trained_model_file_path,
+                                 self.data_transformation_artifact.preprocessed_object_file_path,
+                                 self.data_transformation_artifact.preprocessing_kernel_file_path]
+
+            # partition models and their manifest go into the partitions directory of the version,
+            # the global model serves rows of partitions without a model of their own
+            bundle_dir_paths = []
+            if self.partition_training_artifact is not None and self.partition_training_artifact.is_trained:
+                bundle_dir_paths.append(self.partition_training_artifact.partitioned_model_dir)
+
+            logging.info(f"Publishing model version: [{model_version}] into: [{self.model_pusher_config.export_dir_path}]")
+            model_dir = model_registry.publish_model(version=model_version, file_paths=bundle_file_paths,
+                                                     dir_paths=bundle_dir_paths)
+
+            model_pusher_artifact = ModelPusherArtifact(is_model_pushed=True,
+                                                        export_dir_path=model_dir,
+                                                        model_version=model_version)
+            logging.info("Model pusher artifact: [%s]", model_pusher_artifact)
+            return model_pusher_artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def initiate_model_pusher(self) -> ModelPusherArtifact:
+        try:
+            return self.export_model()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def __del__(self):
+        logging.info(f"{'='*20}Model Pusher log completed.{'='*20}\n\n")
@@ -0,0 +1,77 @@
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.entity.config_entity import ModelTrainerConfig
+from housing.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact
+from housing.entity.model_factory import ModelFactory, evaluate_regression_model
+from housing.util.util import load_numpy_array_data, save_object
+from housing.util.run_profiler import profile_step
+import sys
+
+
+class ModelTrainer:
+
+    def __init__(self, model_trainer_config:ModelTrainerConfig, data_transformation_artifact:DataTransformationArtifact):
+        try:
+            logging.info(f"{'='*20}Model trainer log started.{'='*20}")
+            self.model_trainer_config = model_trainer_config
+            self.data_transformation_artifact = data_transformation_artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def initiate_model_trainer(self) -> ModelTrainerArtifact:
+        try:
+            logging.info(f"Loading transformed training and testing dataset")
+            # transformed arrays are memory mapped, rows are read when a model touches them
+            train_array = load_numpy_array_data(file_path=self.data_transformation_artifact.transformed_train_file_path,
+                                                mmap_mode="r")
+            test_array = load_numpy_array_data(file_path=self.data_transformation_artifact.transformed_test_file_path,
+                                               mmap_mode="r")
+
+            logging.info(f"Splitting training and testing input and target feature")
+            x_train, y_train, x_test, y_test = train_array[:,:-1], train_array[:,-1], test_array[:,:-1], test_array[:,-1]
+
+            logging.info(f"Initializing model factory class using above model config file: {self.model_trainer_config.model_config_file_path}")
+            model_factory = ModelFactory(model_config_path=self.model_trainer_config.model_config_file_path,
+                                         n_jobs=self.model_trainer_config.search_n_jobs)
+
+            logging.info(f"Searching best model among {len(model_factory.candidates)} candidates "
+                         f"using {model_factory.n_jobs} processes")
+            # workers memory map the transformed training file themselves, so one copy of it lives in page cache
+            with profile_step("model_search", candidates=len(model_factory.candidates), n_jobs=model_factory.n_jobs) as step:
+                best_model = model_factory.get_best_model(X=x_train, y=y_train,
+                                                          array_file_path=self.data_transformation_artifact.transformed_train_file_path)
+                step.add(rows=len(x_train))
+
+            metric_info = evaluate_regression_model(model=best_model.model,
+                                                    X_train=x_train, y_train=y_train,
+                                                    X_test=x_test, y_test=y_test,
+                                                    model_name=best_model.candidate.model_name)
+            logging.info(f"Best model metrics: train r2: {metric_info.train_accuracy}, test r2: {metric_info.test_accuracy}, "
+                         f"train rmse: {metric_info.train_rmse}, test rmse: {metric_info.test_rmse}")
+
+            base_accuracy = self.model_trainer_config.base_accuracy
+            if metric_info.test_accuracy < base_accuracy:
+                raise Exception(f"Best model [{metric_info.model_name}] test accuracy: {metric_info.test_accuracy} "
+                                f"is below base accuracy: {base_accuracy}")
+
+            trained_model_file_path = self.model_trainer_config.trained_model_file_path
+            logging.info(f"Saving trained model at path: [{trained_model_file_path}]")
+            with profile_step("save_model"):
+                save_object(file_path=trained_model_file_path, obj=best_model.model)
+
+            model_trainer_artifact = ModelTrainerArtifact(is_trained=True,
+                                                          message="Model Trained successfully",
+                                                          trained_model_file_path=trained_model_file_path,
+                                                          model_name=metric_info.model_name,
+                                                          train_rmse=metric_info.train_rmse,
+                                                          test_rmse=metric_info.test_rmse,
+                                                          train_accuracy=metric_info.train_accuracy,
+                                                          test_accuracy=metric_info.test_accuracy)
+
+            logging.info("Model Trainer Artifact: %s", model_trainer_artifact)
+            return model_trainer_artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def __del__(self):
+        logging.info(f"{'='*20}Model trainer log completed.{'='*20}\n\n")
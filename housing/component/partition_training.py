@@ -0,0 +1,257 @@
+from housing.exception import HousingException
+from housing.logger import logging, LogContext, set_run_id, get_run_id
+from housing.entity.config_entity import PartitionTrainingConfig, DataTransformationConfig, ModelTrainerConfig
+from housing.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, PartitionTrainingArtifact, \
+    ModelTrainerArtifact
+from housing.util.dataset_registry import DatasetRegistry
+from housing.util.partition import get_partition_values, get_partition_dir_names
+from housing.util.util import load_data, save_dataframe
+from housing.util.run_profiler import profile_step
+from housing.constant import *
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import os, sys
+import json
+import shutil
+
+
+def init_partition_worker(run_id:str) -> None:
+    """
+    Records of spawned workers carry the run id of the parent
+    """
+    set_run_id(run_id)
+
+
+def train_partition(partition_value:str,
+                    data_ingestion_artifact:DataIngestionArtifact,
+                    data_validation_artifact:DataValidationArtifact,
+                    data_transformation_config:DataTransformationConfig,
+                    model_trainer_config:ModelTrainerConfig) -> ModelTrainerArtifact:
+    """
+    Transform and train one partition in a worker process
+    data_ingestion_artifact: DataIngestionArtifact train and test file of the partition
+    """
+    from housing.component.data_transformation import DataTransformation
+    from housing.component.model_trainer import ModelTrainer
+    try:
+        with LogContext(stage=PARTITION_TRAINING_ARTIFACT_DIR, partition=partition_value):
+            data_transformation = DataTransformation(data_transformation_config=data_transformation_config,
+                                                     data_ingestion_artifact=data_ingestion_artifact,
+                                                     data_validation_artifact=data_validation_artifact)
+            data_transformation_artifact = data_transformation.initiate_data_transformation()
+            model_trainer = ModelTrainer(model_trainer_config=model_trainer_config,
+                                         data_transformation_artifact=data_transformation_artifact)
+            return model_trainer.initiate_model_trainer()
+    except Exception as e:
+        # HousingException can not be unpickled, the error crosses the process boundary as its message
+        raise Exception(str(e)) from None
+
+
+class PartitionTraining:
+    """
+    One preprocessing object and one model per partition of the dataset, e.g. per ocean_proximity value or
+    per geo tile of latitude and longitude. Ingested train and test files are split into files per partition,
+    then partitions are transformed and trained by spawned worker processes, at most max_workers at a time.
+    A worker loads the files of its partition only, so the stage holds at most max_workers partitions in
+    memory; from python 3.11 a worker also exits after its partition and gives its memory back. Partitions which are too small or fail training are left out of the
+    manifest, their rows are served by the global model.
+    """
+
+    def __init__(self,
+                 partition_training_config:PartitionTrainingConfig,
+                 data_transformation_config:DataTransformationConfig,
+                 model_trainer_config:ModelTrainerConfig,
+                 data_ingestion_artifact:DataIngestionArtifact,
+                 data_validation_artifact:DataValidationArtifact,
+                 dataset_registry:DatasetRegistry = None):
+        """
+        data_transformation_config: DataTransformationConfig of the global model, partitions use it with their own paths
+        model_trainer_config: ModelTrainerConfig of the global model, partitions use it with their own paths
+        """
+        try:
+            logging.info(f"{'='*20}Partition training log started.{'='*20}")
+            self.partition_training_config = partition_training_config
+            self.data_transformation_config = data_transformation_config
+            self.model_trainer_config = model_trainer_config
+            self.data_ingestion_artifact = data_ingestion_artifact
+            self.data_validation_artifact = data_validation_artifact
+            self.dataset_registry = dataset_registry if dataset_registry is not None else DatasetRegistry()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def split_partitions(self) -> tuple:
+        """
+        Write rows of every partition large enough to train into train and test files of its own
+        return: tuple (dict partition value -> DataIngestionArtifact of partition,
+                       dict partition value -> directory name, dict partition value -> skip reason)
+        """
+        try:
+            partition_key = self.partition_training_config.partition_key
+            geo_tile_degrees = self.partition_training_config.geo_tile_degrees
+            min_partition_rows = self.partition_training_config.min_partition_rows
+            schema_file_path = self.data_validation_artifact.schema_file_path
+
+            train_file_path = self.data_ingestion_artifact.train_file_path
+            test_file_path = self.data_ingestion_artifact.test_file_path
+            train_df = load_data(file_path=train_file_path, schema_file_path=schema_file_path, dataset_registry=self.dataset_registry)
+            test_df = load_data(file_path=test_file_path, schema_file_path=schema_file_path, dataset_registry=self.dataset_registry)
+
+            train_partition_values = get_partition_values(dataframe=train_df, partition_key=partition_key,
+                                                          geo_tile_degrees=geo_tile_degrees)
+            test_partition_values = get_partition_values(dataframe=test_df, partition_key=partition_key,
+                                                         geo_tile_degrees=geo_tile_degrees)
+            partition_dir_names = get_partition_dir_names(partition_values=train_partition_values.dropna().unique())
+
+            # rows with a missing key belong to no partition, groupby leaves them out
+            test_partitions = dict(iter(test_df.groupby(test_partition_values)))
+            partition_artifacts = {}
+            skipped_partitions = {}
+            for partition_value, partition_train_df in train_df.groupby(train_partition_values):
+                partition_test_df = test_partitions.get(partition_value)
+                test_row_count = 0 if partition_test_df is None else len(partition_test_df)
+                # r2 of the trainer needs at least two testing rows
+                if len(partition_train_df) < min_partition_rows or test_row_count < 2:
+                    skipped_partitions[partition_value] = (f"{len(partition_train_df)} training and {test_row_count} testing rows, "
+                                                           f"at least {min_partition_rows} and 2 are needed")
+                    continue
+
+                partition_dir = os.path.join(self.partition_training_config.partition_data_dir,
+                                             partition_dir_names[partition_value])
+                partition_train_file_path = os.path.join(partition_dir, PARTITION_TRAIN_DIR, os.path.basename(train_file_path))
+                partition_test_file_path = os.path.join(partition_dir, PARTITION_TEST_DIR, os.path.basename(test_file_path))
+                save_dataframe(file_path=partition_train_file_path, dataframe=partition_train_df)
+                save_dataframe(file_path=partition_test_file_path, dataframe=partition_test_df)
+
+                partition_artifacts[partition_value] = DataIngestionArtifact(train_file_path=partition_train_file_path,
+                                                                             test_file_path=partition_test_file_path,
+                                                                             is_ingested=True,
+                                                                             message=f"Partition [{partition_value}] split successfully")
+            for partition_value, reason in skipped_partitions.items():
+                logging.info("Partition [%s] is served by the global model: %s", partition_value, reason)
+            return partition_artifacts, partition_dir_names, skipped_partitions
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_partition_model_dir(self, partition_dir_name:str) -> str:
+        return os.path.join(self.partition_training_config.partitioned_model_dir, partition_dir_name)
+
+    def get_partition_configs(self, partition_dir_name:str) -> tuple:
+        """
+        Global transformation and trainer configs writing into directories of one partition
+        return: tuple (DataTransformationConfig, ModelTrainerConfig)
+        """
+        try:
+            partition_dir = os.path.join(self.partition_training_config.partition_data_dir, partition_dir_name)
+            partition_model_dir = self.get_partition_model_dir(partition_dir_name=partition_dir_name)
+            data_transformation_config = self.data_transformation_config._replace(
+                incremental_state_dir=None,
+                transformed_train_dir=os.path.join(partition_dir, PARTITION_TRANSFORMED_DIR, PARTITION_TRAIN_DIR),
+                transformed_test_dir=os.path.join(partition_dir, PARTITION_TRANSFORMED_DIR, PARTITION_TEST_DIR),
+                preprocessed_object_file_path=os.path.join(partition_model_dir,
+                                                           os.path.basename(self.data_transformation_config.preprocessed_object_file_path)),
+                preprocessing_kernel_file_path=os.path.join(partition_model_dir,
+                                                            os.path.basename(self.data_transformation_config.preprocessing_kernel_file_path)))
+            # partitions already run in parallel, a search pool per partition would oversubscribe the cores
+            model_trainer_config = self.model_trainer_config._replace(
+                trained_model_file_path=os.path.join(partition_model_dir,
+                                                     os.path.basename(self.model_trainer_config.trained_model_file_path)),
+                search_n_jobs=1)
+            return data_transformation_config, model_trainer_config
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def save_partition_manifest(self, trained_partitions:dict, skipped_partitions:dict) -> None:
+        """
+        partitions.json read by serving to route rows to the model of their partition
+        """
+        try:
+            partition_key = self.partition_training_config.partition_key
+            partition_manifest = {
+                "partition_key": partition_key,
+                "geo_tile_degrees": self.partition_training_config.geo_tile_degrees if partition_key == PARTITION_KEY_GEO_TILE else None,
+                "partitions": dict(sorted(trained_partitions.items())),
+                "skipped_partitions": dict(sorted(skipped_partitions.items()))
+            }
+            partition_manifest_file_path = self.partition_training_config.partition_manifest_file_path
+            os.makedirs(os.path.dirname(partition_manifest_file_path), exist_ok=True)
+            temp_file_path = f"{partition_manifest_file_path}.tmp"
+            with open(temp_file_path, "w") as manifest_file:
+                json.dump(partition_manifest, manifest_file, indent=2)
+            os.replace(temp_file_path, partition_manifest_file_path)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def initiate_partition_training(self) -> PartitionTrainingArtifact:
+        try:
+            partition_key = self.partition_training_config.partition_key
+            if partition_key is None:
+                raise Exception(f"No partition key in [{PARTITION_TRAINING_CONFIG_KEY}]")
+
+            # outputs of an earlier attempt of the run must not end up in the manifest
+            for dir_path in (self.partition_training_config.partition_data_dir, self.partition_training_config.partitioned_model_dir):
+                shutil.rmtree(dir_path, ignore_errors=True)
+
+            logging.info(f"Splitting ingested data by partition key: [{partition_key}]")
+            partition_artifacts, partition_dir_names, skipped_partitions = self.split_partitions()
+            max_workers = min(self.partition_training_config.max_workers, max(len(partition_artifacts), 1))
+
+            trained_partitions = {}
+            with profile_step("train_partitions", partitions=len(partition_artifacts), max_workers=max_workers):
+                if len(partition_artifacts) > 0:
+                    logging.info(f"Training {len(partition_artifacts)} partitions using {max_workers} processes")
+                    # spawned workers do not inherit the threads of stages running concurrently, and a worker
+                    # training one partition only gives its memory back before the next partition starts
+                    executor_options = {}
+                    if sys.version_info >= (3, 11):
+                        executor_options["max_tasks_per_child"] = 1
+                    with ProcessPoolExecutor(max_workers=max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=init_partition_worker,
+                                             initargs=(get_run_id(),),
+                                             **executor_options) as executor:
+                        partition_futures = {}
+                        # largest partitions start first, so a big one does not run alone at the end
+                        for partition_value, partition_artifact in sorted(partition_artifacts.items(),
+                                                                          key=lambda item: os.path.getsize(item[1].train_file_path),
+                                                                          reverse=True):
+                            data_transformation_config, model_trainer_config = self.get_partition_configs(
+                                partition_dir_name=partition_dir_names[partition_value])
+                            future = executor.submit(train_partition, partition_value, partition_artifact,
+                                                     self.data_validation_artifact, data_transformation_config,
+                                                     model_trainer_config)
+                            partition_futures[future] = partition_value
+
+                        for future in as_completed(partition_futures):
+                            partition_value = partition_futures[future]
+                            partition_dir_name = partition_dir_names[partition_value]
+                            try:
+                                model_trainer_artifact = future.result()
+                            except Exception as e:
+                                logging.info("Partition [%s] failed, it is served by the global model: [%s]", partition_value, e)
+                                skipped_partitions[partition_value] = str(e)
+                                shutil.rmtree(self.get_partition_model_dir(partition_dir_name=partition_dir_name), ignore_errors=True)
+                                continue
+
+                            logging.info("Partition [%s] trained: %s", partition_value, model_trainer_artifact)
+                            trained_partitions[partition_value] = {"dir_name": partition_dir_name,
+                                                                   "model_name": model_trainer_artifact.model_name,
+                                                                   "train_rmse": model_trainer_artifact.train_rmse,
+                                                                   "test_rmse": model_trainer_artifact.test_rmse,
+                                                                   "train_accuracy": model_trainer_artifact.train_accuracy,
+                                                                   "test_accuracy": model_trainer_artifact.test_accuracy}
+
+            self.save_partition_manifest(trained_partitions=trained_partitions, skipped_partitions=skipped_partitions)
+
+            partition_training_artifact = PartitionTrainingArtifact(
+                is_trained=len(trained_partitions) > 0,
+                message=f"{len(trained_partitions)} partitions trained, {len(skipped_partitions)} served by the global model",
+                partitioned_model_dir=self.partition_training_config.partitioned_model_dir,
+                partition_manifest_file_path=self.partition_training_config.partition_manifest_file_path,
+                partition_count=len(trained_partitions))
+            logging.info("Partition training artifact: %s", partition_training_artifact)
+            return partition_training_artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def __del__(self):
+        logging.info(f"{'='*20}Partition training log completed.{'='*20}\n\n")
@@ -1,6 +1,7 @@
 
 from housing.entity.config_entity import DataIngestionConfig, DataValidationConfig, DataTransformationConfig, \
-    ModelTrainerConfig, ModelEvaluationConfig, ModelPusherConfig, TrainingPipelineConfig
+    ModelTrainerConfig, ModelEvaluationConfig, ModelPusherConfig, ModelServingConfig, TrainingPipelineConfig, \
+    PartitionTrainingConfig
 from housing.util.util import read_yaml_file
 from housing.logger import logging
 import sys, os
@@ -30,18 +31,40 @@ class Configuration:
             
             data_ingestion_info = self.config_info[DATA_INGESTION_CONFIG_KEY]
             dataset_download_url = data_ingestion_info[DATA_INGESTION_DOWNLOAD_URL_KEY]
-            raw_data_dir = os.path.join(data_ingestion_artifact_dir,data_ingestion_info[DATA_INGESTION_RAW_DATA_DIR_KEY])
-            tgz_download_dir = os.path.join(data_ingestion_artifact_dir,data_ingestion_info[DATA_INGESTION_TGZ_DOWNLOAD_DIR_KEY])
+            dataset_checksum = data_ingestion_info.get(DATA_INGESTION_DATASET_CHECKSUM_KEY)
+            # not time stamped, downloads are shared by every run
+            download_cache_dir = os.path.join(artifact_dir,
+                                              data_ingestion_info.get(DATA_INGESTION_DOWNLOAD_CACHE_DIR_KEY, DOWNLOAD_CACHE_DIR))
             ingested_data_dir = os.path.join(data_ingestion_artifact_dir,data_ingestion_info[DATA_INGESTION_INGESTED_DIR_KEY])
             ingested_train_dir = os.path.join(ingested_data_dir,data_ingestion_info[DATA_INGESTION_INGESTED_TRAIN_DIR_KEY])
             ingested_test_dir = os.path.join(ingested_data_dir,data_ingestion_info[DATA_INGESTION_INGESTED_TEST_DIR_KEY])
+            split_chunk_size = data_ingestion_info.get(DATA_INGESTION_SPLIT_CHUNK_SIZE_KEY)
+            ingested_file_format = data_ingestion_info.get(DATA_INGESTION_INGESTED_FILE_FORMAT_KEY, FILE_FORMAT_CSV)
+
+            if ingested_file_format not in FILE_FORMAT_EXTENSION:
+                raise Exception(f"Ingested file format: [{ingested_file_format}] is not one of {list(FILE_FORMAT_EXTENSION.keys())}")
+
+            incremental_partition_dir = data_ingestion_info.get(DATA_INGESTION_INCREMENTAL_PARTITION_DIR_KEY)
+            incremental_state_dir = None
+            if incremental_partition_dir is not None:
+                if ingested_file_format != FILE_FORMAT_CSV:
+                    raise Exception(f"Incremental ingestion appends rows and requires [{FILE_FORMAT_CSV}] ingested file format")
+                incremental_partition_dir = os.path.join(ROOT_DIR, incremental_partition_dir)
+                # not time stamped, shared by every incremental run
+                incremental_state_dir = os.path.join(self.training_pipeline_config.artifact_dir,
+                                                     INCREMENTAL_STATE_DIR,
+                                                     DATA_INGESTION_ARTIFACT_DIR)
 
             data_ingestion_config = DataIngestionConfig(
                 dataset_download_url=dataset_download_url,
-                tgz_download_dir=tgz_download_dir,
-                raw_data_dir=raw_data_dir,
+                dataset_checksum=dataset_checksum,
+                download_cache_dir=download_cache_dir,
                 ingested_train_dir=ingested_train_dir,
-                ingested_test_dir=ingested_test_dir
+                ingested_test_dir=ingested_test_dir,
+                split_chunk_size=split_chunk_size,
+                ingested_file_format=ingested_file_format,
+                incremental_partition_dir=incremental_partition_dir,
+                incremental_state_dir=incremental_state_dir
             )
 
             return data_ingestion_config
@@ -65,9 +88,21 @@ class Configuration:
             report_page_file_path = os.path.join(data_validation_artifact_dir,
                                                  data_validation_config[DATA_VALIDATION_REPORT_PAGE_FILE_NAME_KEY])
 
+            schema_report_file_path = os.path.join(data_validation_artifact_dir,
+                                                   data_validation_config[DATA_VALIDATION_SCHEMA_REPORT_FILE_NAME_KEY])
+
+            drift_backend = data_validation_config.get(DATA_VALIDATION_DRIFT_BACKEND_KEY, DRIFT_BACKEND_EVIDENTLY)
+            drift_sample_size = data_validation_config.get(DATA_VALIDATION_DRIFT_SAMPLE_SIZE_KEY)
+
+            if drift_backend not in (DRIFT_BACKEND_EVIDENTLY, DRIFT_BACKEND_NATIVE):
+                raise Exception(f"Drift backend: [{drift_backend}] is not one of {[DRIFT_BACKEND_EVIDENTLY, DRIFT_BACKEND_NATIVE]}")
+
             data_validation_config = DataValidationConfig(schema_file_path=schema_file_path,
                                                           report_file_path=report_file_path,
-                                                          report_page_file_path=report_page_file_path)
+                                                          report_page_file_path=report_page_file_path,
+                                                          schema_report_file_path=schema_report_file_path,
+                                                          drift_backend=drift_backend,
+                                                          drift_sample_size=drift_sample_size)
 
             return data_validation_config
         except Exception as e:
@@ -83,6 +118,14 @@ class Configuration:
             data_transformation_config_info = self.config_info[DATA_TRANSFORMATION_CONFIG_KEY]
 
             add_bedroom_per_room=data_transformation_config_info[DATA_TRANSFORMATION_ADD_BEDROOM_PER_ROOM_KEY]
+            feature_dtype=data_transformation_config_info.get(DATA_TRANSFORMATION_FEATURE_DTYPE_KEY, FEATURE_DTYPES[0])
+            if feature_dtype not in FEATURE_DTYPES:
+                raise Exception(f"Feature dtype: [{feature_dtype}] is not one of {FEATURE_DTYPES}")
+            transform_chunk_size=data_transformation_config_info.get(DATA_TRANSFORMATION_TRANSFORM_CHUNK_SIZE_KEY)
+            incremental_state_dir=None
+            if data_transformation_config_info.get(DATA_TRANSFORMATION_INCREMENTAL_KEY, False):
+                incremental_state_dir=os.path.join(artifact_dir, INCREMENTAL_STATE_DIR, DATA_TRANSFORMATION_ARTIFACT_DIR)
+            median_sketch_size=data_transformation_config_info.get(DATA_TRANSFORMATION_MEDIAN_SKETCH_SIZE_KEY, 100000)
             transformed_train_dir=os.path.join(data_transformation_artifact_dir,
                                                data_transformation_config_info[DATA_TRANSFORMATION_TRANSFORMED_DIR_KEY],
                                                data_transformation_config_info[DATA_TRANSFORMATION_TRANSFORMED_TRAIN_DIR_KEY])
@@ -92,14 +135,22 @@ class Configuration:
             preprocessed_object_file_path=os.path.join(data_transformation_artifact_dir,
                                                        data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY],
                                                        data_transformation_config_info[DATA_TRANSFORMATION__PREPROCESSED_OBJECT_FILE_NAME_KEY],)
+            preprocessing_kernel_file_path=os.path.join(data_transformation_artifact_dir,
+                                                        data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY],
+                                                        data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSING_KERNEL_FILE_NAME_KEY])
             
             data_transformation_config = DataTransformationConfig(add_bedroom_per_room=add_bedroom_per_room,
+                                                                  feature_dtype=feature_dtype,
+                                                                  transform_chunk_size=transform_chunk_size,
+                                                                  incremental_state_dir=incremental_state_dir,
+                                                                  median_sketch_size=median_sketch_size,
                                                                   transformed_train_dir=transformed_train_dir,
                                                                   transformed_test_dir=transformed_test_dir,
-                                                                  preprocessed_object_file_path=preprocessed_object_file_path)
+                                                                  preprocessed_object_file_path=preprocessed_object_file_path,
+                                                                  preprocessing_kernel_file_path=preprocessing_kernel_file_path)
 
 
-            logging.info(f"Data transformation config: {data_transformation_config}")
+            logging.info("Data transformation config: %s", data_transformation_config)
             return data_transformation_config                                               
 
         except Exception as e:
@@ -107,19 +158,133 @@ class Configuration:
 
     def get_model_trainer_config(self) -> ModelTrainerConfig:
         try:
-            pass
+            artifact_dir = self.training_pipeline_config.artifact_dir
+            model_trainer_artifact_dir = os.path.join(artifact_dir,
+                                                      MODEL_TRAINER_ARTIFACT_DIR,
+                                                      self.time_stamp)
+
+            model_trainer_config_info = self.config_info[MODEL_TRAINER_CONFIG_KEY]
+
+            trained_model_file_path = os.path.join(model_trainer_artifact_dir,
+                                                   model_trainer_config_info[MODEL_TRAINER_TRAINED_MODEL_DIR_KEY],
+                                                   model_trainer_config_info[MODEL_TRAINER_MODEL_FILE_NAME_KEY])
+            model_config_file_path = os.path.join(ROOT_DIR,
+                                                  model_trainer_config_info[MODEL_TRAINER_MODEL_CONFIG_DIR_KEY],
+                                                  model_trainer_config_info[MODEL_TRAINER_MODEL_CONFIG_FILE_NAME_KEY])
+            base_accuracy = model_trainer_config_info[MODEL_TRAINER_BASE_ACCURACY_KEY]
+
+            model_trainer_config = ModelTrainerConfig(trained_model_file_path=trained_model_file_path,
+                                                      base_accuracy=base_accuracy,
+                                                      model_config_file_path=model_config_file_path,
+                                                      search_n_jobs=None)
+            logging.info("Model trainer config: %s", model_trainer_config)
+            return model_trainer_config
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_partition_training_config(self) -> PartitionTrainingConfig:
+        try:
+            artifact_dir = self.training_pipeline_config.artifact_dir
+            partition_training_artifact_dir = os.path.join(artifact_dir,
+                                                           PARTITION_TRAINING_ARTIFACT_DIR,
+                                                           self.time_stamp)
+
+            partition_training_config_info = self.config_info.get(PARTITION_TRAINING_CONFIG_KEY) or {}
+
+            geo_tile_degrees = partition_training_config_info.get(PARTITION_TRAINING_GEO_TILE_DEGREES_KEY, 2.0)
+            if geo_tile_degrees is None or geo_tile_degrees <= 0:
+                raise Exception(f"Geo tile degrees: [{geo_tile_degrees}] must be greater than 0")
+            max_workers = partition_training_config_info.get(PARTITION_TRAINING_MAX_WORKERS_KEY)
+            max_workers = os.cpu_count() if max_workers is None or max_workers < 1 else max_workers
+
+            partition_data_dir = os.path.join(partition_training_artifact_dir,
+                                              partition_training_config_info.get(PARTITION_TRAINING_PARTITION_DATA_DIR_KEY,
+                                                                                 "partition_data"))
+            partitioned_model_dir = os.path.join(partition_training_artifact_dir, PARTITIONED_MODEL_DIR)
+            partition_manifest_file_path = os.path.join(partitioned_model_dir, PARTITION_MANIFEST_FILE_NAME)
+
+            partition_training_config = PartitionTrainingConfig(
+                partition_key=partition_training_config_info.get(PARTITION_TRAINING_PARTITION_KEY_KEY),
+                geo_tile_degrees=geo_tile_degrees,
+                max_workers=max_workers,
+                min_partition_rows=partition_training_config_info.get(PARTITION_TRAINING_MIN_PARTITION_ROWS_KEY, 500),
+                partition_data_dir=partition_data_dir,
+                partitioned_model_dir=partitioned_model_dir,
+                partition_manifest_file_path=partition_manifest_file_path
+            )
+            logging.info("Partition training config: %s", partition_training_config)
+            return partition_training_config
         except Exception as e:
             raise HousingException(e,sys) from e
 
     def get_model_evaluation_config(self) -> ModelEvaluationConfig:
         try:
-            pass
+            model_evaluation_config_info = self.config_info[MODEL_EVALUATION_CONFIG_KEY]
+            model_pusher_config_info = self.config_info[MODEL_PUSHER_CONFIG_KEY]
+            model_trainer_config_info = self.config_info[MODEL_TRAINER_CONFIG_KEY]
+            data_transformation_config_info = self.config_info[DATA_TRANSFORMATION_CONFIG_KEY]
+
+            # evaluation history of every run is kept in one file
+            model_evaluation_file_path = os.path.join(self.training_pipeline_config.artifact_dir,
+                                                      MODEL_EVALUATION_ARTIFACT_DIR,
+                                                      model_evaluation_config_info[MODEL_EVALUATION_FILE_NAME_KEY])
+            confidence_level = model_evaluation_config_info.get(MODEL_EVALUATION_CONFIDENCE_LEVEL_KEY, 0.95)
+            if not 0 < confidence_level < 1:
+                raise Exception(f"Confidence level: [{confidence_level}] must be between 0 and 1")
+
+            model_evaluation_config = ModelEvaluationConfig(
+                model_evaluation_file_path=model_evaluation_file_path,
+                time_stamp=self.time_stamp,
+                export_dir_path=os.path.join(ROOT_DIR, model_pusher_config_info[MODEL_PUSHER_MODEL_EXPORT_DIR_KEY]),
+                model_file_name=model_trainer_config_info[MODEL_TRAINER_MODEL_FILE_NAME_KEY],
+                preprocessed_object_file_name=data_transformation_config_info[DATA_TRANSFORMATION__PREPROCESSED_OBJECT_FILE_NAME_KEY],
+                preprocessing_kernel_file_name=data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSING_KERNEL_FILE_NAME_KEY],
+                bootstrap_sample_count=model_evaluation_config_info.get(MODEL_EVALUATION_BOOTSTRAP_SAMPLE_COUNT_KEY, 2000),
+                confidence_level=confidence_level,
+                random_state=model_evaluation_config_info.get(MODEL_EVALUATION_RANDOM_STATE_KEY, 42)
+            )
+            logging.info("Model evaluation config: %s", model_evaluation_config)
+            return model_evaluation_config
         except Exception as e:
             raise HousingException(e,sys) from e
 
     def get_model_pusher_config(self) -> ModelPusherConfig:
         try:
-            pass
+            model_pusher_config_info = self.config_info[MODEL_PUSHER_CONFIG_KEY]
+            export_dir_path = os.path.join(ROOT_DIR, model_pusher_config_info[MODEL_PUSHER_MODEL_EXPORT_DIR_KEY])
+
+            # run time stamp is the model version, versions sort in publish order
+            model_pusher_config = ModelPusherConfig(export_dir_path=export_dir_path, model_version=self.time_stamp)
+            logging.info("Model pusher config: %s", model_pusher_config)
+            return model_pusher_config
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_model_serving_config(self) -> ModelServingConfig:
+        try:
+            model_serving_config_info = self.config_info[MODEL_SERVING_CONFIG_KEY]
+            model_pusher_config_info = self.config_info[MODEL_PUSHER_CONFIG_KEY]
+            model_trainer_config_info = self.config_info[MODEL_TRAINER_CONFIG_KEY]
+            data_transformation_config_info = self.config_info[DATA_TRANSFORMATION_CONFIG_KEY]
+            data_validation_config_info = self.config_info[DATA_VALIDATION_CONFIG_KEY]
+
+            export_dir_path = os.path.join(ROOT_DIR, model_pusher_config_info[MODEL_PUSHER_MODEL_EXPORT_DIR_KEY])
+            schema_file_path = os.path.join(ROOT_DIR,
+                                            data_validation_config_info[DATA_VALIDATION_SCHEMA_DIR_KEY],
+                                            data_validation_config_info[DATA_VALIDATION_SCHEMA_FILE_NAME_KEY])
+
+            model_serving_config = ModelServingConfig(
+                export_dir_path=export_dir_path,
+                model_file_name=model_trainer_config_info[MODEL_TRAINER_MODEL_FILE_NAME_KEY],
+                preprocessed_object_file_name=data_transformation_config_info[DATA_TRANSFORMATION__PREPROCESSED_OBJECT_FILE_NAME_KEY],
+                preprocessing_kernel_file_name=data_transformation_config_info[DATA_TRANSFORMATION_PREPROCESSING_KERNEL_FILE_NAME_KEY],
+                schema_file_path=schema_file_path,
+                max_batch_size=model_serving_config_info[MODEL_SERVING_MAX_BATCH_SIZE_KEY],
+                max_batch_wait_ms=model_serving_config_info[MODEL_SERVING_MAX_BATCH_WAIT_MS_KEY],
+                model_poll_interval_seconds=model_serving_config_info.get(MODEL_SERVING_MODEL_POLL_INTERVAL_SECONDS_KEY, 10)
+            )
+            logging.info("Model serving config: %s", model_serving_config)
+            return model_serving_config
         except Exception as e:
             raise HousingException(e,sys) from e
 
@@ -131,8 +296,17 @@ class Configuration:
                                         training_pipeline_config[TRAINING_PIPELINE_ARTIFACT_DIR_KEY]
                                        )
            
-            training_pipeline_config = TrainingPipelineConfig(artifact_dir=artifact_dir)
-            logging.info(f"Training pipeline config: {training_pipeline_config}")
+            use_stage_cache = training_pipeline_config.get(TRAINING_PIPELINE_USE_STAGE_CACHE_KEY, False)
+            run_profile = training_pipeline_config.get(TRAINING_PIPELINE_RUN_PROFILE_KEY, False)
+            cprofile_stages = training_pipeline_config.get(TRAINING_PIPELINE_CPROFILE_STAGES_KEY) or []
+            max_concurrent_stages = training_pipeline_config.get(TRAINING_PIPELINE_MAX_CONCURRENT_STAGES_KEY, 1)
+
+            training_pipeline_config = TrainingPipelineConfig(artifact_dir=artifact_dir,
+                                                              use_stage_cache=use_stage_cache,
+                                                              run_profile=run_profile,
+                                                              cprofile_stages=cprofile_stages,
+                                                              max_concurrent_stages=max_concurrent_stages)
+            logging.info("Training pipeline config: %s", training_pipeline_config)
             return training_pipeline_config
         except Exception as e:
             raise HousingException(e,sys) from e
\ No newline at end of file
@@ -14,17 +14,49 @@ CURRENT_TIME_STAMP = f"{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}"
 TRAINING_PIPELINE_CONFIG_KEY = "training_pipeline_config"
 TRAINING_PIPELINE_ARTIFACT_DIR_KEY = "artifact_dir"
 TRAINING_PIPELINE_NAME = "pipeline_name"
+TRAINING_PIPELINE_USE_STAGE_CACHE_KEY = "use_stage_cache"
+TRAINING_PIPELINE_RUN_PROFILE_KEY = "run_profile"
+TRAINING_PIPELINE_CPROFILE_STAGES_KEY = "cprofile_stages"
+TRAINING_PIPELINE_MAX_CONCURRENT_STAGES_KEY = "max_concurrent_stages"
+
+RUN_PROFILE_DIR = "run_profile"
+RUN_PROFILE_FILE_NAME = "profile.json"
+
+PIPELINE_RUN_STATE_DIR = "pipeline_run"
+PIPELINE_RUN_STATE_FILE_NAME = "run_state.json"
+
+# Stage cache related variable
+STAGE_CACHE_DIR = "stage_cache"
 
 # Data Ingestion related variable
 
 DATA_INGESTION_CONFIG_KEY = "data_ingestion_config"
 DATA_INGESTION_ARTIFACT_DIR = "data_ingestion"
 DATA_INGESTION_DOWNLOAD_URL_KEY = "dataset_download_url"
-DATA_INGESTION_RAW_DATA_DIR_KEY = "raw_data_dir"
-DATA_INGESTION_TGZ_DOWNLOAD_DIR_KEY = "tgz_download_dir"
+DATA_INGESTION_DATASET_CHECKSUM_KEY = "dataset_checksum"
+DATA_INGESTION_DOWNLOAD_CACHE_DIR_KEY = "download_cache_dir"
 DATA_INGESTION_INGESTED_DIR_KEY = "ingested_dir"
 DATA_INGESTION_INGESTED_TRAIN_DIR_KEY = "ingested_train_dir"
 DATA_INGESTION_INGESTED_TEST_DIR_KEY = "ingested_test_dir"
+DATA_INGESTION_SPLIT_CHUNK_SIZE_KEY = "split_chunk_size"
+DATA_INGESTION_INGESTED_FILE_FORMAT_KEY = "ingested_file_format"
+DATA_INGESTION_INCREMENTAL_PARTITION_DIR_KEY = "incremental_partition_dir"
+
+DOWNLOAD_CACHE_DIR = "download_cache"
+DOWNLOAD_CACHE_URL_DIR = "urls"
+DOWNLOAD_CACHE_BLOB_DIR = "blobs"
+DOWNLOAD_CACHE_PARTIAL_DIR = "partial"
+DOWNLOAD_TIMEOUT_SECONDS = 60
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+FILE_FORMAT_CSV = "csv"
+FILE_FORMAT_PARQUET = "parquet"
+FILE_FORMAT_EXTENSION = {FILE_FORMAT_CSV: ".csv", FILE_FORMAT_PARQUET: ".parquet"}
+
+DATA_INGESTION_TEST_SIZE = 0.2
+DATA_INGESTION_RANDOM_STATE = 42
+INCOME_CATEGORY_BINS = [0.0, 1.5, 3.0, 4.5, 6.0, float("inf")]
+INCOME_CATEGORY_LABELS = [1,2,3,4,5]
 
 
 # Data Validation related variable
@@ -33,8 +65,15 @@ DATA_VALIDATION_CONFIG_KEY = "data_validation_config"
 DATA_VALIDATION_SCHEMA_DIR_KEY = "schema_dir"
 DATA_VALIDATION_SCHEMA_FILE_NAME_KEY = "schema_file_name"
 DATA_VALIDATION_ARTIFACT_DIR_NAME = "data_validation"
+DATA_DRIFT_STAGE_NAME = "data_drift"
 DATA_VALIDATION_REPORT_FILE_NAME = "report_file_name"
 DATA_VALIDATION_REPORT_PAGE_FILE_NAME_KEY = "report_page_file_name"
+DATA_VALIDATION_SCHEMA_REPORT_FILE_NAME_KEY = "schema_report_file_name"
+DATA_VALIDATION_DRIFT_BACKEND_KEY = "drift_backend"
+DATA_VALIDATION_DRIFT_SAMPLE_SIZE_KEY = "drift_sample_size"
+
+DRIFT_BACKEND_EVIDENTLY = "evidently"
+DRIFT_BACKEND_NATIVE = "native"
 
 # Dataset Schema related variables
 
@@ -43,19 +82,104 @@ DATASET_SCHEMA_TARGET_COLUMN = "target_column"
 DATASET_SCHEMA_DOMAIN_VALUE = "domain_value"
 DATASET_SCHEMA_NUMERICAL_COLUMN = "numerical_column"
 DATASET_SCHEMA_CATEGORICAL_COLUMN = "categorical_column"
+DATASET_SCHEMA_MAX_NULL_RATIO = "max_null_ratio"
+DATASET_SCHEMA_VALUE_RANGE = "value_range"
+DATASET_SCHEMA_VALUE_RANGE_MIN = "min"
+DATASET_SCHEMA_VALUE_RANGE_MAX = "max"
+DATASET_SCHEMA_DEFAULT_MAX_NULL_RATIO = 0.0
+DATASET_SCHEMA_FLOAT_DTYPE = "float_dtype"
+DATASET_SCHEMA_FLOAT_DTYPES = ["float64", "float32"]
+
+SCHEMA_DTYPE_MAPPING = {"float": "float64", "int": "int64", "category": "category", "str": "object"}
 
 # Data Transformation related variable
 
 DATA_TRANSFORMATION_ARTIFACT_DIR = "data_transformation"
 DATA_TRANSFORMATION_CONFIG_KEY = "data_transformation_config"
 DATA_TRANSFORMATION_ADD_BEDROOM_PER_ROOM_KEY = "add_bedroom_per_room"
+DATA_TRANSFORMATION_FEATURE_DTYPE_KEY = "feature_dtype"
+FEATURE_DTYPES = ["float64", "float32"]
+DATA_TRANSFORMATION_TRANSFORM_CHUNK_SIZE_KEY = "transform_chunk_size"
+DATA_TRANSFORMATION_INCREMENTAL_KEY = "incremental"
+DATA_TRANSFORMATION_MEDIAN_SKETCH_SIZE_KEY = "median_sketch_size"
 DATA_TRANSFORMATION_TRANSFORMED_DIR_KEY = "transformed_dir"
 DATA_TRANSFORMATION_TRANSFORMED_TRAIN_DIR_KEY  = "transformed_train_dir"
 DATA_TRANSFORMATION_TRANSFORMED_TEST_DIR_KEY = "transformed_test_dir"
 DATA_TRANSFORMATION_PREPROCESSING_DIR_KEY = "preprocessing_dir"
 DATA_TRANSFORMATION__PREPROCESSED_OBJECT_FILE_NAME_KEY = "preprocessed_object_file_name"
+DATA_TRANSFORMATION_PREPROCESSING_KERNEL_FILE_NAME_KEY = "preprocessing_kernel_file_name"
 
 COLUMN_TOTAL_ROOMS = "total_rooms"
 COLUMN_POPULATION = "population"
 COLUMN_HOUSEHOLDS = "households"
-COLUMN_TOTAL_BEDROOM = "total_bedrooms"
\ No newline at end of file
+COLUMN_TOTAL_BEDROOM = "total_bedrooms"
+COLUMN_MEDIAN_INCOME = "median_income"
+COLUMN_INCOME_CATEGORY = "income_cat"
+
+# Incremental mode related variable, state of incremental stages is kept across runs
+INCREMENTAL_STATE_DIR = "incremental"
+INCREMENTAL_STATE_FILE_NAME = "state.json"
+INCREMENTAL_TRAIN_DIR = "train"
+INCREMENTAL_TEST_DIR = "test"
+INCREMENTAL_DATASET_FILE_NAME = "housing.csv"
+INCREMENTAL_PREPROCESSING_STATE_FILE_NAME = "preprocessing_state.pkl"
+
+# Model Trainer related variable
+MODEL_TRAINER_ARTIFACT_DIR = "model_trainer"
+MODEL_TRAINER_CONFIG_KEY = "model_trainer_config"
+MODEL_TRAINER_TRAINED_MODEL_DIR_KEY = "trained_model_dir"
+MODEL_TRAINER_MODEL_FILE_NAME_KEY = "model_file_name"
+MODEL_TRAINER_BASE_ACCURACY_KEY = "base_accuracy"
+MODEL_TRAINER_MODEL_CONFIG_DIR_KEY = "model_config_dir"
+MODEL_TRAINER_MODEL_CONFIG_FILE_NAME_KEY = "model_config_file_name"
+
+# Model factory related variable, keys of model.yaml
+MODEL_SEARCH_KEY = "search"
+MODEL_SEARCH_N_JOBS_KEY = "n_jobs"
+MODEL_SEARCH_CV_KEY = "cv"
+MODEL_SEARCH_MIN_RESOURCES_KEY = "min_resources"
+MODEL_SEARCH_FACTOR_KEY = "factor"
+MODEL_SEARCH_RANDOM_STATE_KEY = "random_state"
+MODEL_SELECTION_KEY = "model_selection"
+MODEL_CLASS_KEY = "class"
+MODEL_MODULE_KEY = "module"
+MODEL_PARAMS_KEY = "params"
+MODEL_SEARCH_PARAM_GRID_KEY = "search_param_grid"
+
+# Partition training related variable
+PARTITION_TRAINING_ARTIFACT_DIR = "partition_training"
+PARTITION_TRAINING_CONFIG_KEY = "partition_training_config"
+PARTITION_TRAINING_PARTITION_KEY_KEY = "partition_key"
+PARTITION_TRAINING_GEO_TILE_DEGREES_KEY = "geo_tile_degrees"
+PARTITION_TRAINING_MAX_WORKERS_KEY = "max_workers"
+PARTITION_TRAINING_MIN_PARTITION_ROWS_KEY = "min_partition_rows"
+PARTITION_TRAINING_PARTITION_DATA_DIR_KEY = "partition_data_dir"
+PARTITION_KEY_GEO_TILE = "geo_tile"
+PARTITION_GEO_TILE_LATITUDE_COLUMN = "latitude"
+PARTITION_GEO_TILE_LONGITUDE_COLUMN = "longitude"
+PARTITION_TRAIN_DIR = "train"
+PARTITION_TEST_DIR = "test"
+PARTITION_TRANSFORMED_DIR = "transformed_data"
+# directory of partition models inside a model version, its name is fixed so serving can find it
+PARTITIONED_MODEL_DIR = "partitions"
+PARTITION_MANIFEST_FILE_NAME = "partitions.json"
+
+# Model Evaluation related variable
+MODEL_EVALUATION_ARTIFACT_DIR = "model_evaluation"
+MODEL_EVALUATION_CONFIG_KEY = "model_evaluation_config"
+MODEL_EVALUATION_FILE_NAME_KEY = "model_evaluation_file_name"
+MODEL_EVALUATION_BOOTSTRAP_SAMPLE_COUNT_KEY = "bootstrap_sample_count"
+MODEL_EVALUATION_CONFIDENCE_LEVEL_KEY = "confidence_level"
+MODEL_EVALUATION_RANDOM_STATE_KEY = "random_state"
+
+# Model Pusher related variable
+MODEL_PUSHER_CONFIG_KEY = "model_pusher_config"
+MODEL_PUSHER_MODEL_EXPORT_DIR_KEY = "model_export_dir"
+MODEL_PUSHER_ARTIFACT_DIR = "model_pusher"
+MODEL_REGISTRY_CURRENT_VERSION_FILE_NAME = "CURRENT"
+
+# Model Serving related variable
+MODEL_SERVING_CONFIG_KEY = "model_serving_config"
+MODEL_SERVING_MAX_BATCH_SIZE_KEY = "max_batch_size"
+MODEL_SERVING_MAX_BATCH_WAIT_MS_KEY = "max_batch_wait_ms"
+MODEL_SERVING_MODEL_POLL_INTERVAL_SECONDS_KEY = "model_poll_interval_seconds"
@@ -2,7 +2,19 @@ from collections import namedtuple
 
 DataIngestionArtifact = namedtuple("DataIngestionArtifact",[ "train_file_path" , "test_file_path" , "is_ingested" , "message" ])
 
-DataValidationArtifact = namedtuple("DataValidationArtifact",[ "schema_file_path" , "report_file_path" ,"report_page_file_path", "is_validated" , "message" ])
+DataValidationArtifact = namedtuple("DataValidationArtifact",[ "schema_file_path" , "schema_report_file_path", "is_validated" , "message" ])
+
+DataDriftArtifact = namedtuple("DataDriftArtifact",[ "report_file_path" , "report_page_file_path" , "is_report_saved" , "message" ])
  
-DataTransformationArtifact = namedtuple("DataTransformationArtifact",[ "is_transformed" , "message" ,"transformed_train_file_path", "transformed_test_file_path","preprocessed_object_file_path"])
- 
\ No newline at end of file
+DataTransformationArtifact = namedtuple("DataTransformationArtifact",[ "is_transformed" , "message" ,"transformed_train_file_path", "transformed_test_file_path","preprocessed_object_file_path","preprocessing_kernel_file_path"])
+
+ModelTrainerArtifact = namedtuple("ModelTrainerArtifact",[ "is_trained" , "message" , "trained_model_file_path" , "model_name" ,
+                                                           "train_rmse" , "test_rmse" , "train_accuracy" , "test_accuracy" ])
+
+PartitionTrainingArtifact = namedtuple("PartitionTrainingArtifact",[ "is_trained" , "message" , "partitioned_model_dir" ,
+                                                                     "partition_manifest_file_path" , "partition_count" ])
+
+ModelEvaluationArtifact = namedtuple("ModelEvaluationArtifact",[ "is_model_accepted" , "message" , "trained_model_file_path" ,
+                                                                 "model_evaluation_file_path" ])
+
+ModelPusherArtifact = namedtuple("ModelPusherArtifact",[ "is_model_pushed" , "export_dir_path" , "model_version" ])
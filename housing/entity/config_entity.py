@@ -1,23 +1,60 @@
 from collections import namedtuple
 
 DataIngestionConfig = namedtuple("DataIngestionConfig",["dataset_download_url",
-                                                        "tgz_download_dir",
-                                                        "raw_data_dir",
+                                                        "dataset_checksum",
+                                                        "download_cache_dir",
                                                         "ingested_train_dir",
-                                                        "ingested_test_dir"])
+                                                        "ingested_test_dir",
+                                                        "split_chunk_size",
+                                                        "ingested_file_format",
+                                                        "incremental_partition_dir",
+                                                        "incremental_state_dir"])
 
-DataValidationConfig = namedtuple("DataValidationConfig",["schema_file_path", "report_file_path","report_page_file_path"])
+DataValidationConfig = namedtuple("DataValidationConfig",["schema_file_path", "report_file_path","report_page_file_path",
+                                                          "schema_report_file_path", "drift_backend", "drift_sample_size"])
 
 DataTransformationConfig = namedtuple("DataTransformationConfig",["add_bedroom_per_room",
+                                                                  "feature_dtype",
+                                                                  "transform_chunk_size",
+                                                                  "incremental_state_dir",
+                                                                  "median_sketch_size",
                                                                   "transformed_train_dir",
                                                                   "transformed_test_dir",
-                                                                  "preprocessed_object_file_path"])
+                                                                  "preprocessed_object_file_path",
+                                                                  "preprocessing_kernel_file_path"])
 
 ModelTrainerConfig = namedtuple("ModelTrainerConfig",["trained_model_file_path",
-                                                      "base_accuracy"])
+                                                      "base_accuracy",
+                                                      "model_config_file_path",
+                                                      "search_n_jobs"])
 
-ModelEvaluationConfig = namedtuple("ModelEvaluationConfig",["model_evaluation_file_path", "time_stamp"])
+PartitionTrainingConfig = namedtuple("PartitionTrainingConfig",["partition_key",
+                                                                "geo_tile_degrees",
+                                                                "max_workers",
+                                                                "min_partition_rows",
+                                                                "partition_data_dir",
+                                                                "partitioned_model_dir",
+                                                                "partition_manifest_file_path"])
 
-ModelPusherConfig = namedtuple("ModelPusherConfig",["export_dir_path"])
+ModelEvaluationConfig = namedtuple("ModelEvaluationConfig",["model_evaluation_file_path", "time_stamp",
+                                                            "export_dir_path",
+                                                            "model_file_name",
+                                                            "preprocessed_object_file_name",
+                                                            "preprocessing_kernel_file_name",
+                                                            "bootstrap_sample_count",
+                                                            "confidence_level",
+                                                            "random_state"])
 
-TrainingPipelineConfig = namedtuple("TrainingPipelineConfig",["artifact_dir"])
+ModelPusherConfig = namedtuple("ModelPusherConfig",["export_dir_path", "model_version"])
+
+ModelServingConfig = namedtuple("ModelServingConfig",["export_dir_path",
+                                                      "model_file_name",
+                                                      "preprocessed_object_file_name",
+                                                      "preprocessing_kernel_file_name",
+                                                      "schema_file_path",
+                                                      "max_batch_size",
+                                                      "max_batch_wait_ms",
+                                                      "model_poll_interval_seconds"])
+
+TrainingPipelineConfig = namedtuple("TrainingPipelineConfig",["artifact_dir", "use_stage_cache", "run_profile", "cprofile_stages",
+                                                                 "max_concurrent_stages"])
@@ -0,0 +1,202 @@
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.util.dataset_schema import get_dataset_schema
+from housing.util.util import load_preprocessing_obj, load_object
+from housing.util.array_bundle import is_array_bundle_file
+from housing.util.preprocessing_kernel import PreprocessingKernel
+from housing.util.partition import get_partition_values
+from housing.constant import *
+import os, sys
+import json
+import numpy as np
+import pandas as pd
+
+
+class HousingData:
+    """
+    Input rows of a prediction request, checked against the columns of schema.yaml
+    """
+
+    def __init__(self, schema_file_path:str) -> None:
+        try:
+            dataset_schema = get_dataset_schema(schema_file_path=schema_file_path)
+            self.input_dtypes = dataset_schema.input_dtypes
+            self.input_columns = dataset_schema.input_columns
+            self.domain_value = {column: list(domain_values) for column, domain_values in dataset_schema.domain_value.items()
+                                 if column in self.input_columns}
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_housing_input_data_frame(self, dataframe:pd.DataFrame) -> pd.DataFrame:
+        """
+        Keep schema input columns in schema order with schema dtypes, values of columns having a schema
+        domain must be missing or one of the domain values
+        dataframe: pd.DataFrame rows sent by client
+        """
+        try:
+            missing_columns = [column for column in self.input_columns if column not in dataframe.columns]
+            if len(missing_columns) > 0:
+                raise ValueError(f"Input is missing columns: {missing_columns}")
+            input_data_frame = dataframe[self.input_columns].astype(self.input_dtypes)
+
+            # preprocessing imputes missing values but can not encode unknown categories
+            for column, domain_values in self.domain_value.items():
+                column_values = input_data_frame[column]
+                is_out_of_domain = column_values.notna() & ~column_values.isin(domain_values)
+                if is_out_of_domain.any():
+                    unknown_values = sorted(set(column_values[is_out_of_domain].astype(str)))
+                    raise ValueError(f"Column [{column}] has values {unknown_values} which are not one of {domain_values}")
+            return input_data_frame
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_warm_up_data_frame(self) -> pd.DataFrame:
+        """
+        One row with every input missing, preprocessing imputes it so any model version can predict it
+        """
+        try:
+            return pd.DataFrame({column: [np.nan] for column in self.input_columns}).astype(self.input_dtypes)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_data_frame_from_records(self, records) -> pd.DataFrame:
+        """
+        records: dict of one row or list of dict rows
+        """
+        try:
+            if isinstance(records, dict):
+                records = [records]
+            return self.get_housing_input_data_frame(dataframe=pd.DataFrame.from_records(records))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+
+class HousingPredictor:
+    """
+    Fitted preprocessing object and trained model loaded once and reused for every prediction
+    """
+
+    def __init__(self, model_dir:str, model_file_name:str, preprocessed_object_file_name:str,
+                 preprocessing_kernel_file_name:str = None) -> None:
+        """
+        model_dir: str directory holding trained model and preprocessing object of one model version
+        preprocessing_kernel_file_name: str numpy preprocessing kernel used instead of preprocessing object when present
+        """
+        try:
+            self.model_dir = model_dir
+            model_file_path = os.path.join(model_dir, model_file_name)
+
+            preprocessing_kernel_file_path = None
+            if preprocessing_kernel_file_name is not None:
+                preprocessing_kernel_file_path = os.path.join(model_dir, preprocessing_kernel_file_name)
+
+            if preprocessing_kernel_file_path is not None and os.path.exists(preprocessing_kernel_file_path):
+                logging.info(f"Loading preprocessing kernel: [{preprocessing_kernel_file_path}]")
+                if is_array_bundle_file(file_path=preprocessing_kernel_file_path):
+                    self.preprocessing_obj = PreprocessingKernel.load(file_path=preprocessing_kernel_file_path)
+                else:
+                    # kernels exported before the array bundle format were pickled
+                    self.preprocessing_obj = load_object(file_path=preprocessing_kernel_file_path)
+            else:
+                preprocessed_object_file_path = os.path.join(model_dir, preprocessed_object_file_name)
+                logging.info(f"Loading preprocessing object: [{preprocessed_object_file_path}]")
+                self.preprocessing_obj = load_preprocessing_obj(file_path=preprocessed_object_file_path)
+
+            logging.info(f"Loading model: [{model_file_path}]")
+            self.model = load_object(file_path=model_file_path)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def predict(self, dataframe:pd.DataFrame) -> np.ndarray:
+        """
+        Predict median house value of every row
+        dataframe: pd.DataFrame input rows with schema input columns
+        """
+        try:
+            input_feature_arr = self.preprocessing_obj.transform(dataframe)
+            return np.asarray(self.model.predict(input_feature_arr)).ravel()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+
+class PartitionedHousingPredictor:
+    """
+    Global model and partition models of a model version published with a partitions directory.
+    Every row is predicted by the model of its partition, rows of partitions without a model of their own
+    and rows a partition model can not preprocess (e.g. a category its partition never had) by the global model.
+    """
+
+    def __init__(self, model_dir:str, model_file_name:str, preprocessed_object_file_name:str,
+                 preprocessing_kernel_file_name:str = None) -> None:
+        """
+        model_dir: str directory of one model version holding the global model and the partitions directory
+        """
+        try:
+            self.model_dir = model_dir
+            self.global_predictor = HousingPredictor(model_dir=model_dir,
+                                                     model_file_name=model_file_name,
+                                                     preprocessed_object_file_name=preprocessed_object_file_name,
+                                                     preprocessing_kernel_file_name=preprocessing_kernel_file_name)
+
+            partitioned_model_dir = os.path.join(model_dir, PARTITIONED_MODEL_DIR)
+            with open(os.path.join(partitioned_model_dir, PARTITION_MANIFEST_FILE_NAME), "r") as manifest_file:
+                partition_manifest = json.load(manifest_file)
+            self.partition_key = partition_manifest["partition_key"]
+            self.geo_tile_degrees = partition_manifest["geo_tile_degrees"]
+
+            logging.info(f"Loading {len(partition_manifest['partitions'])} partition models by: [{self.partition_key}]")
+            self.partition_predictors = {
+                partition_value: HousingPredictor(model_dir=os.path.join(partitioned_model_dir, partition_info["dir_name"]),
+                                                  model_file_name=model_file_name,
+                                                  preprocessed_object_file_name=preprocessed_object_file_name,
+                                                  preprocessing_kernel_file_name=preprocessing_kernel_file_name)
+                for partition_value, partition_info in partition_manifest["partitions"].items()
+            }
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def predict(self, dataframe:pd.DataFrame) -> np.ndarray:
+        """
+        Predict median house value of every row, in the order of the rows
+        dataframe: pd.DataFrame input rows with schema input columns
+        """
+        try:
+            partition_values = get_partition_values(dataframe=dataframe, partition_key=self.partition_key,
+                                                    geo_tile_degrees=self.geo_tile_degrees).to_numpy()
+            prediction = np.empty(len(dataframe), dtype=np.float64)
+            is_predicted = np.zeros(len(dataframe), dtype=bool)
+            for partition_value in pd.unique(partition_values):
+                partition_predictor = self.partition_predictors.get(partition_value)
+                if partition_predictor is None:
+                    continue
+                row_mask = partition_values == partition_value
+                try:
+                    prediction[row_mask] = partition_predictor.predict(dataframe[row_mask])
+                except Exception as e:
+                    logging.info(f"Partition [{partition_value}] model failed, rows are predicted by the global model: [{e}]")
+                    continue
+                is_predicted |= row_mask
+
+            if not is_predicted.all():
+                prediction[~is_predicted] = self.global_predictor.predict(dataframe[~is_predicted])
+            return prediction
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+
+def get_housing_predictor(model_dir:str, model_file_name:str, preprocessed_object_file_name:str,
+                          preprocessing_kernel_file_name:str = None):
+    """
+    Predictor of a model version, PartitionedHousingPredictor when the version was published with partition models
+    return: HousingPredictor or PartitionedHousingPredictor
+    """
+    try:
+        predictor_class = HousingPredictor
+        if os.path.exists(os.path.join(model_dir, PARTITIONED_MODEL_DIR, PARTITION_MANIFEST_FILE_NAME)):
+            predictor_class = PartitionedHousingPredictor
+        return predictor_class(model_dir=model_dir,
+                               model_file_name=model_file_name,
+                               preprocessed_object_file_name=preprocessed_object_file_name,
+                               preprocessing_kernel_file_name=preprocessing_kernel_file_name)
+    except Exception as e:
+        raise HousingException(e,sys) from e
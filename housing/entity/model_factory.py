@@ -0,0 +1,275 @@
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.util.util import read_yaml_file, load_numpy_array_data
+from housing.constant import *
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import importlib
+import math
+import multiprocessing
+import os, sys
+import numpy as np
+from sklearn.metrics import r2_score, mean_squared_error
+from sklearn.model_selection import KFold, ParameterGrid
+
+
+ModelCandidate = namedtuple("ModelCandidate", ["candidate_number", "model_serial_number", "model_name", "module_name",
+                                               "class_name", "params"])
+
+CandidateScore = namedtuple("CandidateScore", ["candidate", "row_count", "score", "message"])
+
+BestModel = namedtuple("BestModel", ["candidate", "model", "best_score"])
+
+MetricInfo = namedtuple("MetricInfo", ["model_name", "model", "train_rmse", "test_rmse", "train_accuracy", "test_accuracy"])
+
+# arrays of a search, set once per worker process by init_search_worker
+search_worker_data = {}
+
+
+def get_class_for_name(module_name:str, class_name:str):
+    """
+    module_name: str module holding the estimator e.g. sklearn.linear_model
+    class_name: str estimator class e.g. LinearRegression
+    """
+    try:
+        module = importlib.import_module(module_name)
+        return getattr(module, class_name)
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def get_model(candidate:ModelCandidate):
+    """
+    Unfitted estimator of a candidate
+    """
+    try:
+        model_class = get_class_for_name(module_name=candidate.module_name, class_name=candidate.class_name)
+        return model_class(**candidate.params)
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def init_search_worker(array_file_path:str = None, X:np.ndarray = None, y:np.ndarray = None) -> None:
+    """
+    Keep training arrays in worker process so tasks only carry candidate and row indices
+    array_file_path: str .npy file of input features followed by target column, memory mapped read only so
+                     every worker reads the same page cache instead of receiving a pickled copy
+    X: np.ndarray input features used when there is no array file
+    y: np.ndarray target used when there is no array file
+    """
+    if array_file_path is not None:
+        array = load_numpy_array_data(file_path=array_file_path, mmap_mode="r")
+        X, y = array[:, :-1], array[:, -1]
+    search_worker_data["X"] = X
+    search_worker_data["y"] = y
+
+
+def evaluate_candidate_fold(candidate:ModelCandidate, train_index:np.ndarray, test_index:np.ndarray):
+    """
+    Fit candidate on train rows of one fold and score it on the fold's test rows
+    return: (r2 score, error message) score is -inf when the candidate fails
+    """
+    try:
+        X = search_worker_data["X"]
+        y = search_worker_data["y"]
+        model = get_model(candidate=candidate)
+        model.fit(X[train_index], y[train_index])
+        return float(r2_score(y[test_index], model.predict(X[test_index]))), None
+    except Exception as e:
+        return -np.inf, str(e)
+
+
+def evaluate_regression_model(model, X_train:np.ndarray, y_train:np.ndarray, X_test:np.ndarray, y_test:np.ndarray,
+                              model_name:str = None) -> MetricInfo:
+    """
+    r2 score and rmse of a fitted regression model on training and testing data
+    """
+    try:
+        y_train_pred = model.predict(X_train)
+        y_test_pred = model.predict(X_test)
+        return MetricInfo(model_name=model_name,
+                          model=model,
+                          train_rmse=float(np.sqrt(mean_squared_error(y_train, y_train_pred))),
+                          test_rmse=float(np.sqrt(mean_squared_error(y_test, y_test_pred))),
+                          train_accuracy=float(r2_score(y_train, y_train_pred)),
+                          test_accuracy=float(r2_score(y_test, y_test_pred)))
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+class ModelFactory:
+    """
+    Successive halving search over every estimator and parameter combination of model.yaml.
+    All candidates are cross validated on a small random subset of training rows, only the best
+    1/factor of them move on to the next round which uses factor times more rows, until one
+    candidate is left or the full training set is used. Folds of every round are spread over a
+    process pool.
+    """
+
+    def __init__(self, model_config_path:str, n_jobs:int = None) -> None:
+        """
+        model_config_path: str location of model.yaml
+        n_jobs: int worker processes overriding n_jobs of model.yaml, e.g. 1 when the search already runs in a worker
+        """
+        try:
+            self.model_config = read_yaml_file(file_path=model_config_path)
+            search_config = self.model_config.get(MODEL_SEARCH_KEY) or {}
+
+            if n_jobs is None:
+                n_jobs = search_config.get(MODEL_SEARCH_N_JOBS_KEY, -1)
+            self.n_jobs = os.cpu_count() if n_jobs is None or n_jobs < 1 else n_jobs
+            self.cv = search_config.get(MODEL_SEARCH_CV_KEY, 3)
+            self.min_resources = search_config.get(MODEL_SEARCH_MIN_RESOURCES_KEY, 1000)
+            self.factor = search_config.get(MODEL_SEARCH_FACTOR_KEY, 3)
+            self.random_state = search_config.get(MODEL_SEARCH_RANDOM_STATE_KEY, 42)
+
+            if self.cv < 2:
+                raise Exception(f"Search cv: [{self.cv}] must be at least 2")
+            if self.factor < 2:
+                raise Exception(f"Search factor: [{self.factor}] must be at least 2")
+
+            self.candidates = self.get_model_candidates()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_model_candidates(self) -> list:
+        """
+        One candidate per estimator of model_selection and combination of its search_param_grid
+        """
+        try:
+            candidates = []
+            for model_serial_number, model_info in self.model_config[MODEL_SELECTION_KEY].items():
+                params = model_info.get(MODEL_PARAMS_KEY) or {}
+                search_param_grid = model_info.get(MODEL_SEARCH_PARAM_GRID_KEY) or {}
+                # validate module and class before starting workers
+                get_class_for_name(module_name=model_info[MODEL_MODULE_KEY], class_name=model_info[MODEL_CLASS_KEY])
+
+                for search_params in ParameterGrid(search_param_grid):
+                    candidates.append(ModelCandidate(candidate_number=len(candidates),
+                                                     model_serial_number=model_serial_number,
+                                                     model_name=f"{model_info[MODEL_MODULE_KEY]}.{model_info[MODEL_CLASS_KEY]}",
+                                                     module_name=model_info[MODEL_MODULE_KEY],
+                                                     class_name=model_info[MODEL_CLASS_KEY],
+                                                     params={**params, **search_params}))
+            if len(candidates) == 0:
+                raise Exception(f"No model found in [{MODEL_SELECTION_KEY}] of model config")
+            return candidates
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_round_folds(self, row_index:np.ndarray) -> list:
+        """
+        (train_index, test_index) of every cross validation fold over given rows
+        row_index: np.ndarray rows in random order, so contiguous folds are random folds
+        """
+        k_fold = KFold(n_splits=self.cv, shuffle=False)
+        # sorted indices keep row access sequential
+        return [(np.sort(row_index[train_index]), np.sort(row_index[test_index]))
+                for train_index, test_index in k_fold.split(row_index)]
+
+    def score_candidates(self, executor, candidates:list, row_index:np.ndarray) -> list:
+        """
+        Mean cross validated r2 score of every candidate on given rows
+        executor: ProcessPoolExecutor or None to evaluate in current process
+        return: list of CandidateScore
+        """
+        try:
+            folds = self.get_round_folds(row_index=row_index)
+            tasks = [(candidate, train_index, test_index) for candidate in candidates for train_index, test_index in folds]
+            if executor is None:
+                results = [evaluate_candidate_fold(*task) for task in tasks]
+            else:
+                results = list(executor.map(evaluate_candidate_fold, *zip(*tasks)))
+
+            candidate_scores = []
+            for candidate_ix, candidate in enumerate(candidates):
+                fold_results = results[candidate_ix * len(folds): (candidate_ix + 1) * len(folds)]
+                messages = [message for _, message in fold_results if message is not None]
+                candidate_scores.append(CandidateScore(candidate=candidate,
+                                                       row_count=len(row_index),
+                                                       score=float(np.mean([score for score, _ in fold_results])),
+                                                       message=messages[0] if messages else None))
+            return candidate_scores
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def run_successive_halving(self, X:np.ndarray, y:np.ndarray, array_file_path:str = None) -> list:
+        """
+        X: np.ndarray input features of training set
+        y: np.ndarray target of training set
+        array_file_path: str optional .npy file holding X followed by y, workers memory map it instead of
+                         receiving a pickled copy of X and y
+        return: list of CandidateScore of every round, last round holds the winner
+        """
+        try:
+            row_count = len(X)
+            if row_count < self.cv * 2:
+                raise Exception(f"Training set of {row_count} rows is too small for {self.cv} fold search")
+
+            # every round uses a prefix of the same random permutation, so survivors see a superset of rows
+            row_permutation = np.random.default_rng(self.random_state).permutation(row_count)
+            resources = min(max(self.min_resources, self.cv * 2), row_count)
+            candidates = self.candidates
+            round_scores = []
+
+            executor = None
+            if self.n_jobs > 1:
+                initargs = (array_file_path,) if array_file_path is not None else (None, X, y)
+                # trainer runs while other stages hold locks in their threads, a forked worker could inherit them held
+                executor = ProcessPoolExecutor(max_workers=self.n_jobs, mp_context=multiprocessing.get_context("spawn"),
+                                               initializer=init_search_worker, initargs=initargs)
+            else:
+                init_search_worker(X=X, y=y)
+
+            try:
+                round_number = 0
+                while True:
+                    logging.info(f"Search round {round_number}: {len(candidates)} candidates on {resources} rows")
+                    candidate_scores = self.score_candidates(executor=executor,
+                                                             candidates=candidates,
+                                                             row_index=row_permutation[:resources])
+                    candidate_scores.sort(key=lambda candidate_score: candidate_score.score, reverse=True)
+                    round_scores.append(candidate_scores)
+
+                    for candidate_score in candidate_scores:
+                        logging.info("Round %s [%s] %s score: %s%s", round_number, candidate_score.candidate.model_name,
+                                     candidate_score.candidate.params, candidate_score.score,
+                                     f" error: {candidate_score.message}" if candidate_score.message else "",
+                                     extra={"search_round": round_number, "score": candidate_score.score})
+
+                    if len(candidate_scores) == 1 or resources >= row_count:
+                        break
+                    survivor_count = math.ceil(len(candidate_scores) / self.factor)
+                    if survivor_count == 1:
+                        # the winner is already known, it is fitted on the full training set afterwards
+                        break
+                    candidates = [candidate_score.candidate for candidate_score in candidate_scores[:survivor_count]]
+                    resources = min(resources * self.factor, row_count)
+                    round_number += 1
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+                search_worker_data.clear()
+
+            return round_scores
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_best_model(self, X:np.ndarray, y:np.ndarray, array_file_path:str = None) -> BestModel:
+        """
+        Run successive halving and fit the winning candidate on the full training set
+        array_file_path: str optional .npy file holding X followed by y, see run_successive_halving
+        """
+        try:
+            round_scores = self.run_successive_halving(X=X, y=y, array_file_path=array_file_path)
+            best_candidate_score = round_scores[-1][0]
+            if not np.isfinite(best_candidate_score.score):
+                raise Exception(f"Every candidate failed, last error: {best_candidate_score.message}")
+
+            logging.info(f"Best candidate: [{best_candidate_score.candidate.model_name}] {best_candidate_score.candidate.params} "
+                         f"score: {best_candidate_score.score}, fitting on {len(X)} rows")
+            model = get_model(candidate=best_candidate_score.candidate)
+            model.fit(X, y)
+            return BestModel(candidate=best_candidate_score.candidate, model=model, best_score=best_candidate_score.score)
+        except Exception as e:
+            raise HousingException(e,sys) from e
@@ -1,19 +1,173 @@
 import logging
+import logging.handlers
 from datetime import datetime
 import os
+import json
+import queue
+import atexit
+import threading
 
 LOG_DIR = "logs"
 CURRENT_TIME_STAMP = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
-LOG_FILE_NAME = f"log_{CURRENT_TIME_STAMP}.log"
+LOG_LEVEL = os.environ.get("HOUSING_LOG_LEVEL", "INFO").upper()
 
-os.makedirs(LOG_DIR, exist_ok=True)
 
-LOG_FILE_PATH = os.path.join(LOG_DIR,LOG_FILE_NAME)
+def get_log_file_path() -> str:
+    """
+    Log file of current process, pid keeps processes started in the same second apart
+    """
+    return os.path.join(LOG_DIR, f"log_{CURRENT_TIME_STAMP}_{os.getpid()}.log")
+
+
+# fields of every LogRecord, anything else on a record was passed through extra= and is written as is
+LOG_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# run id is shared by every thread of the run, stage belongs to the thread running it
+log_context = {"run_id": None}
+thread_log_context = threading.local()
+
+
+def set_run_id(run_id:str) -> None:
+    log_context["run_id"] = run_id
+
+
+def get_run_id() -> str:
+    return log_context["run_id"]
+
+
+def get_log_context() -> dict:
+    return dict(getattr(thread_log_context, "fields", {}))
+
+
+class LogContext:
+    """
+    Fields added to every record logged by this thread inside the block, e.g. with LogContext(stage="data_ingestion")
+    """
+
+    def __init__(self, **fields) -> None:
+        self.fields = fields
+
+    def __enter__(self):
+        self.previous_fields = get_log_context()
+        thread_log_context.fields = {**self.previous_fields, **self.fields}
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        thread_log_context.fields = self.previous_fields
+
+
+def bind_log_context(function):
+    """
+    Wrap function submitted to a thread pool so its records carry the log context of the submitting thread
+    """
+    fields = get_log_context()
+    if len(fields) == 0:
+        return function
+
+    def bound_function(*args, **kwargs):
+        with LogContext(**fields):
+            return function(*args, **kwargs)
+    return bound_function
+
+
+class LazyFileHandler(logging.FileHandler):
+    """
+    File handler creating log dir and log file on the first record, importing housing writes nothing
+    """
+
+    def __init__(self, file_path:str, mode:str = "w") -> None:
+        super().__init__(file_path, mode=mode, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One json object per line with time, level, logger, message, run id, pid, thread, the log context
+    of the thread (e.g. stage) and every field passed through extra= (e.g. elapsed_seconds)
+    """
+
+    def format(self, record:logging.LogRecord) -> str:
+        log_record = {"time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+                      "level": record.levelname,
+                      "logger": record.name,
+                      "message": record.getMessage(),
+                      "run_id": getattr(record, "run_id", None),
+                      "pid": record.process,
+                      "thread": record.threadName}
+        for key, value in record.__dict__.items():
+            if key not in LOG_RECORD_ATTRIBUTES and key not in log_record:
+                log_record[key] = value
+        if record.exc_info:
+            log_record["exception"] = self.formatException(record.exc_info)
+        return json.dumps(log_record, default=str)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on a queue written to the log file by a background thread, so logging costs the
+    calling thread a level check and a queue put. Messages are formatted by the writer thread only,
+    so arguments passed to a log call must not be modified afterwards. The writer is started with the
+    first record of every process, a forked process gets a writer and a log file of its own.
+    Records logged after the writer stopped at exit are written synchronously.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(queue.SimpleQueue())
+        self.listener = None
+        self.listener_pid = None
+        self.file_handler = None
+        self.listener_lock = threading.Lock()
+        # lock may be held by another thread of the parent at fork time, there is no fork on windows
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.reset_listener_lock)
+
+    def reset_listener_lock(self) -> None:
+        self.listener_lock = threading.Lock()
+
+    def start_listener(self) -> None:
+        with self.listener_lock:
+            if self.listener_pid == os.getpid():
+                return
+            # records queued by the parent before fork belong to the parent log file
+            self.queue = queue.SimpleQueue()
+            self.file_handler = LazyFileHandler(get_log_file_path(), mode="a")
+            self.file_handler.setFormatter(JsonFormatter())
+            self.listener = logging.handlers.QueueListener(self.queue, self.file_handler, respect_handler_level=True)
+            self.listener.start()
+            self.listener_pid = os.getpid()
+            import multiprocessing, multiprocessing.util
+            if multiprocessing.current_process().name != "MainProcess":
+                # multiprocessing workers exit without running atexit handlers, queued records would be lost
+                multiprocessing.util.Finalize(self, self.stop_listener, exitpriority=0)
+
+    def stop_listener(self) -> None:
+        with self.listener_lock:
+            if self.listener is not None and self.listener_pid == os.getpid():
+                self.listener.stop()
+                self.listener = None
+
+    def prepare(self, record:logging.LogRecord) -> logging.LogRecord:
+        # queue stays in process, record is passed unformatted instead of being rendered on the calling thread
+        record.run_id = log_context["run_id"]
+        record.__dict__.update(get_log_context())
+        return record
+
+    def emit(self, record:logging.LogRecord) -> None:
+        if self.listener_pid != os.getpid():
+            self.start_listener()
+        if self.listener is None:
+            self.file_handler.handle(self.prepare(record))
+            return
+        super().emit(record)
+
+
+queue_handler = ContextQueueHandler()
+atexit.register(queue_handler.stop_listener)
 
 logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    filemode="w",
-    format='[%(asctime)s] %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+    handlers=[queue_handler],
+    level=LOG_LEVEL
 )
-
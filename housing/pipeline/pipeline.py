@@ -1,66 +1,383 @@
 from housing.config.configuration import Configuration
-from housing.logger import logging
+from housing.logger import logging, set_run_id
 from housing.exception import HousingException
-from housing.entity.artifact_entity import DataIngestionArtifact,DataValidationArtifact,DataTransformationArtifact
-from housing.component.data_ingestion import DataIngestion
-from housing.component.data_validation import DataValidation
-from housing.component.data_transformation import DataTransformation
+from housing.entity.artifact_entity import DataIngestionArtifact,DataValidationArtifact,DataTransformationArtifact, \
+    ModelTrainerArtifact, ModelEvaluationArtifact, ModelPusherArtifact, DataDriftArtifact, PartitionTrainingArtifact
+from housing.pipeline.stage_cache import StageCache
+from housing.pipeline.stage_scheduler import StageScheduler, PipelineStage
+from housing.pipeline.run_state import PipelineRunState
+from housing.util.dataset_registry import DatasetRegistry
+from housing.util.run_profiler import RunProfiler, get_current_profile_step
+from housing.util import util
+from housing.constant import *
 
 import os, sys
+import inspect
+import json
 
 class Pipeline:
+    """
+    Runs every stage of training. Components are imported by the stage running them, so sklearn,
+    scipy and evidently are loaded only when a stage needing them actually runs.
+    Stages form a dependency graph run by StageScheduler, stages not depending on each other (e.g. drift
+    report and transformation) run concurrently. Status and artifact of every stage are kept in the run
+    state of the run time stamp, a failed run is resumed by a pipeline created with the same time stamp.
+    """
 
-    def __init__(self, config: Configuration = Configuration()) -> None:
-
+    def __init__(self, config: Configuration = None, resume:bool = False) -> None:
+        """
+        config: Configuration of the run, read from config.yaml when the pipeline is created if not given
+        resume: bool reuse artifacts of stages completed by an earlier attempt of the run time stamp of config
+        """
         try:
-            self.config = config
+            self.config = config if config is not None else Configuration()
+            run_state_file_path = os.path.join(self.config.training_pipeline_config.artifact_dir, PIPELINE_RUN_STATE_DIR,
+                                               self.config.time_stamp, PIPELINE_RUN_STATE_FILE_NAME)
+            if resume and not os.path.exists(run_state_file_path):
+                raise Exception(f"No run state to resume for time stamp: [{self.config.time_stamp}]")
+            self.run_state = PipelineRunState(run_state_file_path=run_state_file_path,
+                                              time_stamp=self.config.time_stamp,
+                                              resume=resume)
+            self.dataset_registry = DatasetRegistry()
+            self.stage_cache = None
+            if self.config.training_pipeline_config.use_stage_cache:
+                stage_cache_dir = os.path.join(self.config.training_pipeline_config.artifact_dir, STAGE_CACHE_DIR)
+                self.stage_cache = StageCache(cache_dir=stage_cache_dir, time_stamp=self.config.time_stamp)
+            self.run_profiler = None
+            if self.config.training_pipeline_config.run_profile:
+                profile_dir = os.path.join(self.config.training_pipeline_config.artifact_dir, RUN_PROFILE_DIR,
+                                           self.config.time_stamp)
+                self.run_profiler = RunProfiler(profile_dir=profile_dir,
+                                                cprofile_stages=self.config.training_pipeline_config.cprofile_stages)
         except Exception as e:
             raise HousingException(e,sys) from e
 
+    def run_cached_stage(self, stage_name:str, fingerprint:str, artifact_class, run_stage):
+        """
+        Return artifact of a previous run having the same fingerprint, otherwise run the stage and cache its artifact
+        stage_name: str name of stage
+        fingerprint: str fingerprint of stage inputs, None disables caching for this call
+        artifact_class: namedtuple class of stage artifact
+        run_stage: callable executing the stage
+        """
+        try:
+            if self.stage_cache is None or fingerprint is None:
+                return run_stage()
+
+            artifact = self.stage_cache.get_artifact(stage_name=stage_name,
+                                                     fingerprint=fingerprint,
+                                                     artifact_class=artifact_class)
+            if artifact is not None:
+                get_current_profile_step().set(cached=True)
+                return artifact
+
+            artifact = run_stage()
+            self.stage_cache.save_artifact(stage_name=stage_name, fingerprint=fingerprint, artifact=artifact)
+            return artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
 
     def start_data_ingestion(self) -> DataIngestionArtifact:
         try:
-            data_ingestion = DataIngestion(data_ingestion_config=self.config.get_data_ingestion_config())
-            return data_ingestion.initiate_data_ingestion()
+            from housing.component.data_ingestion import DataIngestion
+            from housing.util import download_cache
+            data_ingestion_config = self.config.get_data_ingestion_config()
+            data_ingestion = DataIngestion(data_ingestion_config=data_ingestion_config)
+
+            fingerprint = None
+            if self.stage_cache is not None:
+                source_signature = data_ingestion.get_dataset_source_signature()
+                if source_signature is not None:
+                    fingerprint = self.stage_cache.get_fingerprint(stage_name=DATA_INGESTION_ARTIFACT_DIR,
+                                                                   config=data_ingestion_config,
+                                                                   input_file_paths=[],
+                                                                   code_file_paths=[inspect.getfile(DataIngestion), download_cache.__file__,
+                                                                                    util.__file__],
+                                                                   extra_signature=source_signature)
+
+            return self.run_cached_stage(stage_name=DATA_INGESTION_ARTIFACT_DIR,
+                                         fingerprint=fingerprint,
+                                         artifact_class=DataIngestionArtifact,
+                                         run_stage=data_ingestion.initiate_data_ingestion)
         except Exception as e:
             raise HousingException(e,sys) from e
 
+    def get_data_validation(self, data_ingestion_artifact:DataIngestionArtifact):
+        from housing.component.data_validation import DataValidation
+        return DataValidation(data_validation_config=self.config.get_data_validation_config(),
+                              data_ingestion_artifact=data_ingestion_artifact,
+                              dataset_registry=self.dataset_registry)
+
+    def get_data_validation_fingerprint(self, stage_name:str, data_validation, data_ingestion_artifact:DataIngestionArtifact) -> str:
+        if self.stage_cache is None:
+            return None
+        from housing.util import schema_validator, data_drift, dataset_schema
+        data_validation_config = data_validation.data_validation_config
+        return self.stage_cache.get_fingerprint(stage_name=stage_name,
+                                                config=data_validation_config,
+                                                input_file_paths=[data_ingestion_artifact.train_file_path,
+                                                                  data_ingestion_artifact.test_file_path,
+                                                                  data_validation_config.schema_file_path],
+                                                code_file_paths=[inspect.getfile(type(data_validation)), schema_validator.__file__,
+                                                                 data_drift.__file__, dataset_schema.__file__, util.__file__])
+
     def start_data_validation(self,data_ingestion_artifact:DataIngestionArtifact) -> DataValidationArtifact:
         try:
-            data_validation = DataValidation(data_validation_config=self.config.get_data_validation_config(), data_ingestion_artifact= data_ingestion_artifact)
+            data_validation = self.get_data_validation(data_ingestion_artifact=data_ingestion_artifact)
+            fingerprint = self.get_data_validation_fingerprint(stage_name=DATA_VALIDATION_ARTIFACT_DIR_NAME,
+                                                               data_validation=data_validation,
+                                                               data_ingestion_artifact=data_ingestion_artifact)
+            return self.run_cached_stage(stage_name=DATA_VALIDATION_ARTIFACT_DIR_NAME,
+                                         fingerprint=fingerprint,
+                                         artifact_class=DataValidationArtifact,
+                                         run_stage=data_validation.initiate_schema_validation)
+        except Exception as e:
+            raise HousingException(e,sys) from e
 
-            return data_validation.initiate_data_validation()
+    def start_data_drift(self, data_ingestion_artifact:DataIngestionArtifact) -> DataDriftArtifact:
+        try:
+            data_validation = self.get_data_validation(data_ingestion_artifact=data_ingestion_artifact)
+            fingerprint = self.get_data_validation_fingerprint(stage_name=DATA_DRIFT_STAGE_NAME,
+                                                               data_validation=data_validation,
+                                                               data_ingestion_artifact=data_ingestion_artifact)
+            return self.run_cached_stage(stage_name=DATA_DRIFT_STAGE_NAME,
+                                         fingerprint=fingerprint,
+                                         artifact_class=DataDriftArtifact,
+                                         run_stage=data_validation.initiate_data_drift_report)
         except Exception as e:
             raise HousingException(e,sys) from e
 
+    def get_data_transformation_code_file_paths(self) -> list:
+        """
+        Source files of data transformation, partition training transforms every partition with them too
+        """
+        from housing.component.data_transformation import DataTransformation
+        from housing.util import preprocessing_kernel, array_bundle, incremental_preprocessing, dataset_schema
+        return [inspect.getfile(DataTransformation), preprocessing_kernel.__file__, array_bundle.__file__,
+                incremental_preprocessing.__file__, dataset_schema.__file__, util.__file__]
+
     def start_data_transformation(self,
                                   data_ingstion_artifact:DataIngestionArtifact,
                                   data_validation_artifact:DataValidationArtifact
                                   ) -> DataTransformationArtifact:
         try:
-            data_transformation = DataTransformation(data_transformation_config=self.config.get_data_transformation_config(),
+            from housing.component.data_transformation import DataTransformation
+            data_transformation_config = self.config.get_data_transformation_config()
+            data_transformation = DataTransformation(data_transformation_config=data_transformation_config,
                                                      data_ingestion_artifact=data_ingstion_artifact,
-                                                     data_validation_artifact=data_validation_artifact)
+                                                     data_validation_artifact=data_validation_artifact,
+                                                     dataset_registry=self.dataset_registry)
+
+            fingerprint = None
+            if self.stage_cache is not None:
+                fingerprint = self.stage_cache.get_fingerprint(stage_name=DATA_TRANSFORMATION_ARTIFACT_DIR,
+                                                               config=data_transformation_config,
+                                                               input_file_paths=[data_ingstion_artifact.train_file_path,
+                                                                                 data_ingstion_artifact.test_file_path,
+                                                                                 data_validation_artifact.schema_file_path],
+                                                               code_file_paths=self.get_data_transformation_code_file_paths())
+
+            return self.run_cached_stage(stage_name=DATA_TRANSFORMATION_ARTIFACT_DIR,
+                                         fingerprint=fingerprint,
+                                         artifact_class=DataTransformationArtifact,
+                                         run_stage=data_transformation.initiate_data_transformation)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def start_model_trainer(self, data_transformation_artifact:DataTransformationArtifact) -> ModelTrainerArtifact:
+        try:
+            from housing.component.model_trainer import ModelTrainer
+            from housing.entity import model_factory
+            model_trainer_config = self.config.get_model_trainer_config()
+            model_trainer = ModelTrainer(model_trainer_config=model_trainer_config,
+                                         data_transformation_artifact=data_transformation_artifact)
+
+            fingerprint = None
+            if self.stage_cache is not None:
+                fingerprint = self.stage_cache.get_fingerprint(stage_name=MODEL_TRAINER_ARTIFACT_DIR,
+                                                               config=model_trainer_config,
+                                                               input_file_paths=[data_transformation_artifact.transformed_train_file_path,
+                                                                                 data_transformation_artifact.transformed_test_file_path,
+                                                                                 model_trainer_config.model_config_file_path],
+                                                               code_file_paths=[inspect.getfile(ModelTrainer), model_factory.__file__,
+                                                                                util.__file__])
 
-            return data_transformation.initiate_data_transformation()
+            return self.run_cached_stage(stage_name=MODEL_TRAINER_ARTIFACT_DIR,
+                                         fingerprint=fingerprint,
+                                         artifact_class=ModelTrainerArtifact,
+                                         run_stage=model_trainer.initiate_model_trainer)
         except Exception as e:
             raise HousingException(e,sys) from e
 
-    def start_model_trainer(self):
-        pass
+    def start_partition_training(self,
+                                 data_ingestion_artifact:DataIngestionArtifact,
+                                 data_validation_artifact:DataValidationArtifact) -> PartitionTrainingArtifact:
+        try:
+            from housing.component.partition_training import PartitionTraining
+            from housing.component.model_trainer import ModelTrainer
+            from housing.entity import model_factory
+            from housing.util import partition
+            partition_training_config = self.config.get_partition_training_config()
+            data_transformation_config = self.config.get_data_transformation_config()
+            model_trainer_config = self.config.get_model_trainer_config()
+            partition_training = PartitionTraining(partition_training_config=partition_training_config,
+                                                   data_transformation_config=data_transformation_config,
+                                                   model_trainer_config=model_trainer_config,
+                                                   data_ingestion_artifact=data_ingestion_artifact,
+                                                   data_validation_artifact=data_validation_artifact,
+                                                   dataset_registry=self.dataset_registry)
+
+            fingerprint = None
+            if self.stage_cache is not None:
+                # partitions are trained with the global transformation and trainer configs
+                base_config_signature = [self.stage_cache.get_config_signature(config=data_transformation_config),
+                                         self.stage_cache.get_config_signature(config=model_trainer_config)]
+                fingerprint = self.stage_cache.get_fingerprint(stage_name=PARTITION_TRAINING_ARTIFACT_DIR,
+                                                               config=partition_training_config,
+                                                               input_file_paths=[data_ingestion_artifact.train_file_path,
+                                                                                 data_ingestion_artifact.test_file_path,
+                                                                                 data_validation_artifact.schema_file_path,
+                                                                                 model_trainer_config.model_config_file_path],
+                                                               code_file_paths=[inspect.getfile(PartitionTraining), partition.__file__,
+                                                                                inspect.getfile(ModelTrainer), model_factory.__file__,
+                                                                                *self.get_data_transformation_code_file_paths()],
+                                                               extra_signature=json.dumps(base_config_signature, sort_keys=True, default=str))
 
-    def start_model_evaluation(self):
-        pass
+            return self.run_cached_stage(stage_name=PARTITION_TRAINING_ARTIFACT_DIR,
+                                         fingerprint=fingerprint,
+                                         artifact_class=PartitionTrainingArtifact,
+                                         run_stage=partition_training.initiate_partition_training)
+        except Exception as e:
+            raise HousingException(e,sys) from e
 
-    def start_model_pusher(self):
-        pass
+    def start_model_evaluation(self,
+                               data_ingestion_artifact:DataIngestionArtifact,
+                               data_validation_artifact:DataValidationArtifact,
+                               data_transformation_artifact:DataTransformationArtifact,
+                               model_trainer_artifact:ModelTrainerArtifact) -> ModelEvaluationArtifact:
+        try:
+            from housing.component.model_evaluation import ModelEvaluation
+            # not cached, result depends on the currently deployed model
+            model_evaluation = ModelEvaluation(model_evaluation_config=self.config.get_model_evaluation_config(),
+                                               data_ingestion_artifact=data_ingestion_artifact,
+                                               data_validation_artifact=data_validation_artifact,
+                                               data_transformation_artifact=data_transformation_artifact,
+                                               model_trainer_artifact=model_trainer_artifact,
+                                               dataset_registry=self.dataset_registry)
+            return model_evaluation.initiate_model_evaluation()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def start_model_pusher(self,
+                           data_transformation_artifact:DataTransformationArtifact,
+                           model_evaluation_artifact:ModelEvaluationArtifact,
+                           partition_training_artifact:PartitionTrainingArtifact = None) -> ModelPusherArtifact:
+        try:
+            from housing.component.model_pusher import ModelPusher
+            model_pusher = ModelPusher(model_pusher_config=self.config.get_model_pusher_config(),
+                                       data_transformation_artifact=data_transformation_artifact,
+                                       model_evaluation_artifact=model_evaluation_artifact,
+                                       partition_training_artifact=partition_training_artifact)
+            return model_pusher.initiate_model_pusher()
+        except Exception as e:
+            raise HousingException(e,sys) from e
 
     def run_pipeline(self):
         try:
-            # data ingestion
-            data_ingestion_artifact = self.start_data_ingestion()
-            data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
-            data_transformation_artifact = self.start_data_transformation(data_ingstion_artifact=data_ingestion_artifact,
-                                                                          data_validation_artifact=data_validation_artifact)
+            # time stamp names every artifact dir of the run, log records carry it as run id
+            set_run_id(self.config.time_stamp)
+            if self.run_profiler is None:
+                return self.run_stages()
+            # profile.json is written even when a stage fails
+            with self.run_profiler:
+                return self.run_stages()
         except Exception as e:
-            raise HousingException(e,sys) from e
\ No newline at end of file
+            raise HousingException(e,sys) from e
+
+    def run_model_pusher_stage(self, artifacts:dict) -> ModelPusherArtifact:
+        """
+        Push model accepted by evaluation, None marks the stage skipped for a rejected model
+        """
+        model_evaluation_artifact = artifacts[MODEL_EVALUATION_ARTIFACT_DIR]
+        if not model_evaluation_artifact.is_model_accepted:
+            logging.info(f"Trained model rejected: {model_evaluation_artifact.message}")
+            return None
+        model_pusher_artifact = self.start_model_pusher(data_transformation_artifact=artifacts[DATA_TRANSFORMATION_ARTIFACT_DIR],
+                                                        model_evaluation_artifact=model_evaluation_artifact,
+                                                        partition_training_artifact=artifacts[PARTITION_TRAINING_ARTIFACT_DIR])
+        logging.info("Model pusher artifact: %s", model_pusher_artifact)
+        return model_pusher_artifact
+
+    def run_partition_training_stage(self, artifacts:dict) -> PartitionTrainingArtifact:
+        """
+        Train a model per partition, None marks the stage skipped when no partition key is configured
+        """
+        if self.config.get_partition_training_config().partition_key is None:
+            return None
+        return self.start_partition_training(data_ingestion_artifact=artifacts[DATA_INGESTION_ARTIFACT_DIR],
+                                             data_validation_artifact=artifacts[DATA_VALIDATION_ARTIFACT_DIR_NAME])
+
+    def get_pipeline_stages(self) -> list:
+        """
+        Stages of training with the stages whose artifacts they need, run_stage gets artifacts by stage name
+        """
+        return [
+            PipelineStage(name=DATA_INGESTION_ARTIFACT_DIR, dependencies=[], artifact_class=DataIngestionArtifact,
+                          run_stage=lambda artifacts: self.start_data_ingestion()),
+            PipelineStage(name=DATA_VALIDATION_ARTIFACT_DIR_NAME, dependencies=[DATA_INGESTION_ARTIFACT_DIR],
+                          artifact_class=DataValidationArtifact,
+                          run_stage=lambda artifacts: self.start_data_validation(
+                              data_ingestion_artifact=artifacts[DATA_INGESTION_ARTIFACT_DIR])),
+            PipelineStage(name=DATA_DRIFT_STAGE_NAME, dependencies=[DATA_INGESTION_ARTIFACT_DIR],
+                          artifact_class=DataDriftArtifact,
+                          run_stage=lambda artifacts: self.start_data_drift(
+                              data_ingestion_artifact=artifacts[DATA_INGESTION_ARTIFACT_DIR])),
+            PipelineStage(name=DATA_TRANSFORMATION_ARTIFACT_DIR,
+                          dependencies=[DATA_INGESTION_ARTIFACT_DIR, DATA_VALIDATION_ARTIFACT_DIR_NAME],
+                          artifact_class=DataTransformationArtifact,
+                          run_stage=lambda artifacts: self.start_data_transformation(
+                              data_ingstion_artifact=artifacts[DATA_INGESTION_ARTIFACT_DIR],
+                              data_validation_artifact=artifacts[DATA_VALIDATION_ARTIFACT_DIR_NAME])),
+            PipelineStage(name=MODEL_TRAINER_ARTIFACT_DIR, dependencies=[DATA_TRANSFORMATION_ARTIFACT_DIR],
+                          artifact_class=ModelTrainerArtifact,
+                          run_stage=lambda artifacts: self.start_model_trainer(
+                              data_transformation_artifact=artifacts[DATA_TRANSFORMATION_ARTIFACT_DIR])),
+            PipelineStage(name=MODEL_EVALUATION_ARTIFACT_DIR,
+                          dependencies=[DATA_INGESTION_ARTIFACT_DIR, DATA_VALIDATION_ARTIFACT_DIR_NAME,
+                                        DATA_TRANSFORMATION_ARTIFACT_DIR, MODEL_TRAINER_ARTIFACT_DIR],
+                          artifact_class=ModelEvaluationArtifact,
+                          run_stage=lambda artifacts: self.start_model_evaluation(
+                              data_ingestion_artifact=artifacts[DATA_INGESTION_ARTIFACT_DIR],
+                              data_validation_artifact=artifacts[DATA_VALIDATION_ARTIFACT_DIR_NAME],
+                              data_transformation_artifact=artifacts[DATA_TRANSFORMATION_ARTIFACT_DIR],
+                              model_trainer_artifact=artifacts[MODEL_TRAINER_ARTIFACT_DIR])),
+            # partition models train in worker processes of their own while the global model trains
+            PipelineStage(name=PARTITION_TRAINING_ARTIFACT_DIR,
+                          dependencies=[DATA_INGESTION_ARTIFACT_DIR, DATA_VALIDATION_ARTIFACT_DIR_NAME],
+                          artifact_class=PartitionTrainingArtifact,
+                          run_stage=self.run_partition_training_stage),
+            # a model is only pushed once the drift report of its data is saved
+            PipelineStage(name=MODEL_PUSHER_ARTIFACT_DIR,
+                          dependencies=[DATA_TRANSFORMATION_ARTIFACT_DIR, MODEL_EVALUATION_ARTIFACT_DIR, DATA_DRIFT_STAGE_NAME,
+                                        PARTITION_TRAINING_ARTIFACT_DIR],
+                          artifact_class=ModelPusherArtifact,
+                          run_stage=self.run_model_pusher_stage),
+        ]
+
+    def run_stages(self) -> dict:
+        """
+        return: dict stage name -> artifact of the run
+        """
+        try:
+            # datasets loaded by one stage are reused by the next ones, files on disk stay the source of truth
+            self.dataset_registry.clear()
+
+            stage_scheduler = StageScheduler(stages=self.get_pipeline_stages(),
+                                             max_workers=self.config.training_pipeline_config.max_concurrent_stages,
+                                             run_state=self.run_state)
+            artifacts = stage_scheduler.run()
+
+            self.dataset_registry.clear()
+            return artifacts
+        except Exception as e:
+            raise HousingException(e,sys) from e
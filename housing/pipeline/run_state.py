@@ -0,0 +1,112 @@
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.constant import *
+import os, sys
+import json
+import threading
+
+STAGE_STATUS_RUNNING = "running"
+STAGE_STATUS_COMPLETED = "completed"
+STAGE_STATUS_SKIPPED = "skipped"
+STAGE_STATUS_FAILED = "failed"
+
+
+class PipelineRunState:
+    """
+    Status and artifact of every stage of one run, kept in run_state.json of the run time stamp.
+    A resumed run reuses artifacts of completed stages and runs failed and not started stages again.
+    """
+
+    def __init__(self, run_state_file_path:str, time_stamp:str, resume:bool = False) -> None:
+        """
+        run_state_file_path: str location of run_state.json of the run
+        time_stamp: str time stamp of the run
+        resume: bool load stages recorded by an earlier attempt, a new run state is started otherwise
+        """
+        try:
+            self.run_state_file_path = run_state_file_path
+            self.time_stamp = time_stamp
+            self.lock = threading.Lock()
+            self.stages = {}
+            if resume and os.path.exists(run_state_file_path):
+                with open(run_state_file_path, "r") as run_state_file:
+                    self.stages = json.load(run_state_file)["stages"]
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_status(self) -> str:
+        """
+        failed when any stage failed, running while any stage has not finished, completed otherwise
+        """
+        statuses = [stage["status"] for stage in self.stages.values()]
+        if STAGE_STATUS_FAILED in statuses:
+            return STAGE_STATUS_FAILED
+        if STAGE_STATUS_RUNNING in statuses:
+            return STAGE_STATUS_RUNNING
+        return STAGE_STATUS_COMPLETED
+
+    def get_finished_artifact(self, stage_name:str, artifact_class) -> tuple:
+        """
+        Artifact of a stage finished by an earlier attempt of this run
+        return: tuple (True, artifact) when stage completed or was skipped and its files still exist, (False, None) otherwise
+        """
+        try:
+            stage = self.stages.get(stage_name)
+            if stage is None or stage["status"] not in (STAGE_STATUS_COMPLETED, STAGE_STATUS_SKIPPED):
+                return False, None
+            if stage["status"] == STAGE_STATUS_SKIPPED:
+                return True, None
+
+            if set(stage["artifact"].keys()) != set(artifact_class._fields):
+                logging.info(f"Run state of [{stage_name}] has outdated artifact fields, stage runs again")
+                return False, None
+            artifact = artifact_class(**stage["artifact"])
+            for key, value in artifact._asdict().items():
+                if key.endswith("_file_path") and value is not None and not os.path.exists(value):
+                    logging.info(f"Run state of [{stage_name}] is stale, missing file: [{value}], stage runs again")
+                    return False, None
+            return True, artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def set_stage_status(self, stage_name:str, status:str, artifact = None, error:str = None) -> None:
+        """
+        Record status of a stage and write run_state.json atomically
+        artifact: namedtuple artifact of completed stage
+        error: str error message of failed stage
+        """
+        try:
+            with self.lock:
+                self.stages[stage_name] = {"status": status,
+                                           "artifact": None if artifact is None else artifact._asdict(),
+                                           "error": error}
+                run_state = {"time_stamp": self.time_stamp, "status": self.get_status(), "stages": self.stages}
+
+                os.makedirs(os.path.dirname(self.run_state_file_path), exist_ok=True)
+                tmp_run_state_file_path = f"{self.run_state_file_path}.tmp"
+                with open(tmp_run_state_file_path, "w") as run_state_file:
+                    json.dump(run_state, run_state_file, indent=4, default=str)
+                os.replace(tmp_run_state_file_path, self.run_state_file_path)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+
+def get_latest_failed_time_stamp(artifact_dir:str) -> str:
+    """
+    Time stamp of the latest run whose run state is failed, None if there is none
+    artifact_dir: str artifact dir of training pipeline
+    """
+    try:
+        run_state_dir = os.path.join(artifact_dir, PIPELINE_RUN_STATE_DIR)
+        if not os.path.isdir(run_state_dir):
+            return None
+        for time_stamp in sorted(os.listdir(run_state_dir), reverse=True):
+            run_state_file_path = os.path.join(run_state_dir, time_stamp, PIPELINE_RUN_STATE_FILE_NAME)
+            if not os.path.exists(run_state_file_path):
+                continue
+            with open(run_state_file_path, "r") as run_state_file:
+                if json.load(run_state_file)["status"] == STAGE_STATUS_FAILED:
+                    return time_stamp
+        return None
+    except Exception as e:
+        raise HousingException(e,sys) from e
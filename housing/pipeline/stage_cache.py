@@ -0,0 +1,125 @@
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.util.util import get_file_checksum
+import os, sys
+import json
+import hashlib
+from typing import List
+
+
+class StageCache:
+
+    def __init__(self, cache_dir:str, time_stamp:str) -> None:
+        """
+        StageCache Initialization
+        cache_dir: str directory where fingerprint -> artifact records are stored
+        time_stamp: str time stamp of current run, removed from config paths before fingerprinting
+        """
+        try:
+            self.cache_dir = cache_dir
+            self.time_stamp = time_stamp
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_config_signature(self, config) -> dict:
+        """
+        Convert config entity into a dict which does not depend on run time stamp
+        config: namedtuple config entity of stage
+        """
+        try:
+            config_signature = {}
+            for key,value in config._asdict().items():
+                if isinstance(value,str):
+                    value = value.replace(self.time_stamp,"")
+                config_signature[key] = value
+            return config_signature
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_fingerprint(self,
+                        stage_name:str,
+                        config,
+                        input_file_paths:List[str],
+                        code_file_paths:List[str],
+                        extra_signature:str = "") -> str:
+        """
+        Build fingerprint of a stage from its inputs, config entity and code version
+        stage_name: str name of stage
+        config: namedtuple config entity of stage
+        input_file_paths: list of files consumed by the stage, hashed by content
+        code_file_paths: list of source files implementing the stage
+        extra_signature: str any other input of the stage e.g. remote source signature
+        return: str hex digest
+        """
+        try:
+            fingerprint_info = {
+                "stage": stage_name,
+                "config": self.get_config_signature(config=config),
+                "inputs": [get_file_checksum(file_path=file_path) for file_path in input_file_paths],
+                "code": [get_file_checksum(file_path=file_path) for file_path in code_file_paths],
+                "extra": extra_signature
+            }
+            fingerprint_json = json.dumps(fingerprint_info, sort_keys=True, default=str)
+            return hashlib.sha256(fingerprint_json.encode("utf-8")).hexdigest()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_record_file_path(self, stage_name:str, fingerprint:str) -> str:
+        return os.path.join(self.cache_dir, stage_name, f"{fingerprint}.json")
+
+    def get_artifact(self, stage_name:str, fingerprint:str, artifact_class):
+        """
+        Return cached artifact of stage if present and all its output files still exist else None
+        stage_name: str name of stage
+        fingerprint: str fingerprint of stage
+        artifact_class: namedtuple class of the artifact
+        """
+        try:
+            record_file_path = self.get_record_file_path(stage_name=stage_name, fingerprint=fingerprint)
+            if not os.path.exists(record_file_path):
+                logging.info(f"Stage cache miss for [{stage_name}] fingerprint: [{fingerprint}]")
+                return None
+
+            with open(record_file_path,"r") as record_file:
+                record = json.load(record_file)
+
+            if set(record["artifact"].keys()) != set(artifact_class._fields):
+                logging.info(f"Stage cache entry for [{stage_name}] has outdated artifact fields")
+                return None
+
+            artifact = artifact_class(**record["artifact"])
+
+            for key,value in artifact._asdict().items():
+                if key.endswith("_file_path") and not os.path.exists(value):
+                    logging.info(f"Stage cache entry for [{stage_name}] is stale, missing file: [{value}]")
+                    return None
+
+            logging.info(f"Stage cache hit for [{stage_name}], reusing outputs of run: [{record['time_stamp']}]")
+            return artifact
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def save_artifact(self, stage_name:str, fingerprint:str, artifact) -> None:
+        """
+        Store artifact of stage against its fingerprint
+        stage_name: str name of stage
+        fingerprint: str fingerprint of stage
+        artifact: namedtuple artifact returned by the stage
+        """
+        try:
+            record_file_path = self.get_record_file_path(stage_name=stage_name, fingerprint=fingerprint)
+            os.makedirs(os.path.dirname(record_file_path), exist_ok=True)
+
+            record = {
+                "stage": stage_name,
+                "time_stamp": self.time_stamp,
+                "artifact": artifact._asdict()
+            }
+
+            tmp_record_file_path = f"{record_file_path}.tmp"
+            with open(tmp_record_file_path,"w") as record_file:
+                json.dump(record, record_file, indent=4)
+            os.replace(tmp_record_file_path, record_file_path)
+            logging.info(f"Stage cache entry saved for [{stage_name}] fingerprint: [{fingerprint}]")
+        except Exception as e:
+            raise HousingException(e,sys) from e
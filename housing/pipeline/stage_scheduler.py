@@ -0,0 +1,127 @@
+from housing.exception import HousingException
+from housing.logger import logging, LogContext
+from housing.pipeline.run_state import PipelineRunState, STAGE_STATUS_RUNNING, STAGE_STATUS_COMPLETED, \
+    STAGE_STATUS_SKIPPED, STAGE_STATUS_FAILED
+from housing.util.run_profiler import profile_stage
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import sys
+import time
+
+# run_stage takes dict of dependency stage name -> artifact and returns the stage artifact,
+# None marks the stage as skipped (e.g. model pusher of a rejected model)
+PipelineStage = namedtuple("PipelineStage", ["name", "dependencies", "artifact_class", "run_stage"])
+
+
+class StageScheduler:
+    """
+    Runs pipeline stages declared as a dependency graph. A stage starts in a thread as soon as every
+    stage it depends on finished, so independent stages run concurrently. After a failure no new stage
+    starts, running stages finish and their results are recorded, then the first error is raised.
+    """
+
+    def __init__(self, stages:list, max_workers:int = 2, run_state:PipelineRunState = None) -> None:
+        """
+        stages: list of PipelineStage
+        max_workers: int number of stages running at the same time
+        run_state: PipelineRunState recording stage status, artifacts of stages it holds as finished are reused
+        """
+        try:
+            self.stages = {stage.name: stage for stage in stages}
+            self.max_workers = max(1, max_workers)
+            self.run_state = run_state
+            self.check_dependency_graph()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def check_dependency_graph(self) -> None:
+        """
+        Raise on dependencies missing from the graph or on cycles
+        """
+        try:
+            for stage in self.stages.values():
+                missing_stages = [dependency for dependency in stage.dependencies if dependency not in self.stages]
+                if len(missing_stages) > 0:
+                    raise Exception(f"Stage [{stage.name}] depends on unknown stages: {missing_stages}")
+
+            sorted_stages = []
+            remaining_stages = dict(self.stages)
+            while len(remaining_stages) > 0:
+                ready_stages = [name for name, stage in remaining_stages.items()
+                                if all(dependency in sorted_stages for dependency in stage.dependencies)]
+                if len(ready_stages) == 0:
+                    raise Exception(f"Stages have a dependency cycle: {list(remaining_stages.keys())}")
+                for name in ready_stages:
+                    sorted_stages.append(name)
+                    del remaining_stages[name]
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def execute_stage(self, stage:PipelineStage, dependency_artifacts:dict):
+        start_time = time.perf_counter()
+        with LogContext(stage=stage.name), profile_stage(stage.name):
+            artifact = stage.run_stage(dependency_artifacts)
+            logging.info("Stage [%s] finished", stage.name,
+                         extra={"elapsed_seconds": round(time.perf_counter() - start_time, 6)})
+            return artifact
+
+    def run(self) -> dict:
+        """
+        Run every stage not finished by an earlier attempt of the run
+        return: dict stage name -> artifact, None for skipped stages
+        """
+        try:
+            artifacts = {}
+            if self.run_state is not None:
+                for stage in self.stages.values():
+                    is_finished, artifact = self.run_state.get_finished_artifact(stage_name=stage.name,
+                                                                                 artifact_class=stage.artifact_class)
+                    if is_finished:
+                        logging.info("Reusing [%s] artifact of earlier attempt: %s", stage.name, artifact)
+                        artifacts[stage.name] = artifact
+
+            pending_stages = [name for name in self.stages if name not in artifacts]
+            running_futures = {}
+            errors = []
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="housing-stage") as executor:
+                while len(pending_stages) > 0 or len(running_futures) > 0:
+                    if len(errors) == 0:
+                        ready_stages = [name for name in pending_stages
+                                        if all(dependency in artifacts for dependency in self.stages[name].dependencies)]
+                        for name in ready_stages:
+                            stage = self.stages[name]
+                            pending_stages.remove(name)
+                            # dependencies which were skipped are passed as None
+                            dependency_artifacts = {dependency: artifacts[dependency] for dependency in stage.dependencies}
+                            logging.info(f"Starting stage: [{name}]")
+                            if self.run_state is not None:
+                                self.run_state.set_stage_status(stage_name=name, status=STAGE_STATUS_RUNNING)
+                            running_futures[executor.submit(self.execute_stage, stage, dependency_artifacts)] = name
+
+                    if len(running_futures) == 0:
+                        break
+
+                    done_futures, _ = wait(running_futures.keys(), return_when=FIRST_COMPLETED)
+                    for future in done_futures:
+                        name = running_futures.pop(future)
+                        try:
+                            artifact = future.result()
+                        except Exception as e:
+                            logging.info(f"Stage [{name}] failed: [{e}]")
+                            errors.append(e)
+                            if self.run_state is not None:
+                                self.run_state.set_stage_status(stage_name=name, status=STAGE_STATUS_FAILED, error=str(e))
+                            continue
+
+                        artifacts[name] = artifact
+                        status = STAGE_STATUS_SKIPPED if artifact is None else STAGE_STATUS_COMPLETED
+                        logging.info(f"Stage [{name}] {status}")
+                        if self.run_state is not None:
+                            self.run_state.set_stage_status(stage_name=name, status=status, artifact=artifact)
+
+            if len(errors) > 0:
+                logging.info(f"Stages not started because of failure: {pending_stages}")
+                raise errors[0]
+            return artifacts
+        except Exception as e:
+            raise HousingException(e,sys) from e
@@ -0,0 +1,102 @@
+from housing.exception import HousingException
+import os, sys
+import json
+import struct
+import numpy as np
+
+ARRAY_BUNDLE_MAGIC = b"HOUSARR1"
+ARRAY_BUNDLE_FORMAT_VERSION = 1
+ARRAY_BUNDLE_ALIGNMENT = 64
+ARRAY_BUNDLE_HEADER_LENGTH_FORMAT = "<Q"
+
+
+def get_aligned_offset(offset:int) -> int:
+    return -(-offset // ARRAY_BUNDLE_ALIGNMENT) * ARRAY_BUNDLE_ALIGNMENT
+
+
+def get_data_offset(header_length:int) -> int:
+    return get_aligned_offset(len(ARRAY_BUNDLE_MAGIC) + struct.calcsize(ARRAY_BUNDLE_HEADER_LENGTH_FORMAT) + header_length)
+
+
+def save_array_bundle(file_path:str, metadata:dict, arrays:dict) -> None:
+    """
+    Save numeric arrays and a small JSON metadata header into one file. Layout is the magic bytes,
+    header length, JSON header, then every array as raw C ordered bytes aligned to 64 bytes, so arrays
+    are memory mapped on load without unpickling anything.
+    file_path: str location of file to save
+    metadata: dict JSON serializable values, e.g. column names and categories
+    arrays: dict name to numeric np.ndarray
+    """
+    try:
+        arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+        for name, array in arrays.items():
+            if array.dtype.hasobject:
+                raise Exception(f"Array: [{name}] has object dtype, store its values in metadata instead")
+
+        # offsets are relative to the start of array data, which is aligned right after the header
+        array_infos = {}
+        data_length = 0
+        for name, array in arrays.items():
+            array_infos[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": data_length}
+            data_length = get_aligned_offset(data_length + array.nbytes)
+        header = {"format_version": ARRAY_BUNDLE_FORMAT_VERSION, "metadata": metadata, "arrays": array_infos}
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_offset = get_data_offset(header_length=len(header_bytes))
+
+        dir_path = os.path.dirname(file_path)
+        os.makedirs(dir_path, exist_ok=True)
+        with open(file_path, "wb") as bundle_file:
+            bundle_file.write(ARRAY_BUNDLE_MAGIC)
+            bundle_file.write(struct.pack(ARRAY_BUNDLE_HEADER_LENGTH_FORMAT, len(header_bytes)))
+            bundle_file.write(header_bytes)
+            for name, array in arrays.items():
+                bundle_file.seek(data_offset + array_infos[name]["offset"])
+                bundle_file.write(array.tobytes())
+            bundle_file.truncate(data_offset + data_length)
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def is_array_bundle_file(file_path:str) -> bool:
+    """
+    True when file starts with the array bundle magic bytes, False e.g. for pickle files
+    """
+    try:
+        with open(file_path, "rb") as bundle_file:
+            return bundle_file.read(len(ARRAY_BUNDLE_MAGIC)) == ARRAY_BUNDLE_MAGIC
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def load_array_bundle(file_path:str, mmap_mode:str = "r") -> tuple:
+    """
+    Load file saved by save_array_bundle
+    file_path: str location of file to load
+    mmap_mode: str "r" memory maps arrays read only, None reads them into memory
+    return: tuple (metadata dict, dict name to np.ndarray)
+    """
+    try:
+        with open(file_path, "rb") as bundle_file:
+            if bundle_file.read(len(ARRAY_BUNDLE_MAGIC)) != ARRAY_BUNDLE_MAGIC:
+                raise Exception(f"File: [{file_path}] is not an array bundle")
+            header_length, = struct.unpack(ARRAY_BUNDLE_HEADER_LENGTH_FORMAT,
+                                           bundle_file.read(struct.calcsize(ARRAY_BUNDLE_HEADER_LENGTH_FORMAT)))
+            header = json.loads(bundle_file.read(header_length).decode("utf-8"))
+            if header["format_version"] != ARRAY_BUNDLE_FORMAT_VERSION:
+                raise Exception(f"Array bundle format version: [{header['format_version']}] of [{file_path}] is not supported")
+
+            data_offset = get_data_offset(header_length=header_length)
+            arrays = {}
+            for name, array_info in header["arrays"].items():
+                dtype, shape = np.dtype(array_info["dtype"]), tuple(array_info["shape"])
+                offset = data_offset + array_info["offset"]
+                if int(np.prod(shape)) == 0:
+                    arrays[name] = np.empty(shape, dtype=dtype)
+                elif mmap_mode is not None:
+                    arrays[name] = np.memmap(file_path, dtype=dtype, mode=mmap_mode, offset=offset, shape=shape)
+                else:
+                    bundle_file.seek(offset)
+                    arrays[name] = np.fromfile(bundle_file, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+        return header["metadata"], arrays
+    except Exception as e:
+        raise HousingException(e,sys) from e
@@ -0,0 +1,77 @@
+from housing.exception import HousingException
+import sys
+import numpy as np
+
+# upper bound of resample x row cells generated at once, 4M cells are 32MB of counts
+BOOTSTRAP_MAX_BLOCK_CELLS = 4 * 1024 * 1024
+
+
+def get_bootstrap_count_blocks(row_count:int, sample_count:int, random_state:int = 42):
+    """
+    Yield bootstrap resamples in blocks as count matrices, counts[i, j] is how many times row j is drawn in resample i.
+    Each resample draws row_count rows with replacement, blocks are sized so a block never exceeds
+    BOOTSTRAP_MAX_BLOCK_CELLS cells.
+    """
+    try:
+        random_generator = np.random.default_rng(random_state)
+        block_size = max(1, min(sample_count, BOOTSTRAP_MAX_BLOCK_CELLS // row_count))
+        for block_start in range(0, sample_count, block_size):
+            resample_count = min(block_size, sample_count - block_start)
+            row_index = random_generator.integers(0, row_count, size=(resample_count, row_count))
+            # offset every resample by its own row range so one bincount counts all of them
+            row_index += (np.arange(resample_count) * row_count)[:, None]
+            counts = np.bincount(row_index.ravel(), minlength=resample_count * row_count)
+            yield counts.reshape(resample_count, row_count).astype(np.float64)
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def get_confidence_interval(samples:np.ndarray, confidence_level:float) -> list:
+    """
+    Percentile confidence interval of bootstrap samples
+    """
+    try:
+        alpha = (1.0 - confidence_level) / 2.0
+        lower, upper = np.quantile(samples, [alpha, 1.0 - alpha])
+        return [float(lower), float(upper)]
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def get_bootstrap_regression_metrics(y_true:np.ndarray,
+                                     y_pred_list:list,
+                                     sample_count:int = 2000,
+                                     random_state:int = 42) -> dict:
+    """
+    Paired bootstrap of rmse and r2 of several models predicting the same rows.
+    Every resample is a row of a count matrix W, sums over a resample are W @ column, so all statistics of a
+    block of resamples come from one matrix product instead of a python loop over resamples.
+    y_true: np.ndarray target
+    y_pred_list: list of np.ndarray predictions of every model on the same rows
+    return: dict with "rmse" and "r2" arrays of shape (n_models, sample_count)
+    """
+    try:
+        y_true = np.asarray(y_true, dtype=np.float64)
+        row_count = len(y_true)
+        if row_count == 0:
+            raise Exception("No rows to bootstrap")
+
+        # target is centered so sum of squares does not lose precision to large house values
+        y_centered = y_true - y_true.mean()
+        columns = [y_centered, y_centered ** 2]
+        columns += [(y_true - np.asarray(y_pred, dtype=np.float64)) ** 2 for y_pred in y_pred_list]
+        column_matrix = np.column_stack(columns)
+
+        resample_sums = np.vstack([counts @ column_matrix for counts in
+                                   get_bootstrap_count_blocks(row_count=row_count,
+                                                              sample_count=sample_count,
+                                                              random_state=random_state)])
+
+        total_sum_of_squares = resample_sums[:, 1] - resample_sums[:, 0] ** 2 / row_count
+        squared_error_sums = resample_sums[:, 2:].T
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r2 = 1.0 - squared_error_sums / total_sum_of_squares
+        return {"rmse": np.sqrt(squared_error_sums / row_count), "r2": r2}
+    except Exception as e:
+        raise HousingException(e,sys) from e
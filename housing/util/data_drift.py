@@ -0,0 +1,186 @@
+from housing.exception import HousingException
+import sys
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from scipy import special
+
+DRIFT_P_VALUE_THRESHOLD = 0.05
+DATASET_DRIFT_SHARE = 0.5
+PSI_BIN_COUNT = 10
+PSI_MIN_PROPORTION = 1e-4
+
+
+def sample_rows(dataframe:pd.DataFrame, sample_size:int = None, random_state:int = 42) -> pd.DataFrame:
+    """
+    Uniform sample of rows without replacement, same distribution as a reservoir sample of the dataset
+    dataframe: pd.DataFrame dataset
+    sample_size: int number of rows to keep, None or a size larger than dataset keeps every row
+    """
+    try:
+        if sample_size is None or len(dataframe) <= sample_size:
+            return dataframe
+        random_generator = np.random.default_rng(random_state)
+        row_index = np.sort(random_generator.choice(len(dataframe), size=sample_size, replace=False))
+        return dataframe.iloc[row_index]
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def get_ks_statistic(reference:np.ndarray, current:np.ndarray):
+    """
+    Two sample Kolmogorov-Smirnov statistic and its asymptotic p value
+    reference: np.ndarray sorted values of reference dataset without NaN
+    current: np.ndarray sorted values of current dataset without NaN
+    """
+    try:
+        all_values = np.concatenate([reference, current])
+        reference_cdf = np.searchsorted(reference, all_values, side="right") / len(reference)
+        current_cdf = np.searchsorted(current, all_values, side="right") / len(current)
+        ks_statistic = float(np.max(np.abs(reference_cdf - current_cdf)))
+
+        effective_size = len(reference) * len(current) / (len(reference) + len(current))
+        p_value = float(special.kolmogorov(np.sqrt(effective_size) * ks_statistic))
+        return ks_statistic, min(max(p_value, 0.0), 1.0)
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def get_population_stability_index(reference:np.ndarray, current:np.ndarray, bin_count:int = PSI_BIN_COUNT) -> float:
+    """
+    Population stability index of current values against quantile bins of reference values
+    reference: np.ndarray sorted values of reference dataset without NaN
+    current: np.ndarray sorted values of current dataset without NaN
+    """
+    try:
+        bin_edges = np.unique(np.quantile(reference, np.linspace(0, 1, bin_count + 1)[1:-1]))
+        reference_count = np.bincount(np.searchsorted(bin_edges, reference, side="right"), minlength=len(bin_edges) + 1)
+        current_count = np.bincount(np.searchsorted(bin_edges, current, side="right"), minlength=len(bin_edges) + 1)
+
+        reference_proportion = np.clip(reference_count / len(reference), PSI_MIN_PROPORTION, None)
+        current_proportion = np.clip(current_count / len(current), PSI_MIN_PROPORTION, None)
+        return float(np.sum((current_proportion - reference_proportion) * np.log(current_proportion / reference_proportion)))
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def get_chi_square_statistic(reference:pd.Series, current:pd.Series):
+    """
+    Chi square test of homogeneity between category frequencies of reference and current dataset
+    return: chi square statistic and p value
+    """
+    try:
+        reference_count = reference.value_counts(dropna=True)
+        current_count = current.value_counts(dropna=True)
+        categories = reference_count.index.union(current_count.index)
+
+        observed = np.vstack([reference_count.reindex(categories, fill_value=0).to_numpy(dtype=float),
+                              current_count.reindex(categories, fill_value=0).to_numpy(dtype=float)])
+        observed = observed[:, observed.sum(axis=0) > 0]
+        if observed.shape[1] < 2:
+            return 0.0, 1.0
+
+        expected = observed.sum(axis=1, keepdims=True) * observed.sum(axis=0, keepdims=True) / observed.sum()
+        chi_square = float(np.sum((observed - expected) ** 2 / expected))
+        p_value = float(special.chdtrc(observed.shape[1] - 1, chi_square))
+        return chi_square, p_value
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def get_data_drift_report(reference_df:pd.DataFrame,
+                          current_df:pd.DataFrame,
+                          numerical_columns:list,
+                          categorical_columns:list,
+                          sample_size:int = None,
+                          random_state:int = 42) -> dict:
+    """
+    Per feature drift of current dataset against reference dataset.
+    Numerical columns are compared with KS test and PSI, categorical columns with chi square test.
+    reference_df: pd.DataFrame reference dataset, training set of the pipeline
+    current_df: pd.DataFrame current dataset, testing set of the pipeline
+    sample_size: int optional number of rows sampled from each dataset before computing statistics
+    return: dict report laid out like evidently data drift profile
+    """
+    try:
+        reference_df = sample_rows(dataframe=reference_df, sample_size=sample_size, random_state=random_state)
+        current_df = sample_rows(dataframe=current_df, sample_size=sample_size, random_state=random_state)
+
+        metrics = {}
+        for column in numerical_columns:
+            reference = reference_df[column].to_numpy(dtype=float)
+            current = current_df[column].to_numpy(dtype=float)
+            reference = np.sort(reference[~np.isnan(reference)])
+            current = np.sort(current[~np.isnan(current)])
+
+            if len(reference) == 0 or len(current) == 0:
+                raise Exception(f"Column: [{column}] has no values to compute data drift")
+
+            ks_statistic, p_value = get_ks_statistic(reference=reference, current=current)
+            metrics[column] = {
+                "column_type": "num",
+                "stattest_name": "K-S p_value",
+                "drift_score": p_value,
+                "drift_detected": p_value < DRIFT_P_VALUE_THRESHOLD,
+                "ks_statistic": ks_statistic,
+                "psi": get_population_stability_index(reference=reference, current=current),
+                "reference_mean": float(reference.mean()),
+                "current_mean": float(current.mean())
+            }
+
+        for column in categorical_columns:
+            chi_square, p_value = get_chi_square_statistic(reference=reference_df[column], current=current_df[column])
+            metrics[column] = {
+                "column_type": "cat",
+                "stattest_name": "chi-square p_value",
+                "drift_score": p_value,
+                "drift_detected": p_value < DRIFT_P_VALUE_THRESHOLD,
+                "chi_square": chi_square
+            }
+
+        n_features = len(metrics)
+        n_drifted_features = sum(metric["drift_detected"] for metric in metrics.values())
+        share_drifted_features = n_drifted_features / n_features if n_features else 0.0
+        metrics.update({
+            "n_features": n_features,
+            "n_drifted_features": n_drifted_features,
+            "share_drifted_features": share_drifted_features,
+            "dataset_drift": share_drifted_features >= DATASET_DRIFT_SHARE
+        })
+
+        return {
+            "data_drift": {
+                "name": "data_drift",
+                "datetime": str(datetime.now()),
+                "data": {
+                    "num_feature_names": list(numerical_columns),
+                    "cat_feature_names": list(categorical_columns),
+                    "reference_row_count": len(reference_df),
+                    "current_row_count": len(current_df),
+                    "metrics": metrics
+                }
+            }
+        }
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def get_data_drift_report_page(report:dict) -> str:
+    """
+    Minimal html page listing drift metrics of every feature of a native drift report
+    """
+    try:
+        metrics = report["data_drift"]["data"]["metrics"]
+        rows = []
+        for column, metric in metrics.items():
+            if not isinstance(metric, dict):
+                continue
+            rows.append(f"<tr><td>{column}</td><td>{metric['column_type']}</td><td>{metric['stattest_name']}</td>"
+                        f"<td>{metric['drift_score']:.6f}</td><td>{metric['drift_detected']}</td></tr>")
+        return ("<html><head><title>Data Drift Report</title></head><body>"
+                f"<h2>Data Drift Report</h2><p>Drifted features: {metrics['n_drifted_features']} of {metrics['n_features']}, "
+                f"dataset drift: {metrics['dataset_drift']}</p>"
+                "<table border='1'><tr><th>Feature</th><th>Type</th><th>Test</th><th>Score</th><th>Drift detected</th></tr>"
+                f"{''.join(rows)}</table></body></html>")
+    except Exception as e:
+        raise HousingException(e,sys) from e
@@ -0,0 +1,76 @@
+from __future__ import annotations
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.util.util import read_dataframe
+import os, sys
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class DatasetRegistry:
+    """
+    Keeps datasets loaded during a pipeline run so that every file is parsed only once.
+    Returned dataframes are shared between stages and must be treated as read-only,
+    stages needing to modify a dataframe have to work on a copy.
+    """
+
+    def __init__(self) -> None:
+        try:
+            self.datasets = {}
+            self.load_locks = {}
+            self.lock = threading.Lock()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_dataset_key(self, file_path:str, columns:list = None, dtype:dict = None) -> tuple:
+        """
+        Key of a parsed dataset, the same file read with other columns or dtypes is another dataset
+        """
+        dtype_key = None if dtype is None else tuple(sorted((column, str(column_dtype)) for column, column_dtype in dtype.items()))
+        return os.path.abspath(file_path), None if columns is None else tuple(columns), dtype_key
+
+    def get_dataframe(self, file_path:str, columns:list = None, dtype:dict = None) -> pd.DataFrame:
+        """
+        Return dataset of file, parsing it on first request only
+        file_path: str location of csv or parquet dataset
+        columns: list of columns to read, None reads all columns
+        dtype: dict column name -> pandas dtype applied when the file is parsed
+        """
+        try:
+            dataset_key = self.get_dataset_key(file_path=file_path, columns=columns, dtype=dtype)
+
+            with self.lock:
+                if dataset_key in self.datasets:
+                    return self.datasets[dataset_key]
+                if columns is not None:
+                    # columns of a dataset already parsed with every column and the same dtypes are not parsed again
+                    dataframe = self.datasets.get(self.get_dataset_key(file_path=file_path, dtype=dtype))
+                    if dataframe is not None and all(column in dataframe.columns for column in columns):
+                        return dataframe[list(columns)]
+                load_lock = self.load_locks.setdefault(dataset_key, threading.Lock())
+
+            # only one thread parses a given file, others wait for its result
+            with load_lock:
+                with self.lock:
+                    if dataset_key in self.datasets:
+                        return self.datasets[dataset_key]
+
+                logging.info(f"Loading dataset [ {file_path} ] into dataset registry")
+                dataframe = read_dataframe(file_path=file_path, columns=columns, dtype=dtype)
+
+                with self.lock:
+                    self.datasets[dataset_key] = dataframe
+                return dataframe
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def clear(self) -> None:
+        try:
+            with self.lock:
+                self.datasets.clear()
+                self.load_locks.clear()
+        except Exception as e:
+            raise HousingException(e,sys) from e
@@ -0,0 +1,75 @@
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.util.util import read_yaml_file, get_schema_dtypes
+from housing.constant import *
+import os, sys
+import threading
+
+
+class DatasetSchema:
+    """
+    schema.yaml parsed once into column lists and the pandas dtypes datasets are loaded with.
+    Instances are shared through get_dataset_schema and must be treated as read-only.
+    """
+
+    def __init__(self, schema_file_path:str, dataset_schema:dict) -> None:
+        """
+        schema_file_path: str location of schema.yaml
+        dataset_schema: dict content of schema.yaml
+        """
+        try:
+            self.schema_file_path = schema_file_path
+            self.schema = dataset_schema
+            self.columns = dict(dataset_schema[DATASET_SCHEMA_COLUMNS])
+            self.target_column = dataset_schema[DATASET_SCHEMA_TARGET_COLUMN]
+            self.numerical_columns = list(dataset_schema.get(DATASET_SCHEMA_NUMERICAL_COLUMN) or [])
+            self.categorical_columns = list(dataset_schema.get(DATASET_SCHEMA_CATEGORICAL_COLUMN) or [])
+            self.domain_value = dict(dataset_schema.get(DATASET_SCHEMA_DOMAIN_VALUE) or {})
+            self.dtypes = get_schema_dtypes(dataset_schema=dataset_schema)
+            self.input_columns = [column for column in self.columns if column != self.target_column]
+            self.input_dtypes = {column: self.dtypes[column] for column in self.input_columns}
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_read_options(self, columns:list = None) -> dict:
+        """
+        usecols and dtype of pandas readers loading only the given schema columns
+        columns: list of columns to load, None loads every column of the file
+        """
+        try:
+            if columns is None:
+                return {"usecols": None, "dtype": dict(self.dtypes)}
+            unknown_columns = [column for column in columns if column not in self.dtypes]
+            if len(unknown_columns) > 0:
+                raise Exception(f"Columns: {unknown_columns} are not in schema: [{self.schema_file_path}]")
+            return {"usecols": list(columns), "dtype": {column: self.dtypes[column] for column in columns}}
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+
+# absolute schema file path -> (modification time, size, DatasetSchema)
+dataset_schema_cache = {}
+dataset_schema_cache_lock = threading.Lock()
+
+
+def get_dataset_schema(schema_file_path:str) -> DatasetSchema:
+    """
+    Parsed schema of file, the file is parsed again only after its modification time or size changed
+    schema_file_path: str location of schema.yaml
+    """
+    try:
+        schema_key = os.path.abspath(schema_file_path)
+        file_stat = os.stat(schema_key)
+        with dataset_schema_cache_lock:
+            cached_schema = dataset_schema_cache.get(schema_key)
+        if cached_schema is not None and cached_schema[:2] == (file_stat.st_mtime_ns, file_stat.st_size):
+            return cached_schema[2]
+
+        logging.info(f"Parsing dataset schema: [{schema_file_path}]")
+        dataset_schema = DatasetSchema(schema_file_path=schema_file_path,
+                                       dataset_schema=read_yaml_file(file_path=schema_file_path))
+        with dataset_schema_cache_lock:
+            dataset_schema_cache[schema_key] = (file_stat.st_mtime_ns, file_stat.st_size, dataset_schema)
+        return dataset_schema
+    except Exception as e:
+        raise HousingException(e,sys) from e
@@ -0,0 +1,202 @@
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.util.util import get_file_checksum
+from housing.constant import *
+from six.moves import urllib
+import os, sys
+import hashlib
+import json
+import shutil
+
+
+def is_local_url(url:str) -> bool:
+    return urllib.parse.urlparse(url).scheme in ("", "file")
+
+
+def get_local_file_path(url:str) -> str:
+    """
+    Path of file:// url or of plain local path
+    """
+    parsed_url = urllib.parse.urlparse(url)
+    if parsed_url.scheme == "file":
+        return urllib.request.url2pathname(parsed_url.path)
+    return url
+
+
+class DownloadCache:
+    """
+    Downloaded files kept across runs under their sha256 checksum. Every url records the checksum and the
+    http validator (ETag, Last-Modified, Content-Length) of its last download, a url is downloaded again
+    only when its validator changed. An interrupted download is resumed with a range request from the
+    bytes already in the partial file, unless the validator of the url changed since.
+    Local paths and file:// urls are read where they are, nothing is copied into the cache.
+
+    cache_dir/urls/<sha256 of url>.json       checksum, validator and file name of last download of url
+    cache_dir/blobs/<checksum>/<file name>    downloaded file
+    cache_dir/partial/<sha256 of url>.part    download in progress
+    """
+
+    def __init__(self, cache_dir:str) -> None:
+        """
+        cache_dir: str directory of cache, not time stamped so runs share it
+        """
+        try:
+            self.cache_dir = cache_dir
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_url_key(self, url:str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def get_url_record_file_path(self, url:str) -> str:
+        return os.path.join(self.cache_dir, DOWNLOAD_CACHE_URL_DIR, f"{self.get_url_key(url)}.json")
+
+    def get_blob_file_path(self, checksum:str, file_name:str) -> str:
+        return os.path.join(self.cache_dir, DOWNLOAD_CACHE_BLOB_DIR, checksum, file_name)
+
+    def get_partial_file_path(self, url:str) -> str:
+        return os.path.join(self.cache_dir, DOWNLOAD_CACHE_PARTIAL_DIR, f"{self.get_url_key(url)}.part")
+
+    def read_json(self, file_path:str) -> dict:
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, "r") as json_file:
+            return json.load(json_file)
+
+    def write_json(self, file_path:str, content:dict) -> None:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_file_path = f"{file_path}.tmp"
+        with open(temp_file_path, "w") as json_file:
+            json.dump(content, json_file, indent=2)
+        os.replace(temp_file_path, file_path)
+
+    def get_remote_validator(self, url:str) -> tuple:
+        """
+        return: tuple (is_reachable, validator) validator is None when server sends none of the headers
+        """
+        try:
+            request = urllib.request.Request(url, method="HEAD")
+            with urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT_SECONDS) as response:
+                headers = [response.headers.get(name) for name in ("ETag", "Last-Modified", "Content-Length")]
+            if not any(headers):
+                return True, None
+            return True, "-".join(str(header) for header in headers)
+        except Exception as e:
+            logging.info(f"Unable to reach download url: [{url}]: [{e}]")
+            return False, None
+
+    def verify_checksum(self, file_path:str, checksum:str) -> str:
+        """
+        sha256 of file, raise when it differs from expected checksum
+        checksum: str expected sha256, None accepts any content
+        """
+        file_checksum = get_file_checksum(file_path=file_path)
+        if checksum is not None and file_checksum != checksum.lower():
+            raise Exception(f"Checksum of [{file_path}] is [{file_checksum}], expected [{checksum}]")
+        return file_checksum
+
+    def download(self, url:str, partial_file_path:str, validator:str) -> None:
+        """
+        Download url into partial file, continuing after bytes downloaded by an interrupted attempt
+        validator: str ETag or Last-Modified based validator of url, partial file of another version is discarded
+        """
+        partial_record_file_path = f"{partial_file_path}.json"
+        partial_record = self.read_json(partial_record_file_path)
+        if partial_record is None or validator is None or partial_record["validator"] != validator:
+            if os.path.exists(partial_file_path):
+                os.remove(partial_file_path)
+        downloaded_size = os.path.getsize(partial_file_path) if os.path.exists(partial_file_path) else 0
+        self.write_json(partial_record_file_path, {"url": url, "validator": validator})
+
+        headers = {}
+        if downloaded_size > 0:
+            headers["Range"] = f"bytes={downloaded_size}-"
+            logging.info(f"Resuming download of: [{url}] after {downloaded_size} bytes")
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            response = urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT_SECONDS)
+        except urllib.error.HTTPError as e:
+            # partial file already holds the whole content
+            if e.code == 416 and downloaded_size > 0:
+                return
+            raise
+        with response:
+            if downloaded_size > 0 and response.status != 206:
+                logging.info(f"Server ignored range request, downloading: [{url}] from start")
+                downloaded_size = 0
+            with open(partial_file_path, "ab" if downloaded_size > 0 else "wb") as partial_file:
+                shutil.copyfileobj(response, partial_file, DOWNLOAD_CHUNK_SIZE)
+
+    def is_blob_referenced(self, checksum:str) -> bool:
+        url_dir = os.path.join(self.cache_dir, DOWNLOAD_CACHE_URL_DIR)
+        for file_name in os.listdir(url_dir):
+            if file_name.endswith(".json"):
+                url_record = self.read_json(os.path.join(url_dir, file_name))
+                if url_record is not None and url_record["checksum"] == checksum:
+                    return True
+        return False
+
+    def get_file(self, url:str, checksum:str = None) -> str:
+        """
+        Local path of file at url, downloading it only when the cache holds no current copy
+        url: str http(s) or file:// url or local path
+        checksum: str expected sha256 of file, checked on every local file and every download
+        return: str file path
+        """
+        try:
+            if is_local_url(url):
+                file_path = get_local_file_path(url)
+                if checksum is not None:
+                    self.verify_checksum(file_path=file_path, checksum=checksum)
+                logging.info(f"Reading local dataset source: [{file_path}]")
+                return file_path
+
+            file_name = os.path.basename(urllib.parse.urlparse(url).path)
+            if checksum is not None:
+                blob_file_path = self.get_blob_file_path(checksum=checksum.lower(), file_name=file_name)
+                if os.path.exists(blob_file_path):
+                    logging.info(f"Download cache hit by checksum: [{blob_file_path}]")
+                    return blob_file_path
+
+            url_record_file_path = self.get_url_record_file_path(url)
+            url_record = self.read_json(url_record_file_path)
+            is_reachable, validator = self.get_remote_validator(url)
+            if url_record is not None and (checksum is None or url_record["checksum"] == checksum.lower()):
+                blob_file_path = self.get_blob_file_path(checksum=url_record["checksum"], file_name=url_record["file_name"])
+                if os.path.exists(blob_file_path):
+                    if not is_reachable:
+                        logging.info(f"Using cached copy of unreachable url: [{blob_file_path}]")
+                        return blob_file_path
+                    if validator is not None and validator == url_record["validator"]:
+                        logging.info(f"Download cache hit: [{blob_file_path}]")
+                        return blob_file_path
+            if not is_reachable:
+                raise Exception(f"Download url: [{url}] is not reachable and not in download cache")
+
+            partial_file_path = self.get_partial_file_path(url)
+            os.makedirs(os.path.dirname(partial_file_path), exist_ok=True)
+            logging.info(f"Downloading file from: [{url}] into: [{partial_file_path}]")
+            self.download(url=url, partial_file_path=partial_file_path, validator=validator)
+            try:
+                file_checksum = self.verify_checksum(file_path=partial_file_path, checksum=checksum)
+            except Exception:
+                os.remove(partial_file_path)
+                raise
+
+            blob_file_path = self.get_blob_file_path(checksum=file_checksum, file_name=file_name)
+            os.makedirs(os.path.dirname(blob_file_path), exist_ok=True)
+            os.replace(partial_file_path, blob_file_path)
+            os.remove(f"{partial_file_path}.json")
+            self.write_json(url_record_file_path, {"url": url, "checksum": file_checksum,
+                                                   "validator": validator, "file_name": file_name})
+
+            # previous version of url is not needed anymore unless another url has the same content
+            if url_record is not None and url_record["checksum"] != file_checksum and \
+                    not self.is_blob_referenced(checksum=url_record["checksum"]):
+                shutil.rmtree(os.path.dirname(self.get_blob_file_path(checksum=url_record["checksum"],
+                                                                      file_name=url_record["file_name"])),
+                              ignore_errors=True)
+            logging.info(f"File : [{blob_file_path}] has been downloaded successfully.")
+            return blob_file_path
+        except Exception as e:
+            raise HousingException(e,sys) from e
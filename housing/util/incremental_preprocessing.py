@@ -0,0 +1,149 @@
+from housing.exception import HousingException
+from housing.util.preprocessing_kernel import PreprocessingKernel
+import sys
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+
+class IncrementalPreprocessingState:
+    """
+    Statistics of the preprocessing built by DataTransformation, updated one batch of new training rows at a time.
+    Numerical imputer medians come from a uniform reservoir sample of every column, which holds every value
+    until sketch_size values are seen, so medians are exact for datasets up to that size. Most frequent
+    category is counted exactly. Scaler means and variances are fitted on the first batch and kept, so rows
+    transformed by earlier runs stay valid and transformed arrays only grow. Earlier rows keep the
+    imputation of the batch they came with.
+    """
+
+    def __init__(self,
+                 numerical_columns:list,
+                 ratio_indices:list,
+                 categorical_column:str,
+                 categories:list,
+                 numerical_dtype:str = "float64",
+                 sketch_size:int = 100000,
+                 random_state:int = 42) -> None:
+        """
+        numerical_columns: list of numerical input columns
+        ratio_indices: list of numerator and denominator index of features generated by FeatureGenerator
+        categorical_column: str categorical input column
+        categories: list every category of categorical column, from domain values of schema
+        numerical_dtype: str dtype numerical features are generated and scaled in
+        sketch_size: int number of values kept per column to compute medians
+        """
+        try:
+            self.numerical_columns = list(numerical_columns)
+            self.ratio_indices = [list(ratio_index) for ratio_index in ratio_indices]
+            self.categorical_column = categorical_column
+            self.categories = np.array(sorted(categories), dtype=object)
+            self.numerical_dtype = np.dtype(numerical_dtype)
+            self.sketch_size = sketch_size
+            self.random_generator = np.random.default_rng(random_state)
+
+            self.median_sketches = [np.empty(0, dtype=np.float64) for _ in self.numerical_columns]
+            self.value_counts = np.zeros(len(self.numerical_columns), dtype=np.int64)
+            self.category_counts = np.zeros(len(self.categories), dtype=np.int64)
+            self.numerical_scaler = StandardScaler()
+            self.category_scaler = StandardScaler(with_mean=False)
+
+            # rows of training and testing files already transformed and the file sizes they end at
+            self.train_file_path = None
+            self.train_row_count = 0
+            self.test_row_count = 0
+            self.train_file_size = 0
+            self.test_file_size = 0
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_signature(self) -> dict:
+        """
+        Settings the statistics depend on, state is rebuilt when any of them changes
+        """
+        return {"numerical_columns": self.numerical_columns,
+                "ratio_indices": self.ratio_indices,
+                "categorical_column": self.categorical_column,
+                "categories": self.categories.tolist(),
+                "numerical_dtype": str(self.numerical_dtype),
+                "sketch_size": self.sketch_size}
+
+    def update_median_sketch(self, column_number:int, values:np.ndarray) -> None:
+        """
+        Reservoir sampling (algorithm R) of one column, vectorized over a batch of values
+        """
+        try:
+            values = values[~np.isnan(values)]
+            sketch = self.median_sketches[column_number]
+            seen_count = self.value_counts[column_number]
+
+            free_count = min(max(self.sketch_size - len(sketch), 0), len(values))
+            if free_count > 0:
+                sketch = np.concatenate([sketch, values[:free_count]])
+
+            replacing_values = values[free_count:]
+            if len(replacing_values) > 0:
+                # value number i (0 based) of the stream replaces a random slot with probability sketch_size / (i + 1)
+                stream_positions = seen_count + free_count + np.arange(len(replacing_values))
+                slots = self.random_generator.integers(0, stream_positions + 1)
+                is_kept = slots < self.sketch_size
+                sketch[slots[is_kept]] = replacing_values[is_kept]
+
+            self.median_sketches[column_number] = sketch
+            self.value_counts[column_number] = seen_count + len(values)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_preprocessing_kernel(self, scaled:bool = True) -> PreprocessingKernel:
+        """
+        Preprocessing kernel of current statistics
+        scaled: bool False builds a kernel without scalers, used to get imputed and generated features
+        """
+        try:
+            if np.any(self.value_counts == 0) or self.category_counts.sum() == 0:
+                raise Exception("Incremental preprocessing has no training values for some column yet")
+
+            numerical_fill_values = np.array([np.median(sketch) for sketch in self.median_sketches])
+            # ties of most frequent category resolve to the smallest category like SimpleImputer
+            categorical_fill_value = self.categories[int(np.argmax(self.category_counts))]
+
+            return PreprocessingKernel(numerical_columns=self.numerical_columns,
+                                       numerical_fill_values=numerical_fill_values,
+                                       ratio_indices=self.ratio_indices,
+                                       numerical_mean=self.numerical_scaler.mean_ if scaled else None,
+                                       numerical_scale=self.numerical_scaler.scale_ if scaled else None,
+                                       categorical_column=self.categorical_column,
+                                       categorical_fill_value=categorical_fill_value,
+                                       categories=self.categories,
+                                       category_scale=self.category_scaler.scale_ if scaled else None,
+                                       numerical_dtype=str(self.numerical_dtype))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def partial_fit(self, dataframe:pd.DataFrame) -> np.ndarray:
+        """
+        Update statistics with new training rows
+        dataframe: pd.DataFrame new training rows with input columns
+        return: np.ndarray unscaled output of new rows, imputed with the updated medians
+        """
+        try:
+            numerical_values = dataframe[self.numerical_columns].to_numpy(dtype=np.float64)
+            for column_number in range(len(self.numerical_columns)):
+                self.update_median_sketch(column_number=column_number, values=numerical_values[:, column_number])
+
+            category_values = dataframe[self.categorical_column].dropna().to_numpy(dtype=object)
+            category_codes = np.searchsorted(self.categories, category_values)
+            category_codes = np.minimum(category_codes, len(self.categories) - 1)
+            is_unknown = self.categories[category_codes] != category_values
+            if is_unknown.any():
+                raise ValueError(f"Found categories {sorted(set(category_values[is_unknown]))} missing in schema domain "
+                                 f"values of column [{self.categorical_column}]")
+            self.category_counts += np.bincount(category_codes, minlength=len(self.categories))
+
+            unscaled_output = self.get_preprocessing_kernel(scaled=False).transform(dataframe)
+            if not hasattr(self.numerical_scaler, "scale_"):
+                numerical_output_count = len(self.numerical_columns) + len(self.ratio_indices)
+                self.numerical_scaler.fit(unscaled_output[:, :numerical_output_count].astype(self.numerical_dtype))
+                self.category_scaler.fit(unscaled_output[:, numerical_output_count:])
+            return unscaled_output
+        except Exception as e:
+            raise HousingException(e,sys) from e
@@ -0,0 +1,104 @@
+from housing.exception import HousingException
+from housing.logger import logging
+from concurrent.futures import Future
+import sys
+import time
+import queue
+import threading
+import pandas as pd
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into one vectorized call.
+    Requests are queued, a background thread takes the first waiting request and keeps collecting
+    more until the batch holds max_batch_size rows or max_batch_wait_ms has passed since it started.
+    """
+
+    def __init__(self, predict_function, max_batch_size:int = 64, max_batch_wait_ms:float = 5.0) -> None:
+        """
+        MicroBatcher Initialization
+        predict_function: callable taking a pd.DataFrame and returning one prediction per row
+        max_batch_size: int maximum rows predicted together, larger requests are predicted alone
+        max_batch_wait_ms: float maximum time the first request of a batch waits for others
+        """
+        try:
+            self.predict_function = predict_function
+            self.max_batch_size = max_batch_size
+            self.max_batch_wait_seconds = max_batch_wait_ms / 1000.0
+            self.request_queue = queue.Queue()
+            self.worker = threading.Thread(target=self.run, name="housing-micro-batcher", daemon=True)
+            self.worker.start()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def submit(self, dataframe:pd.DataFrame) -> Future:
+        """
+        Queue rows for prediction
+        dataframe: pd.DataFrame input rows of one request
+        return: Future resolved with predictions of these rows
+        """
+        future = Future()
+        self.request_queue.put((dataframe, future))
+        return future
+
+    def get_batch(self) -> list:
+        request = self.request_queue.get()
+        if request is None:
+            return None
+
+        batch = [request]
+        row_count = len(request[0])
+        deadline = time.monotonic() + self.max_batch_wait_seconds
+
+        while row_count < self.max_batch_size:
+            remaining_time = deadline - time.monotonic()
+            if remaining_time <= 0:
+                break
+            try:
+                request = self.request_queue.get(timeout=remaining_time)
+            except queue.Empty:
+                break
+            if request is None:
+                # keep stop signal for the next loop of worker
+                self.request_queue.put(None)
+                break
+            batch.append(request)
+            row_count += len(request[0])
+        return batch
+
+    def predict_batch(self, batch:list) -> None:
+        if len(batch) == 1:
+            dataframe = batch[0][0]
+        else:
+            dataframe = pd.concat([request_dataframe for request_dataframe, _ in batch], ignore_index=True)
+
+        predictions = self.predict_function(dataframe)
+
+        offset = 0
+        for request_dataframe, future in batch:
+            future.set_result(predictions[offset: offset + len(request_dataframe)])
+            offset += len(request_dataframe)
+
+    def run(self) -> None:
+        while True:
+            batch = self.get_batch()
+            if batch is None:
+                return
+            try:
+                self.predict_batch(batch=batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    continue
+                # one bad request must not fail the requests batched with it
+                logging.info(f"Batch of {len(batch)} requests failed: [{e}], predicting requests one by one")
+                for request in batch:
+                    try:
+                        self.predict_batch(batch=[request])
+                    except Exception as request_error:
+                        request[1].set_exception(request_error)
+
+    def close(self) -> None:
+        self.request_queue.put(None)
+        self.worker.join()
@@ -0,0 +1,117 @@
+from housing.exception import HousingException
+from housing.logger import logging
+from housing.constant import *
+import os, sys
+import shutil
+
+
+class ModelRegistry:
+    """
+    Versioned model bundles under export dir. Every version is a directory holding the model and its
+    preprocessing objects, the CURRENT file holds the version being served. A version directory is
+    copied under a hidden staging name and renamed once complete, then CURRENT is replaced with
+    os.replace, so readers always see either the previous or the new version, never a partial one.
+    """
+
+    def __init__(self, export_dir_path:str) -> None:
+        """
+        export_dir_path: str directory holding every model version
+        """
+        try:
+            self.export_dir_path = export_dir_path
+            self.current_version_file_path = os.path.join(export_dir_path, MODEL_REGISTRY_CURRENT_VERSION_FILE_NAME)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_model_versions(self) -> list:
+        """
+        Sorted versions of complete model directories
+        """
+        try:
+            if not os.path.isdir(self.export_dir_path):
+                return []
+            return sorted(dir_name for dir_name in os.listdir(self.export_dir_path)
+                          if not dir_name.startswith(".") and os.path.isdir(os.path.join(self.export_dir_path, dir_name)))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_current_version(self) -> str:
+        """
+        Version named in CURRENT file, latest version directory when there is no CURRENT file yet,
+        None if no model is exported
+        """
+        try:
+            if os.path.exists(self.current_version_file_path):
+                with open(self.current_version_file_path, "r") as current_version_file:
+                    current_version = current_version_file.read().strip()
+                if os.path.isdir(os.path.join(self.export_dir_path, current_version)):
+                    return current_version
+                logging.info(f"Current model version: [{current_version}] does not exist in: [{self.export_dir_path}]")
+                return None
+
+            # directories exported before the registry kept a CURRENT file
+            model_versions = self.get_model_versions()
+            return model_versions[-1] if len(model_versions) > 0 else None
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_current_model_dir(self) -> str:
+        """
+        Directory of the model being served, None if no model is exported
+        """
+        try:
+            current_version = self.get_current_version()
+            if current_version is None:
+                return None
+            return os.path.join(self.export_dir_path, current_version)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def set_current_version(self, version:str) -> None:
+        """
+        Atomically point CURRENT file to an exported version
+        """
+        try:
+            if not os.path.isdir(os.path.join(self.export_dir_path, version)):
+                raise Exception(f"Model version: [{version}] does not exist in: [{self.export_dir_path}]")
+
+            temp_file_path = f"{self.current_version_file_path}.tmp"
+            with open(temp_file_path, "w") as temp_file:
+                temp_file.write(version)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.replace(temp_file_path, self.current_version_file_path)
+            logging.info(f"Current model version set to: [{version}]")
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def publish_model(self, version:str, file_paths:list, dir_paths:list = None) -> str:
+        """
+        Copy model bundle files into a new version directory and make it the current version
+        version: str name of version directory, versions sort in publish order
+        file_paths: list of files of the bundle, copied with their file names
+        dir_paths: list of directories of the bundle (e.g. partition models), copied with their directory names
+        return: str directory of published version
+        """
+        try:
+            model_dir = os.path.join(self.export_dir_path, version)
+            if os.path.exists(model_dir):
+                raise Exception(f"Model version: [{version}] already exists in: [{self.export_dir_path}]")
+
+            staging_dir = os.path.join(self.export_dir_path, f".{version}.staging")
+            if os.path.exists(staging_dir):
+                shutil.rmtree(staging_dir)
+            os.makedirs(staging_dir)
+
+            for file_path in file_paths:
+                logging.info(f"Copying [{file_path}] into model version: [{version}]")
+                shutil.copy2(file_path, os.path.join(staging_dir, os.path.basename(file_path)))
+            for dir_path in dir_paths or []:
+                logging.info(f"Copying [{dir_path}] into model version: [{version}]")
+                shutil.copytree(dir_path, os.path.join(staging_dir, os.path.basename(os.path.normpath(dir_path))))
+            os.rename(staging_dir, model_dir)
+
+            self.set_current_version(version=version)
+            return model_dir
+        except Exception as e:
+            raise HousingException(e,sys) from e
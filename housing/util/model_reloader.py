@@ -0,0 +1,90 @@
+from housing.exception import HousingException
+from housing.logger import logging
+import sys
+import threading
+
+
+class ModelReloader:
+    """
+    Keeps the currently published model loaded and swaps in a new version without blocking requests.
+    A background thread polls the current model dir, loads and warms up a new version off the request
+    path, then replaces the predictor reference in one assignment, so in-flight requests finish on the
+    model they started with and later ones use the new one.
+    """
+
+    def __init__(self, get_current_model_dir, load_predictor, warm_up_predictor = None,
+                 poll_interval_seconds:float = 10.0) -> None:
+        """
+        ModelReloader Initialization
+        get_current_model_dir: callable returning directory of the published model, None if there is none
+        load_predictor: callable taking a model dir and returning an object with predict(dataframe)
+        warm_up_predictor: callable taking a loaded predictor, run before it starts serving
+        poll_interval_seconds: float time between two checks for a new version
+        """
+        try:
+            self.get_current_model_dir = get_current_model_dir
+            self.load_predictor = load_predictor
+            self.warm_up_predictor = warm_up_predictor
+            self.poll_interval_seconds = poll_interval_seconds
+            self.model_dir = None
+            self.failed_model_dir = None
+            self.predictor = None
+            self.stop_event = threading.Event()
+
+            # first model is loaded before serving starts, a broken current version must not stop the
+            # process from starting, requests are refused until a loadable version is published
+            try:
+                self.reload()
+            except Exception as e:
+                logging.info(f"Model version: [{self.failed_model_dir}] failed to load, no model is served: [{e}]")
+            self.worker = threading.Thread(target=self.run, name="housing-model-reloader", daemon=True)
+            self.worker.start()
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def reload(self) -> bool:
+        """
+        Load current model if it differs from the served one
+        return: bool True when a new model was swapped in
+        """
+        try:
+            model_dir = self.get_current_model_dir()
+            if model_dir is None or model_dir in (self.model_dir, self.failed_model_dir):
+                return False
+
+            logging.info(f"Loading model version: [{model_dir}]")
+            try:
+                predictor = self.load_predictor(model_dir)
+                if self.warm_up_predictor is not None:
+                    self.warm_up_predictor(predictor)
+            except Exception:
+                # a broken version is not retried until another one is published
+                self.failed_model_dir = model_dir
+                raise
+
+            self.predictor, self.model_dir = predictor, model_dir
+            logging.info(f"Serving model version: [{model_dir}]")
+            return True
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def predict(self, dataframe):
+        """
+        Predict with the served model, raise if no model is published yet
+        """
+        predictor = self.predictor
+        if predictor is None:
+            raise Exception("No trained model is available")
+        return predictor.predict(dataframe)
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.poll_interval_seconds):
+            try:
+                self.reload()
+            except Exception as e:
+                # previous model keeps serving
+                logging.info(f"Model reload failed, serving model version: [{self.model_dir}]: [{e}]")
+
+    def close(self) -> None:
+        self.stop_event.set()
+        self.worker.join()
@@ -0,0 +1,53 @@
+from housing.exception import HousingException
+from housing.constant import *
+import sys
+import re
+import numpy as np
+import pandas as pd
+
+
+def get_partition_values(dataframe:pd.DataFrame, partition_key:str, geo_tile_degrees:float = None) -> pd.Series:
+    """
+    Partition of every row as string, None for rows whose key is missing
+    partition_key: str schema column, or geo_tile for tiles of latitude and longitude
+    geo_tile_degrees: float size of a geo tile in degrees, used by geo_tile only
+    """
+    try:
+        if partition_key == PARTITION_KEY_GEO_TILE:
+            if geo_tile_degrees is None or geo_tile_degrees <= 0:
+                raise Exception(f"Geo tile degrees: [{geo_tile_degrees}] must be greater than 0")
+            # tile index of a coordinate is the number of whole tiles below it, so tiles never overlap
+            latitude_tiles = np.floor(dataframe[PARTITION_GEO_TILE_LATITUDE_COLUMN].to_numpy(dtype=float) / geo_tile_degrees)
+            longitude_tiles = np.floor(dataframe[PARTITION_GEO_TILE_LONGITUDE_COLUMN].to_numpy(dtype=float) / geo_tile_degrees)
+            partition_values = [None if np.isnan(latitude_tile) or np.isnan(longitude_tile)
+                                else f"tile_{int(latitude_tile)}_{int(longitude_tile)}"
+                                for latitude_tile, longitude_tile in zip(latitude_tiles, longitude_tiles)]
+            return pd.Series(partition_values, index=dataframe.index, dtype=object)
+
+        if partition_key not in dataframe.columns:
+            raise Exception(f"Partition key: [{partition_key}] is neither [{PARTITION_KEY_GEO_TILE}] nor a column of dataset")
+        return dataframe[partition_key].astype(object).map(lambda value: None if pd.isna(value) else str(value))
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def get_partition_dir_names(partition_values:list) -> dict:
+    """
+    Directory name of every partition value, values like "<1H OCEAN" are not valid file names everywhere
+    return: dict partition value -> unique directory name
+    """
+    try:
+        partition_dir_names = {}
+        used_dir_names = set()
+        # sorted so a value gets the same directory name in every run
+        for partition_value in sorted(partition_values):
+            dir_name = re.sub(r"[^0-9A-Za-z_.-]+", "_", partition_value).strip("_.") or "partition"
+            unique_dir_name, suffix = dir_name, 1
+            while unique_dir_name.lower() in used_dir_names:
+                unique_dir_name = f"{dir_name}_{suffix}"
+                suffix += 1
+            used_dir_names.add(unique_dir_name.lower())
+            partition_dir_names[partition_value] = unique_dir_name
+        return partition_dir_names
+    except Exception as e:
+        raise HousingException(e,sys) from e
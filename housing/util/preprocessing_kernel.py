@@ -0,0 +1,248 @@
+from housing.exception import HousingException
+from housing.util.array_bundle import save_array_bundle, load_array_bundle
+import sys
+import numpy as np
+import pandas as pd
+
+NUM_PIPELINE_NAME = "num_pipeline"
+CAT_PIPELINE_NAME = "cat_pipeline"
+
+
+class PreprocessingKernel:
+    """
+    NumPy only replacement of the fitted preprocessing ColumnTransformer built by
+    DataTransformation.get_data_transformer_object. It holds only the fitted numbers
+    (imputer fill values, FeatureGenerator ratio indices, scaler means and scales and the
+    category to column lookup) and applies the same floating point operations in the same
+    order as sklearn, so its output is identical to preprocessing_obj.transform.
+    """
+
+    def __init__(self,
+                 numerical_columns:list,
+                 numerical_fill_values:np.ndarray,
+                 ratio_indices:np.ndarray,
+                 numerical_mean:np.ndarray,
+                 numerical_scale:np.ndarray,
+                 categorical_column:str,
+                 categorical_fill_value,
+                 categories:np.ndarray,
+                 category_scale:np.ndarray,
+                 numerical_dtype:str = "float64") -> None:
+        """
+        numerical_columns: list of numerical input columns in ColumnTransformer order
+        numerical_fill_values: np.ndarray median of every numerical column used for missing values
+        ratio_indices: np.ndarray shape (n_ratio, 2) numerator and denominator column index of generated features
+        numerical_mean: np.ndarray mean of numerical and generated features, None when scaler does not center
+        numerical_scale: np.ndarray scale of numerical and generated features, None when scaler does not scale
+        categorical_column: str categorical input column
+        categorical_fill_value: most frequent category used for missing values
+        categories: np.ndarray sorted categories known by one hot encoder
+        category_scale: np.ndarray scale of every one hot column, None when scaler does not scale
+        numerical_dtype: str dtype of FeatureGenerator output, numerical features are generated and scaled in it
+        """
+        try:
+            self.numerical_columns = list(numerical_columns)
+            self.numerical_fill_values = np.asarray(numerical_fill_values, dtype=np.float64)
+            self.ratio_indices = np.asarray(ratio_indices, dtype=np.int64).reshape(-1, 2)
+            self.numerical_mean = None if numerical_mean is None else np.asarray(numerical_mean, dtype=np.float64)
+            self.numerical_scale = None if numerical_scale is None else np.asarray(numerical_scale, dtype=np.float64)
+            self.categorical_column = categorical_column
+            self.categorical_fill_value = categorical_fill_value
+            self.categories = np.asarray(categories, dtype=object)
+            self.category_scale = None if category_scale is None else np.asarray(category_scale, dtype=np.float64)
+            self.numerical_dtype = np.dtype(numerical_dtype)
+
+            self.numerical_output_count = len(self.numerical_columns) + len(self.ratio_indices)
+            self.output_count = self.numerical_output_count + len(self.categories)
+
+            # value of the one hot column of a row's category, sklearn computes 1 * (1 / scale) for sparse
+            # encoder output and 1 / scale for dense output which are the same floating point number
+            if self.category_scale is None:
+                self.category_values = np.ones(len(self.categories), dtype=np.float64)
+            else:
+                self.category_values = 1.0 / self.category_scale
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @classmethod
+    def from_column_transformer(cls, preprocessing_obj) -> "PreprocessingKernel":
+        """
+        Export fitted preprocessing ColumnTransformer into a kernel
+        preprocessing_obj: fitted ColumnTransformer of DataTransformation
+        """
+        try:
+            transformers = {name: (transformer, columns) for name, transformer, columns in preprocessing_obj.transformers_}
+            if set(transformers.keys()) - {NUM_PIPELINE_NAME, CAT_PIPELINE_NAME, "remainder"}:
+                raise Exception(f"Unsupported preprocessing object with transformers: {list(transformers.keys())}")
+            if getattr(preprocessing_obj, "sparse_output_", False):
+                raise Exception("Preprocessing object with sparse output can not be exported")
+
+            num_pipeline, numerical_columns = transformers[NUM_PIPELINE_NAME]
+            cat_pipeline, categorical_columns = transformers[CAT_PIPELINE_NAME]
+            if len(categorical_columns) != 1:
+                raise Exception(f"Only one categorical column is supported, got: {categorical_columns}")
+
+            num_imputer = num_pipeline.named_steps["imputer"]
+            feature_generator = num_pipeline.named_steps["feature_generator"]
+            num_scaler = num_pipeline.named_steps["scaling"]
+
+            # imputer output is always float64, so FeatureGenerator without dtype keeps float64
+            numerical_dtype = feature_generator.dtype if feature_generator.dtype is not None else "float64"
+
+            cat_imputer = cat_pipeline.named_steps["imputer"]
+            encoder = cat_pipeline.named_steps["encoder"]
+            cat_scaler = cat_pipeline.named_steps["scaling"]
+
+            if encoder.drop is not None or encoder.handle_unknown != "error":
+                raise Exception("Only OneHotEncoder without drop and with handle_unknown='error' is supported")
+            if cat_scaler.with_mean:
+                raise Exception("Centering of one hot encoded columns is not supported")
+
+            return cls(numerical_columns=numerical_columns,
+                       numerical_fill_values=num_imputer.statistics_,
+                       ratio_indices=feature_generator.get_ratio_indices(),
+                       numerical_mean=num_scaler.mean_ if num_scaler.with_mean else None,
+                       numerical_scale=num_scaler.scale_ if num_scaler.with_std else None,
+                       categorical_column=categorical_columns[0],
+                       categorical_fill_value=cat_imputer.statistics_[0],
+                       categories=encoder.categories_[0],
+                       category_scale=cat_scaler.scale_ if cat_scaler.with_std else None,
+                       numerical_dtype=numerical_dtype)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def save(self, file_path:str) -> None:
+        """
+        Save kernel as an array bundle, fitted numbers as raw arrays and column names and categories in its header
+        """
+        try:
+            metadata = {"numerical_columns": self.numerical_columns,
+                        "categorical_column": self.categorical_column,
+                        "categorical_fill_value": self.categorical_fill_value.item()
+                                                  if isinstance(self.categorical_fill_value, np.generic)
+                                                  else self.categorical_fill_value,
+                        "categories": self.categories.tolist(),
+                        "numerical_dtype": self.numerical_dtype.name}
+            arrays = {"numerical_fill_values": self.numerical_fill_values, "ratio_indices": self.ratio_indices}
+            # missing statistics mean the scaler step does not center or scale
+            for name in ("numerical_mean", "numerical_scale", "category_scale"):
+                if getattr(self, name) is not None:
+                    arrays[name] = getattr(self, name)
+            save_array_bundle(file_path=file_path, metadata=metadata, arrays=arrays)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @classmethod
+    def load(cls, file_path:str, mmap_mode:str = "r") -> "PreprocessingKernel":
+        """
+        Load kernel saved by save, fitted arrays are memory mapped unless mmap_mode is None
+        """
+        try:
+            metadata, arrays = load_array_bundle(file_path=file_path, mmap_mode=mmap_mode)
+            return cls(numerical_columns=metadata["numerical_columns"],
+                       numerical_fill_values=arrays["numerical_fill_values"],
+                       ratio_indices=arrays["ratio_indices"],
+                       numerical_mean=arrays.get("numerical_mean"),
+                       numerical_scale=arrays.get("numerical_scale"),
+                       categorical_column=metadata["categorical_column"],
+                       categorical_fill_value=metadata["categorical_fill_value"],
+                       categories=metadata["categories"],
+                       category_scale=arrays.get("category_scale"),
+                       numerical_dtype=metadata["numerical_dtype"])
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def transform_arrays(self, numerical_values:np.ndarray, categorical_values:np.ndarray) -> np.ndarray:
+        """
+        numerical_values: np.ndarray shape (n_rows, n_numerical_columns)
+        categorical_values: np.ndarray shape (n_rows,) category of every row
+        return: np.ndarray shape (n_rows, output_count)
+        """
+        try:
+            row_count = len(numerical_values)
+            output = np.zeros((row_count, self.output_count), dtype=np.float64)
+
+            # numerical features are built in place in the output unless they are computed in a narrower dtype
+            if self.numerical_dtype == output.dtype:
+                scaled_output = output[:, :self.numerical_output_count]
+            else:
+                scaled_output = np.empty((row_count, self.numerical_output_count), dtype=self.numerical_dtype)
+
+            numerical_output = scaled_output[:, :len(self.numerical_columns)]
+            numerical_output[:] = numerical_values
+            missing_row, missing_column = np.nonzero(np.isnan(numerical_output))
+            numerical_output[missing_row, missing_column] = self.numerical_fill_values[missing_column]
+
+            for ratio_number, (numerator_ix, denominator_ix) in enumerate(self.ratio_indices):
+                generated_column = scaled_output[:, len(self.numerical_columns) + ratio_number]
+                generated_column.fill(0)
+                np.divide(numerical_output[:, numerator_ix], numerical_output[:, denominator_ix], out=generated_column,
+                          where=numerical_output[:, denominator_ix] != 0)
+
+            if self.numerical_mean is not None:
+                scaled_output -= self.numerical_mean
+            if self.numerical_scale is not None:
+                scaled_output /= self.numerical_scale
+            if self.numerical_dtype != output.dtype:
+                output[:, :self.numerical_output_count] = scaled_output
+
+            categorical_values = np.asarray(categorical_values, dtype=object).copy()
+            categorical_values[pd.isna(categorical_values)] = self.categorical_fill_value
+
+            # categories of one hot encoder are sorted, so codes are found by binary search
+            category_codes = np.searchsorted(self.categories, categorical_values)
+            category_codes = np.minimum(category_codes, len(self.categories) - 1)
+            is_unknown = self.categories[category_codes] != categorical_values
+            if is_unknown.any():
+                raise ValueError(f"Found unknown categories {sorted(set(categorical_values[is_unknown]))} in column [{self.categorical_column}]")
+            output[np.arange(row_count), self.numerical_output_count + category_codes] = self.category_values[category_codes]
+
+            return output
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def scale_unscaled_output(self, unscaled_output:np.ndarray) -> np.ndarray:
+        """
+        Scale output of a kernel without scalers but with the same imputation and features, gives the same
+        numbers as transform would give for the original rows
+        unscaled_output: np.ndarray shape (n_rows, output_count) imputed, generated and one hot encoded values
+        """
+        try:
+            output = np.empty(unscaled_output.shape, dtype=np.float64)
+
+            scaled_output = np.array(unscaled_output[:, :self.numerical_output_count], dtype=self.numerical_dtype)
+            if self.numerical_mean is not None:
+                scaled_output -= self.numerical_mean
+            if self.numerical_scale is not None:
+                scaled_output /= self.numerical_scale
+            output[:, :self.numerical_output_count] = scaled_output
+
+            np.multiply(unscaled_output[:, self.numerical_output_count:], self.category_values,
+                        out=output[:, self.numerical_output_count:])
+            return output
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def transform(self, dataframe:pd.DataFrame) -> np.ndarray:
+        """
+        Same output as preprocessing_obj.transform(dataframe)
+        """
+        try:
+            return self.transform_arrays(numerical_values=dataframe[self.numerical_columns].to_numpy(dtype=np.float64),
+                                         categorical_values=dataframe[self.categorical_column].to_numpy(dtype=object))
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def check_parity(self, preprocessing_obj, dataframe:pd.DataFrame) -> None:
+        """
+        Raise if kernel output differs from preprocessing object output on dataframe
+        """
+        try:
+            expected = preprocessing_obj.transform(dataframe)
+            actual = self.transform(dataframe)
+            if expected.shape != actual.shape or not np.array_equal(expected, actual, equal_nan=True):
+                max_difference = np.nanmax(np.abs(expected - actual)) if expected.shape == actual.shape else None
+                raise Exception(f"Preprocessing kernel output differs from preprocessing object, "
+                                f"shapes: {expected.shape} vs {actual.shape}, max difference: {max_difference}")
+        except Exception as e:
+            raise HousingException(e,sys) from e
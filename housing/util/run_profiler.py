@@ -0,0 +1,326 @@
+from housing.exception import HousingException
+from housing.logger import logging, bind_log_context
+from housing.constant import *
+from contextlib import contextmanager
+import os, sys
+import json
+import threading
+import time
+
+# profiler of the running pipeline, profile_step records nothing while it is None
+active_profiler = None
+
+
+def read_proc_status_kb(field_name:str) -> int:
+    """
+    Memory field (e.g. VmRSS, VmHWM) of /proc/self/status in kB, None where procfs is not available
+    """
+    try:
+        with open("/proc/self/status", "r") as status_file:
+            for line in status_file:
+                if line.startswith(f"{field_name}:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def read_proc_io() -> dict:
+    """
+    Bytes read and written by the process through read/write calls, empty where procfs is not available
+    """
+    try:
+        with open("/proc/self/io", "r") as io_file:
+            io_counters = dict(line.split(":") for line in io_file)
+        return {"bytes_read": int(io_counters["rchar"]), "bytes_written": int(io_counters["wchar"])}
+    except (OSError, KeyError, ValueError):
+        return {}
+
+
+def get_peak_rss_kb() -> int:
+    """
+    Peak rss of the process in kB, None where neither procfs nor the resource module (windows) is available
+    """
+    peak_rss_kb = read_proc_status_kb("VmHWM")
+    if peak_rss_kb is not None:
+        return peak_rss_kb
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kB on linux and never reset
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def get_max_rss_kb(*rss_kb_values) -> int:
+    """
+    Largest of rss values which are known, None when none is
+    """
+    rss_kb_values = [rss_kb for rss_kb in rss_kb_values if rss_kb is not None]
+    return max(rss_kb_values) if rss_kb_values else None
+
+
+def reset_peak_rss() -> None:
+    # linux resets VmHWM to current rss when 5 is written to clear_refs, peak then covers only the next step
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs_file:
+            clear_refs_file.write("5")
+    except OSError:
+        pass
+
+
+class ProfileStep:
+    """
+    Measurements of one stage or sub step, counters are added by the code running the step
+    """
+
+    def __init__(self, name:str, parent = None, attributes:dict = None) -> None:
+        self.name = name
+        self.parent = parent
+        self.attributes = dict(attributes or {})
+        self.counters = {}
+        self.children = []
+        self.child_peak_rss_kb = None
+        self.lock = threading.Lock()
+
+    def add(self, **counters) -> None:
+        """
+        Add to counters of the step, e.g. rows=len(dataframe)
+        """
+        with self.lock:
+            for counter_name, value in counters.items():
+                if value is not None:
+                    self.counters[counter_name] = self.counters.get(counter_name, 0) + value
+
+    def set(self, **attributes) -> None:
+        """
+        Set attributes of the step, e.g. cached=True
+        """
+        with self.lock:
+            self.attributes.update(attributes)
+
+    def start(self) -> None:
+        self.start_time = time.time()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.start_children_cpu = sum(os.times()[2:4])
+        self.start_io = read_proc_io()
+        self.start_rss_kb = read_proc_status_kb("VmRSS")
+
+    def stop(self) -> None:
+        children_cpu_seconds = sum(os.times()[2:4]) - self.start_children_cpu
+        self.wall_seconds = time.perf_counter() - self.start_wall
+        self.cpu_seconds = time.process_time() - self.start_cpu + children_cpu_seconds
+        self.peak_rss_kb = get_max_rss_kb(get_peak_rss_kb(), self.child_peak_rss_kb)
+        self.end_rss_kb = read_proc_status_kb("VmRSS")
+        end_io = read_proc_io()
+        self.io = {io_name: end_io[io_name] - self.start_io[io_name] for io_name in self.start_io if io_name in end_io}
+
+    def to_dict(self) -> dict:
+        return {"name": self.name,
+                **self.attributes,
+                "start_time": self.start_time,
+                "wall_seconds": round(self.wall_seconds, 6),
+                "cpu_seconds": round(self.cpu_seconds, 6),
+                "peak_rss_mb": None if self.peak_rss_kb is None else round(self.peak_rss_kb / 1024, 2),
+                "start_rss_mb": None if self.start_rss_kb is None else round(self.start_rss_kb / 1024, 2),
+                "end_rss_mb": None if self.end_rss_kb is None else round(self.end_rss_kb / 1024, 2),
+                **self.io,
+                **self.counters,
+                "steps": [child.to_dict() for child in self.children]}
+
+
+class NullProfileStep:
+    """
+    Step returned when profiling is off, counters and attributes are dropped
+    """
+
+    def add(self, **counters) -> None:
+        pass
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+NULL_PROFILE_STEP = NullProfileStep()
+
+
+class RunProfiler:
+    """
+    Wall time, CPU time (including finished child processes), peak RSS, bytes read and written and
+    counters like rows of every pipeline stage and of the sub steps inside it, saved as profile.json.
+    Steps nest per thread, a step started by a thread with no open step belongs to the latest open
+    stage, functions bound with bind_profile_step keep the step of the thread submitting them.
+    Stages may run concurrently, their wall seconds then overlap. Peak RSS is reset at the start of every step, so peaks of steps running concurrently in threads
+    are approximate.
+    Stages named in cprofile_stages also run under cProfile, saved next to profile.json.
+    """
+
+    def __init__(self, profile_dir:str, cprofile_stages:list = None) -> None:
+        """
+        profile_dir: str directory of profile.json and cProfile files of one run
+        cprofile_stages: list of stage names to run under cProfile
+        """
+        try:
+            self.profile_dir = profile_dir
+            self.profile_file_path = os.path.join(profile_dir, RUN_PROFILE_FILE_NAME)
+            self.cprofile_stages = set(cprofile_stages or [])
+            self.stages = []
+            self.open_stages = []
+            self.thread_data = threading.local()
+            self.lock = threading.Lock()
+            self.start_time = None
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def get_step_stack(self) -> list:
+        if not hasattr(self.thread_data, "step_stack"):
+            self.thread_data.step_stack = []
+        return self.thread_data.step_stack
+
+    def get_current_step(self):
+        step_stack = self.get_step_stack()
+        if len(step_stack) > 0:
+            return step_stack[-1]
+        with self.lock:
+            return self.open_stages[-1] if len(self.open_stages) > 0 else None
+
+    @contextmanager
+    def step(self, name:str, is_stage:bool = False, **attributes):
+        """
+        Measure the block as a stage or as a sub step of the current step
+        """
+        parent = None if is_stage else self.get_current_step()
+        profile_step = ProfileStep(name=name, parent=parent, attributes=attributes)
+        with self.lock:
+            if is_stage:
+                self.stages.append(profile_step)
+                self.open_stages.append(profile_step)
+            elif parent is not None:
+                parent.children.append(profile_step)
+            else:
+                self.stages.append(profile_step)
+
+        cprofile = None
+        if is_stage and name in self.cprofile_stages:
+            import cProfile
+            cprofile = cProfile.Profile()
+
+        step_stack = self.get_step_stack()
+        step_stack.append(profile_step)
+        reset_peak_rss()
+        profile_step.start()
+        if cprofile is not None:
+            cprofile.enable()
+        try:
+            yield profile_step
+        except BaseException:
+            profile_step.set(failed=True)
+            raise
+        finally:
+            if cprofile is not None:
+                cprofile.disable()
+                cprofile_file_path = os.path.join(self.profile_dir, f"{name}.prof")
+                os.makedirs(self.profile_dir, exist_ok=True)
+                cprofile.dump_stats(cprofile_file_path)
+                profile_step.set(cprofile_file_path=cprofile_file_path)
+            profile_step.stop()
+            step_stack.pop()
+            if parent is not None:
+                with parent.lock:
+                    parent.child_peak_rss_kb = get_max_rss_kb(parent.child_peak_rss_kb, profile_step.peak_rss_kb)
+            if is_stage:
+                with self.lock:
+                    self.open_stages.remove(profile_step)
+
+    def save(self) -> str:
+        """
+        Write profile.json of every finished stage, return its path
+        """
+        try:
+            finished_stages = [stage for stage in self.stages if hasattr(stage, "wall_seconds")]
+            profile = {"start_time": self.start_time,
+                       "wall_seconds": round(max([stage.start_time + stage.wall_seconds for stage in finished_stages],
+                                                 default=self.start_time) - self.start_time, 6),
+                       "stages": [stage.to_dict() for stage in finished_stages]}
+            os.makedirs(self.profile_dir, exist_ok=True)
+            with open(self.profile_file_path, "w") as profile_file:
+                json.dump(profile, profile_file, indent=2)
+            logging.info(f"Run profile saved: [{self.profile_file_path}]")
+            return self.profile_file_path
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def bind(self, function):
+        step = self.get_current_step()
+        if step is None:
+            return function
+
+        def bound_function(*args, **kwargs):
+            step_stack = self.get_step_stack()
+            step_stack.append(step)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                step_stack.pop()
+        return bound_function
+
+    def __enter__(self):
+        global active_profiler
+        self.start_time = time.time()
+        active_profiler = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global active_profiler
+        active_profiler = None
+        self.save()
+
+
+@contextmanager
+def profile_step(name:str, **attributes):
+    """
+    Measure the block as a sub step of the running stage, does nothing when no run is profiled
+    name: str name of step
+    """
+    profiler = active_profiler
+    if profiler is None:
+        yield NULL_PROFILE_STEP
+        return
+    with profiler.step(name, **attributes) as step:
+        yield step
+
+
+@contextmanager
+def profile_stage(name:str, **attributes):
+    """
+    Measure the block as a pipeline stage, does nothing when no run is profiled
+    """
+    profiler = active_profiler
+    if profiler is None:
+        yield NULL_PROFILE_STEP
+        return
+    with profiler.step(name, is_stage=True, **attributes) as step:
+        yield step
+
+
+def get_current_profile_step():
+    """
+    Step currently measured in this thread, a step ignoring counters when no run is profiled
+    """
+    profiler = active_profiler
+    if profiler is None:
+        return NULL_PROFILE_STEP
+    return profiler.get_current_step() or NULL_PROFILE_STEP
+
+
+def bind_profile_step(function):
+    """
+    Wrap function submitted to a thread pool so steps it starts belong to the step of the calling thread
+    and its log records carry the log context (e.g. stage) of the calling thread
+    """
+    function = bind_log_context(function)
+    profiler = active_profiler
+    if profiler is None:
+        return function
+    return profiler.bind(function)
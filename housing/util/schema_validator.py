@@ -0,0 +1,155 @@
+from housing.exception import HousingException
+from housing.util.util import get_schema_dtypes
+from housing.constant import *
+from collections import namedtuple
+import sys
+import numpy as np
+import pandas as pd
+
+ColumnRule = namedtuple("ColumnRule",["column_name", "dtype", "domain_values", "max_null_ratio", "min_value", "max_value"])
+
+
+class SchemaValidator:
+    """
+    Rules of schema.yaml compiled once per column and evaluated on whole columns at a time.
+    Numeric columns are checked together on a single float matrix, categorical columns
+    by a membership test against their domain values.
+    """
+
+    def __init__(self, dataset_schema:dict) -> None:
+        """
+        SchemaValidator Initialization
+        dataset_schema: dict content of schema.yaml
+        """
+        try:
+            schema_dtypes = get_schema_dtypes(dataset_schema=dataset_schema)
+            domain_value = dataset_schema.get(DATASET_SCHEMA_DOMAIN_VALUE) or {}
+            max_null_ratio = dataset_schema.get(DATASET_SCHEMA_MAX_NULL_RATIO) or {}
+            value_range = dataset_schema.get(DATASET_SCHEMA_VALUE_RANGE) or {}
+
+            self.column_rules = []
+            for column_name, dtype in schema_dtypes.items():
+                column_range = value_range.get(column_name) or {}
+                column_domain = domain_value.get(column_name)
+                self.column_rules.append(ColumnRule(
+                    column_name=column_name,
+                    dtype=dtype,
+                    domain_values=list(column_domain) if column_domain is not None else None,
+                    max_null_ratio=float(max_null_ratio.get(column_name, DATASET_SCHEMA_DEFAULT_MAX_NULL_RATIO)),
+                    min_value=float(column_range.get(DATASET_SCHEMA_VALUE_RANGE_MIN, -np.inf)),
+                    max_value=float(column_range.get(DATASET_SCHEMA_VALUE_RANGE_MAX, np.inf))
+                ))
+
+            self.numeric_rules = [rule for rule in self.column_rules if self.is_numeric_dtype(rule.dtype)]
+            self.other_rules = [rule for rule in self.column_rules if not self.is_numeric_dtype(rule.dtype)]
+
+            self.numeric_min_values = np.array([rule.min_value for rule in self.numeric_rules], dtype=float)
+            self.numeric_max_values = np.array([rule.max_value for rule in self.numeric_rules], dtype=float)
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    @staticmethod
+    def is_numeric_dtype(dtype) -> bool:
+        return dtype not in ("category", "object") and pd.api.types.is_numeric_dtype(np.dtype(dtype))
+
+    def get_column_report(self, rule:ColumnRule, row_count:int, actual_dtype:str, is_dtype_valid:bool,
+                          null_count:int, dtype_violation_count:int = 0, domain_violation_count:int = 0,
+                          below_min_count:int = 0, above_max_count:int = 0) -> dict:
+        null_ratio = null_count / row_count if row_count > 0 else 0.0
+        is_valid = (is_dtype_valid
+                    and dtype_violation_count == 0
+                    and domain_violation_count == 0
+                    and below_min_count == 0
+                    and above_max_count == 0
+                    and null_ratio <= rule.max_null_ratio)
+        return {
+            "expected_dtype": rule.dtype,
+            "actual_dtype": actual_dtype,
+            "is_dtype_valid": bool(is_dtype_valid),
+            "dtype_violation_count": int(dtype_violation_count),
+            "null_count": int(null_count),
+            "null_ratio": float(null_ratio),
+            "max_null_ratio": rule.max_null_ratio,
+            "domain_violation_count": int(domain_violation_count),
+            "below_min_count": int(below_min_count),
+            "above_max_count": int(above_max_count),
+            "is_valid": bool(is_valid)
+        }
+
+    def validate(self, dataframe:pd.DataFrame) -> dict:
+        """
+        Evaluate all rules on dataframe
+        dataframe: pd.DataFrame dataset to validate
+        return: dict report with per column violation counts and overall status
+        """
+        try:
+            row_count = len(dataframe)
+            schema_columns = [rule.column_name for rule in self.column_rules]
+            missing_columns = [column for column in schema_columns if column not in dataframe.columns]
+            unexpected_columns = [column for column in dataframe.columns if column not in schema_columns]
+
+            column_report = {}
+
+            numeric_rules = [rule for rule in self.numeric_rules if rule.column_name in dataframe.columns]
+            if len(numeric_rules) > 0:
+                numeric_columns = [rule.column_name for rule in numeric_rules]
+                rule_index = [self.numeric_rules.index(rule) for rule in numeric_rules]
+
+                numeric_frame = dataframe[numeric_columns]
+                is_dtype_valid = [pd.api.types.is_numeric_dtype(numeric_frame[column]) for column in numeric_columns]
+
+                if all(is_dtype_valid):
+                    numeric_values = numeric_frame.to_numpy(dtype=float)
+                    null_count = np.isnan(numeric_values).sum(axis=0)
+                    dtype_violation_count = np.zeros(len(numeric_columns), dtype=np.int64)
+                else:
+                    # values which can not be read as numbers become NaN and are counted as dtype violations
+                    numeric_values = numeric_frame.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+                    is_null = numeric_frame.isna().to_numpy()
+                    null_count = is_null.sum(axis=0)
+                    dtype_violation_count = (np.isnan(numeric_values) & ~is_null).sum(axis=0)
+
+                with np.errstate(invalid="ignore"):
+                    below_min_count = (numeric_values < self.numeric_min_values[rule_index]).sum(axis=0)
+                    above_max_count = (numeric_values > self.numeric_max_values[rule_index]).sum(axis=0)
+
+                for i, rule in enumerate(numeric_rules):
+                    column_report[rule.column_name] = self.get_column_report(
+                        rule=rule,
+                        row_count=row_count,
+                        actual_dtype=str(numeric_frame[rule.column_name].dtype),
+                        is_dtype_valid=is_dtype_valid[i],
+                        null_count=null_count[i],
+                        dtype_violation_count=dtype_violation_count[i],
+                        below_min_count=below_min_count[i],
+                        above_max_count=above_max_count[i])
+
+            for rule in self.other_rules:
+                if rule.column_name not in dataframe.columns:
+                    continue
+                column = dataframe[rule.column_name]
+                is_null = column.isna()
+                domain_violation_count = 0
+                if rule.domain_values is not None:
+                    domain_violation_count = (~column.isin(rule.domain_values) & ~is_null).sum()
+                column_report[rule.column_name] = self.get_column_report(
+                    rule=rule,
+                    row_count=row_count,
+                    actual_dtype=str(column.dtype),
+                    is_dtype_valid=not pd.api.types.is_numeric_dtype(column),
+                    null_count=is_null.sum(),
+                    domain_violation_count=domain_violation_count)
+
+            is_valid = (len(missing_columns) == 0
+                        and len(unexpected_columns) == 0
+                        and all(report["is_valid"] for report in column_report.values()))
+
+            return {
+                "is_valid": is_valid,
+                "row_count": row_count,
+                "missing_columns": missing_columns,
+                "unexpected_columns": unexpected_columns,
+                "columns": column_report
+            }
+        except Exception as e:
+            raise HousingException(e,sys) from e
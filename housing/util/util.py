@@ -1,10 +1,16 @@
+from __future__ import annotations
 import yaml
 from housing.exception import HousingException
 import sys,os
+import hashlib
 import numpy as np
-import dill
 from housing.constant import *
-import pandas as pd
+from housing.util.run_profiler import profile_step
+from typing import TYPE_CHECKING
+
+# pandas and dill are imported by the functions using them, so reading config does not load them
+if TYPE_CHECKING:
+    import pandas as pd
 
 def read_yaml_file(file_path:str) -> dict:
     """
@@ -18,23 +24,232 @@ def read_yaml_file(file_path:str) -> dict:
         raise HousingException(e, sys) from e
 
 
-def load_data(file_path:str, schema_file_path: str) -> pd.DataFrame:
+def write_yaml_file(file_path:str, data:dict = None):
+    """
+    Create yaml file
+    file_path: str
+    data: dict
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path,"w") as yaml_file:
+            if data is not None:
+                yaml.dump(data, yaml_file)
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def get_file_checksum(file_path:str, chunk_size:int = 1024*1024) -> str:
+    """
+    Compute sha256 checksum of a file without loading it completely into memory
+    file_path: str location of file
+    chunk_size: int number of bytes read at a time
+    return: str hex digest of file content
+    """
+    try:
+        sha256 = hashlib.sha256()
+        with open(file_path,"rb") as file_obj:
+            for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def get_schema_dtypes(dataset_schema:dict) -> dict:
+    """
+    Pandas dtype of every column declared in schema, float columns get float_dtype of schema (float64 by default)
+    dataset_schema: dict content of schema.yaml
+    return: dict column name -> pandas dtype
+    """
+    try:
+        schema_columns = dataset_schema[DATASET_SCHEMA_COLUMNS]
+        float_dtype = dataset_schema.get(DATASET_SCHEMA_FLOAT_DTYPE) or DATASET_SCHEMA_FLOAT_DTYPES[0]
+        if float_dtype not in DATASET_SCHEMA_FLOAT_DTYPES:
+            raise Exception(f"Schema float dtype: [{float_dtype}] is not one of {DATASET_SCHEMA_FLOAT_DTYPES}")
+        dtype_mapping = {**SCHEMA_DTYPE_MAPPING, "float": float_dtype}
+        return {column: dtype_mapping.get(column_type, column_type) for column, column_type in schema_columns.items()}
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def is_parquet_file(file_path:str) -> bool:
+    return file_path.endswith(FILE_FORMAT_EXTENSION[FILE_FORMAT_PARQUET])
+
+
+def get_dataset_columns(file_path:str) -> list:
+    """
+    Column names of a csv or parquet dataset without reading its rows
+    file_path: str location of dataset
+    """
+    try:
+        if is_parquet_file(file_path):
+            import pyarrow.parquet as pq
+            return list(pq.read_schema(file_path).names)
+        import pandas as pd
+        return list(pd.read_csv(file_path, nrows=0).columns)
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def read_dataframe(file_path:str, columns:list = None, dtype:dict = None) -> pd.DataFrame:
+    """
+    Read a csv or parquet dataset, file format is decided by file extension
+    file_path: str location of dataset
+    columns: list of columns to read, None reads all columns
+    dtype: dict column name -> pandas dtype, columns missing from the dataset are ignored
+    return: pd.DataFrame
+    """
+    try:
+        import pandas as pd
+        with profile_step("read_dataframe", file_path=file_path) as step:
+            if is_parquet_file(file_path):
+                dataframe = pd.read_parquet(file_path, columns=columns)
+                if dtype:
+                    column_dtype = {column: column_dtype for column, column_dtype in dtype.items()
+                                    if column in dataframe.columns and dataframe[column].dtype != column_dtype}
+                    if column_dtype:
+                        dataframe = dataframe.astype(column_dtype)
+            else:
+                dataframe = pd.read_csv(file_path, usecols=columns, dtype=dtype)
+                if columns is not None:
+                    # usecols keeps the order of the file, parquet reader returns the requested order
+                    dataframe = dataframe[list(columns)]
+            step.add(rows=len(dataframe))
+        return dataframe
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def read_appended_csv_rows(file_path:str, offset:int, dtype:dict = None) -> pd.DataFrame:
+    """
+    Read rows of a csv dataset which come after byte offset, e.g. rows appended since offset was the file size
+    file_path: str location of csv dataset
+    offset: int byte offset of the first row to read, 0 reads the whole file
+    dtype: dict column name -> pandas dtype
+    return: pd.DataFrame with the columns of the file header
+    """
+    try:
+        import pandas as pd
+        if offset == 0 or offset >= os.path.getsize(file_path):
+            # no row before offset is read, only the header when nothing was appended
+            return pd.read_csv(file_path, dtype=dtype, nrows=None if offset == 0 else 0)
+
+        columns = get_dataset_columns(file_path=file_path)
+        with profile_step("read_dataframe", file_path=file_path) as step, open(file_path, "rb") as file_obj:
+            file_obj.seek(offset)
+            dataframe = pd.read_csv(file_obj, header=None, names=columns, dtype=dtype)
+            step.add(rows=len(dataframe))
+        return dataframe
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def save_dataframe(file_path:str, dataframe:pd.DataFrame):
+    """
+    Save dataframe as csv or parquet, file format is decided by file extension
+    file_path: str location of file to save
+    dataframe: pd.DataFrame data to save
+    """
+    try:
+        dir_path = os.path.dirname(file_path)
+        os.makedirs(dir_path, exist_ok = True)
+        with profile_step("save_dataframe", file_path=file_path) as step:
+            if is_parquet_file(file_path):
+                dataframe.to_parquet(file_path, index=False)
+            else:
+                dataframe.to_csv(file_path, index=False)
+            step.add(rows=len(dataframe))
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+class DataFrameChunkWriter:
+    """
+    Append dataframe chunks to a single csv or parquet file
+    """
+
+    def __init__(self, file_path:str):
         try:
-            dataset_schema = read_yaml_file(schema_file_path) 
-            schema = dataset_schema[DATASET_SCHEMA_COLUMNS] 
+            self.file_path = file_path
+            self.parquet_writer = None
+            self.is_first_chunk = True
 
-            dataframe = pd.read_csv(file_path)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        except Exception as e:
+            raise HousingException(e,sys) from e
 
-            error_message = ""
+    def write(self, dataframe:pd.DataFrame):
+        try:
+            if is_parquet_file(self.file_path):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                # integer columns of a chunk become float in chunks having missing values,
+                # so they are always stored as float to keep one schema for the file
+                integer_columns = dataframe.select_dtypes(include="integer").columns
+                if len(integer_columns) > 0:
+                    dataframe = dataframe.astype({column: "float64" for column in integer_columns})
 
-            for i in dataframe.columns:
-                if i in list(schema.keys()):
-                    dataframe[i].astype(schema[i])
+                if self.parquet_writer is None:
+                    table = pa.Table.from_pandas(dataframe, preserve_index=False)
+                    self.parquet_writer = pq.ParquetWriter(self.file_path, table.schema)
                 else:
+                    table = pa.Table.from_pandas(dataframe, schema=self.parquet_writer.schema, preserve_index=False)
+                self.parquet_writer.write_table(table)
+            else:
+                dataframe.to_csv(self.file_path, mode="a", header=self.is_first_chunk, index=False)
+            self.is_first_chunk = False
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def close(self):
+        try:
+            if self.parquet_writer is not None:
+                self.parquet_writer.close()
+                self.parquet_writer = None
+        except Exception as e:
+            raise HousingException(e,sys) from e
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_data(file_path:str, schema_file_path: str, dataset_registry = None, columns:list = None) -> pd.DataFrame:
+        """
+        Load dataset after checking its columns against schema
+        file_path: str location of dataset
+        schema_file_path: str location of schema.yaml
+        dataset_registry: DatasetRegistry of the run, when given the parsed dataset is shared with other stages
+        columns: list of schema columns to load, None loads every column
+        """
+        try:
+            from housing.util.dataset_schema import get_dataset_schema
+            dataset_schema = get_dataset_schema(schema_file_path=schema_file_path)
+
+            dataset_columns = get_dataset_columns(file_path=file_path)
+
+            error_message = ""
+
+            for i in dataset_columns:
+                if i not in dataset_schema.columns:
                     error_message = f"{error_message} \nColumn: [{i}] is not in the schema. "
 
             if len(error_message)>0:
                 raise Exception(error_message)
+
+            read_options = dataset_schema.get_read_options(columns=columns)
+
+            if dataset_registry is not None:
+                return dataset_registry.get_dataframe(file_path=file_path, columns=read_options["usecols"],
+                                                      dtype=read_options["dtype"])
+
+            dataframe = read_dataframe(file_path=file_path, columns=read_options["usecols"], dtype=read_options["dtype"])
             return dataframe
 
         except Exception as e:
@@ -50,20 +265,79 @@ def save_numpy_array_data(file_path:str, array:np.array):
     try:
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok = True)
-        with open(file_path,"wb") as file_obj:
+        with profile_step("save_numpy_array_data", file_path=file_path) as step, open(file_path,"wb") as file_obj:
             np.save(file_obj,array)
+            step.add(rows=len(array))
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+def create_numpy_array_memmap(file_path:str, shape:tuple, dtype) -> np.memmap:
+    """
+    Create .npy file of given shape and return it as writable memory map, rows can be filled block by block
+    file_path: str location of file to create
+    shape: tuple shape of array
+    dtype: dtype of array
+    """
+    try:
+        dir_path = os.path.dirname(file_path)
+        os.makedirs(dir_path, exist_ok = True)
+        return np.lib.format.open_memmap(file_path, mode="w+", dtype=dtype, shape=shape)
     except Exception as e:
         raise HousingException(e,sys) from e
 
-def load_numpy_array_data(file_path:str) -> np.array:
+def append_numpy_array_data(file_path:str, array:np.array, row_count:int) -> None:
+    """
+    Append rows to a 2d .npy array in place, rows already in the file are neither read nor written again
+    file_path: str location of .npy file, created when row_count is 0
+    array: np.array rows to append, stored in dtype of the file
+    row_count: int rows of the file to keep, rows after them (left by an unfinished run) are overwritten
+    """
+    try:
+        if row_count == 0:
+            save_numpy_array_data(file_path=file_path, array=array)
+            return
+
+        with profile_step("append_numpy_array_data", file_path=file_path) as step, open(file_path, "r+b") as file_obj:
+            version = np.lib.format.read_magic(file_obj)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file_obj)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file_obj)
+            data_offset = file_obj.tell()
+            if fortran_order or len(shape) != 2 or shape[0] < row_count or shape[1] != array.shape[1]:
+                raise Exception(f"Can not append rows of shape {array.shape} to array of shape {shape} "
+                                f"keeping {row_count} rows: [{file_path}]")
+
+            # header is rewritten in place, its padding has room for a longer row count
+            header_size_length = 2 if version == (1, 0) else 4
+            header_length = data_offset - np.lib.format.MAGIC_LEN - header_size_length
+            header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,
+                           "shape": (row_count + len(array), shape[1])}).encode("latin1")
+            if len(header) + 1 > header_length:
+                existing_arr = np.load(file_path, mmap_mode="r")[:row_count]
+                save_numpy_array_data(file_path=file_path, array=np.concatenate([existing_arr, array.astype(dtype)]))
+                return
+
+            # rows are written before the header, an interrupted append leaves the previous array readable
+            file_obj.seek(data_offset + row_count * shape[1] * dtype.itemsize)
+            file_obj.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+            file_obj.truncate()
+            file_obj.flush()
+            file_obj.seek(np.lib.format.MAGIC_LEN + header_size_length)
+            file_obj.write(header + b" " * (header_length - len(header) - 1) + b"\n")
+            step.add(rows=len(array))
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+def load_numpy_array_data(file_path:str, mmap_mode:str = None) -> np.array:
     """
     load numpy array data from file
     file_path: str location of file to load
+    mmap_mode: str None reads whole array into memory, "r" or "c" memory maps .npy file so only accessed rows are read
     return: np.array data loaded
     """
     try:
-        with open(file_path,"rb") as file_obj:
-            return np.load(file_obj)
+        return np.load(file_path, mmap_mode=mmap_mode)
     except Exception as e:
         raise HousingException(e,sys) from e
 
@@ -76,6 +350,7 @@ def save_preprocessing_obj(file_path:str, obj):
     try:
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok = True)
+        import dill
         with open(file_path,"wb") as file_obj:
             dill.dump(obj,file_obj)
     except Exception as e:
@@ -89,7 +364,37 @@ def load_preprocessing_obj(file_path:str):
     return: np.array data loaded
     """
     try:
+        import dill
         with open(file_path,"rb") as file_obj:
             return dill.load(file_obj)
     except Exception as e:
-        raise HousingException(e,sys) from e
\ No newline at end of file
+        raise HousingException(e,sys) from e
+
+
+def save_object(file_path:str, obj):
+    """
+    Save any python object (e.g. trained model) to pickle file
+    file_path: str location of file to save
+    obj: object to save
+    """
+    try:
+        dir_path = os.path.dirname(file_path)
+        os.makedirs(dir_path, exist_ok = True)
+        import dill
+        with open(file_path,"wb") as file_obj:
+            dill.dump(obj,file_obj)
+    except Exception as e:
+        raise HousingException(e,sys) from e
+
+
+def load_object(file_path:str):
+    """
+    Load python object saved by save_object
+    file_path: str location of file to load
+    """
+    try:
+        import dill
+        with open(file_path,"rb") as file_obj:
+            return dill.load(file_obj)
+    except Exception as e:
+        raise HousingException(e,sys) from e
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from housing.component.data_ingestion import DataIngestion
+from housing.constant import DATA_INGESTION_TEST_SIZE
+from housing.entity.config_entity import DataIngestionConfig
+from test_preprocessing_kernel import get_input_rows
+
+
+def get_data_ingestion(tmp_path, run_name:str, split_chunk_size:int) -> DataIngestion:
+    run_dir = tmp_path / run_name
+    data_ingestion_config = DataIngestionConfig(dataset_download_url=None,
+                                                dataset_checksum=None,
+                                                download_cache_dir=str(tmp_path / "download_cache"),
+                                                ingested_train_dir=str(run_dir / "train"),
+                                                ingested_test_dir=str(run_dir / "test"),
+                                                split_chunk_size=split_chunk_size,
+                                                ingested_file_format="csv",
+                                                incremental_partition_dir=None,
+                                                incremental_state_dir=None)
+    return DataIngestion(data_ingestion_config=data_ingestion_config)
+
+
+def test_chunked_split_draws_exact_test_share_of_every_income_stratum(tmp_path):
+    housing_df = get_input_rows(row_count=1003, seed=11)
+    housing_df["median_house_value"] = np.arange(len(housing_df), dtype=float)
+    # incomes outside the bins form a stratum of their own
+    housing_df.loc[::50, "median_income"] = np.nan
+    dataset_file_path = tmp_path / "housing.csv"
+    housing_df.to_csv(dataset_file_path, index=False)
+
+    data_ingestion = get_data_ingestion(tmp_path, run_name="chunked", split_chunk_size=97)
+    data_ingestion_artifact = data_ingestion.split_data_as_train_test(dataset_file_path=str(dataset_file_path))
+    train_df = pd.read_csv(data_ingestion_artifact.train_file_path)
+    test_df = pd.read_csv(data_ingestion_artifact.test_file_path)
+
+    # every row goes to exactly one of the sets
+    row_ids = np.concatenate([train_df["median_house_value"], test_df["median_house_value"]])
+    assert np.array_equal(np.sort(row_ids), housing_df["median_house_value"].to_numpy())
+
+    stratum_row_count = np.bincount(data_ingestion.get_income_category(housing_df["median_income"]))
+    stratum_test_count = np.bincount(data_ingestion.get_income_category(test_df["median_income"]),
+                                     minlength=len(stratum_row_count))
+    assert stratum_row_count[-1] > 0
+    assert np.array_equal(stratum_test_count, np.rint(stratum_row_count * DATA_INGESTION_TEST_SIZE).astype(np.int64))
+
+    # split is reproducible
+    rerun_artifact = get_data_ingestion(tmp_path, run_name="rerun", split_chunk_size=97).split_data_as_train_test(
+        dataset_file_path=str(dataset_file_path))
+    assert pd.read_csv(rerun_artifact.test_file_path).equals(test_df)
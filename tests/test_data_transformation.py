@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from housing.component.data_transformation import DataTransformation
+from housing.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
+from housing.entity.config_entity import DataTransformationConfig
+from housing.util.preprocessing_kernel import PreprocessingKernel
+from test_preprocessing_kernel import SCHEMA_FILE_PATH, get_input_rows
+
+
+def write_housing_files(tmp_path) -> DataIngestionArtifact:
+    data_file_paths = []
+    for split_name, row_count, seed in (("train", 230, 1), ("test", 70, 2)):
+        housing_df = get_input_rows(row_count=row_count, seed=seed)
+        housing_df.loc[::25, "total_bedrooms"] = np.nan
+        housing_df["median_house_value"] = housing_df["median_income"] * 40000
+        file_path = tmp_path / "ingested" / split_name / "housing.csv"
+        file_path.parent.mkdir(parents=True)
+        housing_df.to_csv(file_path, index=False)
+        data_file_paths.append(str(file_path))
+    return DataIngestionArtifact(train_file_path=data_file_paths[0], test_file_path=data_file_paths[1],
+                                 is_ingested=True, message="")
+
+
+def transform(tmp_path, data_ingestion_artifact, run_name:str, feature_dtype:str, transform_chunk_size=None,
+              incremental_state_dir=None) -> tuple:
+    run_dir = tmp_path / run_name
+    data_transformation_config = DataTransformationConfig(add_bedroom_per_room=True,
+                                                          feature_dtype=feature_dtype,
+                                                          transform_chunk_size=transform_chunk_size,
+                                                          incremental_state_dir=incremental_state_dir,
+                                                          median_sketch_size=100000,
+                                                          transformed_train_dir=str(run_dir / "train"),
+                                                          transformed_test_dir=str(run_dir / "test"),
+                                                          preprocessed_object_file_path=str(run_dir / "preprocessed.pkl"),
+                                                          preprocessing_kernel_file_path=str(run_dir / "kernel.bundle"))
+    data_validation_artifact = DataValidationArtifact(schema_file_path=SCHEMA_FILE_PATH, schema_report_file_path=None,
+                                                      is_validated=True, message="")
+    data_transformation_artifact = DataTransformation(data_transformation_config=data_transformation_config,
+                                                      data_ingestion_artifact=data_ingestion_artifact,
+                                                      data_validation_artifact=data_validation_artifact
+                                                      ).initiate_data_transformation()
+    return (np.load(data_transformation_artifact.transformed_train_file_path),
+            np.load(data_transformation_artifact.transformed_test_file_path))
+
+
+@pytest.mark.parametrize("feature_dtype", ["float64", "float32"])
+def test_chunked_transformation_matches_in_memory_transformation(tmp_path, feature_dtype):
+    data_ingestion_artifact = write_housing_files(tmp_path)
+    expected = transform(tmp_path, data_ingestion_artifact, run_name="in_memory", feature_dtype=feature_dtype)
+    # chunk size does not divide the row counts, so the last block is a short one
+    chunked = transform(tmp_path, data_ingestion_artifact, run_name="chunked", feature_dtype=feature_dtype,
+                        transform_chunk_size=64)
+
+    for expected_arr, chunked_arr in zip(expected, chunked):
+        assert expected_arr.dtype == np.dtype(feature_dtype)
+        assert chunked_arr.dtype == np.dtype(feature_dtype)
+        assert np.array_equal(chunked_arr, expected_arr)
+
+
+def test_incremental_transformation_is_stored_in_feature_dtype(tmp_path):
+    data_ingestion_artifact = write_housing_files(tmp_path)
+    train_arr, test_arr = transform(tmp_path, data_ingestion_artifact, run_name="incremental", feature_dtype="float32",
+                                    incremental_state_dir=str(tmp_path / "state"))
+    assert train_arr.dtype == np.float32 and test_arr.dtype == np.float32
+    assert train_arr.shape[0] == 230 and test_arr.shape[0] == 70
+
+
+def append_rows(file_path:str, row_count:int, seed:int) -> None:
+    housing_df = get_input_rows(row_count=row_count, seed=seed)
+    housing_df["median_house_value"] = housing_df["median_income"] * 40000
+    housing_df.to_csv(file_path, mode="a", header=False, index=False)
+
+
+def test_incremental_transformation_reads_and_appends_new_rows_only(tmp_path):
+    data_ingestion_artifact = write_housing_files(tmp_path)
+    state_dir = str(tmp_path / "state")
+    first_train_arr, first_test_arr = transform(tmp_path, data_ingestion_artifact, run_name="first", feature_dtype="float64",
+                                                incremental_state_dir=state_dir)
+
+    append_rows(data_ingestion_artifact.train_file_path, row_count=40, seed=3)
+    append_rows(data_ingestion_artifact.test_file_path, row_count=10, seed=4)
+    # rows transformed by the first run are not read again, a full read would fail on them
+    with open(data_ingestion_artifact.train_file_path, "r+") as train_file:
+        header_line = train_file.readline()
+        first_row = train_file.readline()
+        train_file.seek(len(header_line))
+        train_file.write("".join("x" if character.isdigit() else character for character in first_row))
+
+    train_arr, test_arr = transform(tmp_path, data_ingestion_artifact, run_name="second", feature_dtype="float64",
+                                    incremental_state_dir=state_dir)
+    assert train_arr.shape == (270, first_train_arr.shape[1]) and test_arr.shape == (80, first_test_arr.shape[1])
+    assert np.array_equal(train_arr[:230], first_train_arr)
+    assert np.array_equal(test_arr[:70], first_test_arr)
+
+    preprocessing_kernel = PreprocessingKernel.load(file_path=str(tmp_path / "second" / "kernel.bundle"))
+    new_test_df = pd.read_csv(data_ingestion_artifact.test_file_path).iloc[70:]
+    assert np.allclose(test_arr[70:, :-1], preprocessing_kernel.transform(new_test_df.drop(columns=["median_house_value"])))
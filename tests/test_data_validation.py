@@ -0,0 +1,46 @@
+import json
+
+import pandas as pd
+import pytest
+
+from housing.component.data_validation import DataValidation
+from housing.entity.config_entity import DataValidationConfig
+from housing.exception import HousingException
+from test_data_transformation import write_housing_files
+from test_preprocessing_kernel import SCHEMA_FILE_PATH
+
+
+def get_data_validation(tmp_path, data_ingestion_artifact) -> DataValidation:
+    validation_dir = tmp_path / "validation"
+    data_validation_config = DataValidationConfig(schema_file_path=SCHEMA_FILE_PATH,
+                                                  report_file_path=str(validation_dir / "report.json"),
+                                                  report_page_file_path=str(validation_dir / "report.html"),
+                                                  schema_report_file_path=str(validation_dir / "schema_report.json"),
+                                                  drift_backend="native",
+                                                  drift_sample_size=None)
+    return DataValidation(data_validation_config=data_validation_config, data_ingestion_artifact=data_ingestion_artifact)
+
+
+def test_valid_dataset_passes_schema_validation(tmp_path):
+    data_ingestion_artifact = write_housing_files(tmp_path)
+    assert get_data_validation(tmp_path, data_ingestion_artifact).initiate_schema_validation().is_validated
+
+
+def test_value_not_parsed_as_number_is_reported_as_dtype_violation(tmp_path):
+    data_ingestion_artifact = write_housing_files(tmp_path)
+    train_df = pd.read_csv(data_ingestion_artifact.train_file_path)
+    train_df["total_rooms"] = train_df["total_rooms"].astype(object)
+    train_df.loc[[3, 5], "total_rooms"] = "many"
+    train_df.to_csv(data_ingestion_artifact.train_file_path, index=False)
+
+    data_validation = get_data_validation(tmp_path, data_ingestion_artifact)
+    with pytest.raises(HousingException, match="total_rooms"):
+        data_validation.initiate_schema_validation()
+
+    with open(data_validation.data_validation_config.schema_report_file_path) as schema_report_file:
+        schema_report = json.load(schema_report_file)
+    column_report = schema_report["train"]["columns"]["total_rooms"]
+    assert column_report["dtype_violation_count"] == 2
+    assert not column_report["is_valid"]
+    assert schema_report["train"]["columns"]["households"]["is_valid"]
+    assert schema_report["test"]["is_valid"]
@@ -0,0 +1,51 @@
+import numpy as np
+
+from housing.util import dataset_registry as dataset_registry_module
+from housing.util.dataset_registry import DatasetRegistry
+from housing.util.util import load_data, read_dataframe
+from test_data_transformation import write_housing_files
+from test_preprocessing_kernel import SCHEMA_FILE_PATH
+
+INPUT_COLUMNS = ["longitude", "latitude", "housing_median_age", "total_rooms", "total_bedrooms", "population",
+                 "households", "median_income", "ocean_proximity"]
+
+
+def count_reads(monkeypatch) -> list:
+    read_file_paths = []
+
+    def counting_read_dataframe(file_path, columns=None, dtype=None):
+        read_file_paths.append(file_path)
+        return read_dataframe(file_path=file_path, columns=columns, dtype=dtype)
+
+    monkeypatch.setattr(dataset_registry_module, "read_dataframe", counting_read_dataframe)
+    return read_file_paths
+
+
+def test_registry_keys_datasets_by_columns_and_dtypes(tmp_path, monkeypatch):
+    file_path = write_housing_files(tmp_path).test_file_path
+    read_file_paths = count_reads(monkeypatch)
+    dataset_registry = DatasetRegistry()
+
+    float64_df = dataset_registry.get_dataframe(file_path=file_path, dtype={"median_income": "float64"})
+    assert dataset_registry.get_dataframe(file_path=file_path, dtype={"median_income": "float64"}) is float64_df
+    float32_df = dataset_registry.get_dataframe(file_path=file_path, dtype={"median_income": "float32"})
+    assert float32_df["median_income"].dtype == np.float32
+    assert float64_df["median_income"].dtype == np.float64
+    assert len(read_file_paths) == 2
+
+    # columns of a dataset parsed with every column are taken from it
+    income_df = dataset_registry.get_dataframe(file_path=file_path, columns=["median_income", "latitude"],
+                                               dtype={"median_income": "float64"})
+    assert list(income_df.columns) == ["median_income", "latitude"]
+    assert len(read_file_paths) == 2
+
+
+def test_load_data_reads_requested_schema_columns(tmp_path, monkeypatch):
+    file_path = write_housing_files(tmp_path).test_file_path
+    read_file_paths = count_reads(monkeypatch)
+
+    input_df = load_data(file_path=file_path, schema_file_path=SCHEMA_FILE_PATH, dataset_registry=DatasetRegistry(),
+                         columns=list(reversed(INPUT_COLUMNS)))
+    assert list(input_df.columns) == list(reversed(INPUT_COLUMNS))
+    assert len(read_file_paths) == 1
+    assert list(load_data(file_path=file_path, schema_file_path=SCHEMA_FILE_PATH).columns) == INPUT_COLUMNS + ["median_house_value"]
@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+import pytest
+
+from housing.exception import HousingException
+from housing.entity.housing_predictor import HousingData
+
+SCHEMA_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "schema.yaml")
+
+RECORD = {"longitude": -122.23, "latitude": 37.88, "housing_median_age": 41.0, "total_rooms": 880.0,
+          "total_bedrooms": 129.0, "population": 322.0, "households": 126.0, "median_income": 8.3252,
+          "ocean_proximity": "NEAR BAY"}
+
+
+def test_records_within_schema_domain_are_accepted():
+    housing_data = HousingData(schema_file_path=SCHEMA_FILE_PATH)
+    dataframe = housing_data.get_data_frame_from_records([RECORD, {**RECORD, "ocean_proximity": np.nan}])
+    assert list(dataframe.columns) == housing_data.input_columns
+    assert len(dataframe) == 2
+
+
+def test_unknown_category_is_rejected_with_plain_message():
+    housing_data = HousingData(schema_file_path=SCHEMA_FILE_PATH)
+    with pytest.raises(HousingException) as exc_info:
+        housing_data.get_data_frame_from_records({**RECORD, "ocean_proximity": "MARS"})
+
+    error = exc_info.value
+    while isinstance(error, HousingException):
+        error = error.__cause__
+    assert isinstance(error, ValueError)
+    assert "MARS" in str(error) and "ocean_proximity" in str(error)
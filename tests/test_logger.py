@@ -0,0 +1,67 @@
+import glob
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOGGER_SCRIPT = """
+import multiprocessing
+import os
+import sys
+
+if "--portable" in sys.argv:
+    # interpreters without fork hooks (windows) and without multiprocessing.parent_process (3.7)
+    del os.register_at_fork
+    if hasattr(multiprocessing, "parent_process"):
+        del multiprocessing.parent_process
+
+from housing.logger import logging, set_run_id, LogContext
+
+
+def log_in_worker(run_id):
+    set_run_id(run_id)
+    logging.info("worker record")
+
+
+if __name__ == "__main__":
+    set_run_id("test-run")
+    with LogContext(stage="smoke"):
+        logging.info("parent record %s", 1)
+    worker = multiprocessing.get_context("spawn").Process(target=log_in_worker, args=("test-run",))
+    worker.start()
+    worker.join()
+    sys.exit(worker.exitcode)
+"""
+
+
+def run_logger_script(tmp_path, *args) -> list:
+    script_file_path = tmp_path / "log_script.py"
+    script_file_path.write_text(LOGGER_SCRIPT)
+    result = subprocess.run([sys.executable, str(script_file_path), *args], cwd=tmp_path, capture_output=True,
+                            text=True, env={**os.environ, "PYTHONPATH": REPO_DIR}, timeout=120)
+    assert result.returncode == 0, result.stderr
+
+    records = []
+    for log_file_path in glob.glob(str(tmp_path / "logs" / "*.log")):
+        with open(log_file_path) as log_file:
+            records.extend(json.loads(line) for line in log_file if line.strip())
+    return records
+
+
+def check_records(records:list) -> None:
+    records_by_message = {record["message"]: record for record in records}
+    assert records_by_message["parent record 1"]["stage"] == "smoke"
+    assert records_by_message["parent record 1"]["run_id"] == "test-run"
+    # worker exits through multiprocessing, its queued record is still written
+    assert records_by_message["worker record"]["run_id"] == "test-run"
+    assert records_by_message["worker record"]["pid"] != records_by_message["parent record 1"]["pid"]
+
+
+def test_parent_and_worker_records_are_written(tmp_path):
+    check_records(run_logger_script(tmp_path))
+
+
+def test_logger_works_without_fork_hooks_and_parent_process(tmp_path):
+    check_records(run_logger_script(tmp_path, "--portable"))
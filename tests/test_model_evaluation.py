@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from housing.component.model_evaluation import ModelEvaluation
+from housing.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact
+from housing.entity.config_entity import ModelEvaluationConfig
+from housing.util.bootstrap import get_bootstrap_count_blocks, get_bootstrap_regression_metrics
+from housing.util.util import save_numpy_array_data, save_object
+
+
+def get_model_evaluation(tmp_path, deployed_prediction_error:float) -> ModelEvaluation:
+    rng = np.random.default_rng(5)
+    x_test = rng.normal(size=(400, 3))
+    y_test = x_test @ np.array([3.0, -2.0, 1.0]) + rng.normal(scale=1.0, size=len(x_test))
+    test_file_path = str(tmp_path / "test.npy")
+    save_numpy_array_data(file_path=test_file_path, array=np.c_[x_test, y_test])
+    trained_model_file_path = str(tmp_path / "model.pkl")
+    save_object(file_path=trained_model_file_path, obj=LinearRegression().fit(x_test, y_test))
+
+    model_evaluation_config = ModelEvaluationConfig(model_evaluation_file_path=str(tmp_path / "model_evaluation.yaml"),
+                                                    time_stamp="run-1",
+                                                    export_dir_path=str(tmp_path / "saved_models"),
+                                                    model_file_name="model.pkl",
+                                                    preprocessed_object_file_name="preprocessed.pkl",
+                                                    preprocessing_kernel_file_name="preprocessing_kernel.bundle",
+                                                    bootstrap_sample_count=1000,
+                                                    confidence_level=0.95,
+                                                    random_state=42)
+    data_transformation_artifact = DataTransformationArtifact(is_transformed=True, message="",
+                                                              transformed_train_file_path=test_file_path,
+                                                              transformed_test_file_path=test_file_path,
+                                                              preprocessed_object_file_path=None,
+                                                              preprocessing_kernel_file_path=None)
+    model_trainer_artifact = ModelTrainerArtifact(is_trained=True, message="", trained_model_file_path=trained_model_file_path,
+                                                  model_name="LinearRegression", train_rmse=None, test_rmse=None,
+                                                  train_accuracy=None, test_accuracy=None)
+    model_evaluation = ModelEvaluation(model_evaluation_config=model_evaluation_config,
+                                       data_ingestion_artifact=None,
+                                       data_validation_artifact=None,
+                                       data_transformation_artifact=data_transformation_artifact,
+                                       model_trainer_artifact=model_trainer_artifact)
+    if deployed_prediction_error is None:
+        model_evaluation.get_deployed_model_dir = lambda: None
+    else:
+        # deployed model predicts target with errors of the given size
+        deployed_prediction = y_test + np.random.default_rng(6).normal(scale=deployed_prediction_error, size=len(y_test))
+        model_evaluation.get_deployed_model_dir = lambda: str(tmp_path / "saved_models" / "deployed")
+        model_evaluation.get_deployed_model_prediction = lambda deployed_model_dir: deployed_prediction
+    return model_evaluation
+
+
+@pytest.mark.parametrize("deployed_prediction_error, is_model_accepted", [
+    (None, True),   # nothing deployed
+    (3.0, True),    # deployed model is clearly worse
+    (1.0, False),   # as good as trained model, difference is not significant
+    (0.5, False),   # deployed model is better
+])
+def test_trained_model_is_accepted_only_when_significantly_better(tmp_path, deployed_prediction_error, is_model_accepted):
+    model_evaluation_artifact = get_model_evaluation(tmp_path, deployed_prediction_error).initiate_model_evaluation()
+    assert model_evaluation_artifact.is_model_accepted is is_model_accepted
+
+
+def test_bootstrap_metrics_match_resampling_loop():
+    rng = np.random.default_rng(1)
+    y_true = rng.normal(loc=200000, scale=50000, size=50)
+    y_pred_list = [y_true + rng.normal(scale=10000, size=50), y_true + rng.normal(scale=20000, size=50)]
+    bootstrap_metrics = get_bootstrap_regression_metrics(y_true=y_true, y_pred_list=y_pred_list, sample_count=30, random_state=3)
+
+    counts = np.vstack(list(get_bootstrap_count_blocks(row_count=50, sample_count=30, random_state=3)))
+    for sample_number, sample_counts in enumerate(counts):
+        # resample drawn explicitly, both models are scored on the same rows
+        row_index = np.repeat(np.arange(50), sample_counts.astype(int))
+        y_sample = y_true[row_index]
+        for model_number, y_pred in enumerate(y_pred_list):
+            squared_error = (y_sample - y_pred[row_index]) ** 2
+            assert np.isclose(bootstrap_metrics["rmse"][model_number, sample_number], np.sqrt(squared_error.mean()))
+            assert np.isclose(bootstrap_metrics["r2"][model_number, sample_number],
+                              1.0 - squared_error.sum() / ((y_sample - y_sample.mean()) ** 2).sum())
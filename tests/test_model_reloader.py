@@ -0,0 +1,54 @@
+import os
+import shutil
+import subprocess
+import sys
+
+from housing.util.model_reloader import ModelReloader
+from housing.util.model_registry import ModelRegistry
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def publish_corrupt_model(export_dir_path:str) -> str:
+    bundle_dir = os.path.join(os.path.dirname(export_dir_path), "bundle")
+    os.makedirs(bundle_dir)
+    file_paths = []
+    for file_name in ("model.pkl", "preprocessed.pkl", "preprocessing_kernel.bundle"):
+        file_path = os.path.join(bundle_dir, file_name)
+        with open(file_path, "wb") as bundle_file:
+            bundle_file.write(b"not a model")
+        file_paths.append(file_path)
+    return ModelRegistry(export_dir_path=export_dir_path).publish_model(version="2000-01-01-00-00-00", file_paths=file_paths)
+
+
+def test_reloader_starts_without_model_when_current_version_is_broken(tmp_path):
+    model_dir = publish_corrupt_model(export_dir_path=str(tmp_path / "saved_models"))
+
+    def load_predictor(model_dir):
+        raise ValueError("corrupt bundle")
+
+    model_reloader = ModelReloader(get_current_model_dir=lambda: model_dir, load_predictor=load_predictor,
+                                   poll_interval_seconds=60)
+    try:
+        assert model_reloader.predictor is None
+        assert model_reloader.failed_model_dir == model_dir
+        # broken version is not loaded again
+        assert model_reloader.reload() is False
+    finally:
+        model_reloader.close()
+
+
+def test_app_imports_with_corrupt_current_model(tmp_path):
+    shutil.copytree(os.path.join(REPO_DIR, "config"), tmp_path / "config")
+    publish_corrupt_model(export_dir_path=str(tmp_path / "saved_models"))
+
+    # app reads config relative to the working directory, so it is imported in a process started there
+    check_script = "\n".join([
+        "import app",
+        "assert app.model_reloader.predictor is None",
+        "response = app.app.test_client().post('/predict', json={})",
+        "assert response.status_code == 503, response.status_code",
+    ])
+    result = subprocess.run([sys.executable, "-c", check_script], cwd=tmp_path, capture_output=True, text=True,
+                            env={**os.environ, "PYTHONPATH": REPO_DIR}, timeout=300)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,112 @@
+import json
+import os
+import sys
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from housing.component import partition_training
+from housing.component.partition_training import PartitionTraining
+from housing.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
+from housing.entity.config_entity import DataTransformationConfig, ModelTrainerConfig, PartitionTrainingConfig
+
+SCHEMA_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "schema.yaml")
+
+# rows per ocean_proximity value, ISLAND is below min_partition_rows
+PARTITION_ROW_COUNTS = {"INLAND": 300, "NEAR BAY": 240, "ISLAND": 20}
+
+
+def get_housing_rows(seed:int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ocean_proximity = np.repeat(list(PARTITION_ROW_COUNTS.keys()), list(PARTITION_ROW_COUNTS.values()))
+    row_count = len(ocean_proximity)
+    median_income = rng.uniform(0.5, 15.0, row_count)
+    return pd.DataFrame({
+        "longitude": rng.uniform(-124.3, -114.3, row_count),
+        "latitude": rng.uniform(32.5, 42.0, row_count),
+        "housing_median_age": rng.integers(1, 52, row_count).astype(float),
+        "total_rooms": rng.integers(100, 40000, row_count).astype(float),
+        "total_bedrooms": rng.integers(10, 6500, row_count).astype(float),
+        "population": rng.integers(3, 35000, row_count).astype(float),
+        "households": rng.integers(1, 6000, row_count).astype(float),
+        "median_income": median_income,
+        "median_house_value": median_income * 40000 + rng.normal(0, 5000, row_count),
+        "ocean_proximity": ocean_proximity,
+    })
+
+
+def get_partition_training(tmp_path) -> PartitionTraining:
+    data_file_paths = []
+    for split_name, seed in (("train", 1), ("test", 2)):
+        file_path = tmp_path / "ingested" / split_name / "housing.csv"
+        file_path.parent.mkdir(parents=True)
+        get_housing_rows(seed=seed).to_csv(file_path, index=False)
+        data_file_paths.append(str(file_path))
+
+    model_config_file_path = tmp_path / "model.yaml"
+    model_config_file_path.write_text(yaml.safe_dump({
+        "search": {"n_jobs": 1, "cv": 2, "min_resources": 50, "factor": 2, "random_state": 42},
+        "model_selection": {"module_0": {"class": "LinearRegression", "module": "sklearn.linear_model",
+                                         "params": {"fit_intercept": True}}},
+    }))
+
+    global_dir = tmp_path / "global"
+    data_transformation_config = DataTransformationConfig(add_bedroom_per_room=True, feature_dtype="float64",
+                                                          transform_chunk_size=None, incremental_state_dir=None,
+                                                          median_sketch_size=100000,
+                                                          transformed_train_dir=str(global_dir / "train"),
+                                                          transformed_test_dir=str(global_dir / "test"),
+                                                          preprocessed_object_file_path=str(global_dir / "preprocessed.pkl"),
+                                                          preprocessing_kernel_file_path=str(global_dir / "preprocessing_kernel.bundle"))
+    model_trainer_config = ModelTrainerConfig(trained_model_file_path=str(global_dir / "model.pkl"),
+                                              base_accuracy=-1e9,
+                                              model_config_file_path=str(model_config_file_path),
+                                              search_n_jobs=None)
+    partition_training_config = PartitionTrainingConfig(partition_key="ocean_proximity",
+                                                        geo_tile_degrees=2.0,
+                                                        max_workers=2,
+                                                        min_partition_rows=100,
+                                                        partition_data_dir=str(tmp_path / "partition_data"),
+                                                        partitioned_model_dir=str(tmp_path / "partitions"),
+                                                        partition_manifest_file_path=str(tmp_path / "partitions" / "partitions.json"))
+    return PartitionTraining(partition_training_config=partition_training_config,
+                             data_transformation_config=data_transformation_config,
+                             model_trainer_config=model_trainer_config,
+                             data_ingestion_artifact=DataIngestionArtifact(train_file_path=data_file_paths[0],
+                                                                           test_file_path=data_file_paths[1],
+                                                                           is_ingested=True, message=""),
+                             data_validation_artifact=DataValidationArtifact(schema_file_path=SCHEMA_FILE_PATH,
+                                                                             schema_report_file_path=None,
+                                                                             is_validated=True, message=""))
+
+
+class LegacyProcessPoolExecutor(ProcessPoolExecutor):
+    """
+    ProcessPoolExecutor of python before 3.11 which has no max_tasks_per_child
+    """
+
+    def __init__(self, max_workers=None, mp_context=None, initializer=None, initargs=()):
+        super().__init__(max_workers=max_workers, mp_context=mp_context, initializer=initializer, initargs=initargs)
+
+
+@pytest.mark.parametrize("is_legacy_python", [False, True])
+def test_partitions_are_trained_and_small_ones_skipped(tmp_path, monkeypatch, is_legacy_python):
+    if is_legacy_python:
+        monkeypatch.setattr(partition_training, "sys", types.SimpleNamespace(version_info=(3, 10, 0), exc_info=sys.exc_info))
+        monkeypatch.setattr(partition_training, "ProcessPoolExecutor", LegacyProcessPoolExecutor)
+    partition_training_artifact = get_partition_training(tmp_path=tmp_path).initiate_partition_training()
+
+    assert partition_training_artifact.is_trained
+    assert partition_training_artifact.partition_count == 2
+    with open(partition_training_artifact.partition_manifest_file_path) as manifest_file:
+        partition_manifest = json.load(manifest_file)
+    assert partition_manifest["partition_key"] == "ocean_proximity"
+    assert sorted(partition_manifest["partitions"]) == ["INLAND", "NEAR BAY"]
+    assert list(partition_manifest["skipped_partitions"]) == ["ISLAND"]
+    for partition_info in partition_manifest["partitions"].values():
+        partition_model_dir = os.path.join(partition_training_artifact.partitioned_model_dir, partition_info["dir_name"])
+        assert sorted(os.listdir(partition_model_dir)) == ["model.pkl", "preprocessed.pkl", "preprocessing_kernel.bundle"]
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from housing.component.data_transformation import DataTransformation
+from housing.entity.artifact_entity import DataValidationArtifact
+from housing.entity.config_entity import DataTransformationConfig
+from housing.util.preprocessing_kernel import PreprocessingKernel
+
+SCHEMA_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "schema.yaml")
+
+CATEGORIES = ["<1H OCEAN", "INLAND", "ISLAND", "NEAR BAY", "NEAR OCEAN"]
+
+
+def get_input_rows(row_count:int, seed:int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "longitude": rng.uniform(-124.3, -114.3, row_count),
+        "latitude": rng.uniform(32.5, 42.0, row_count),
+        "housing_median_age": rng.integers(1, 52, row_count).astype(float),
+        "total_rooms": rng.integers(2, 40000, row_count).astype(float),
+        "total_bedrooms": rng.integers(1, 6500, row_count).astype(float),
+        "population": rng.integers(3, 35000, row_count).astype(float),
+        "households": rng.integers(1, 6000, row_count).astype(float),
+        "median_income": rng.uniform(0.5, 15.0, row_count),
+        "ocean_proximity": rng.choice(CATEGORIES, row_count).astype(object),
+    })
+
+
+def get_parity_rows() -> pd.DataFrame:
+    rows = get_input_rows(row_count=len(CATEGORIES) + 4, seed=7)
+    # every category once, then a missing category
+    rows.loc[:len(CATEGORIES) - 1, "ocean_proximity"] = CATEGORIES
+    rows.loc[len(CATEGORIES), "ocean_proximity"] = np.nan
+    # missing numbers are imputed with training medians
+    rows.loc[len(CATEGORIES) + 1, ["total_bedrooms", "median_income"]] = np.nan
+    # zero denominators give ratio features of 0
+    rows.loc[len(CATEGORIES) + 2, "households"] = 0.0
+    rows.loc[len(CATEGORIES) + 3, ["total_rooms", "households"]] = 0.0
+    return rows
+
+
+def get_fitted_preprocessing_obj(tmp_path, feature_dtype:str, add_bedroom_per_room:bool):
+    data_transformation_config = DataTransformationConfig(add_bedroom_per_room=add_bedroom_per_room,
+                                                          feature_dtype=feature_dtype,
+                                                          transform_chunk_size=None,
+                                                          incremental_state_dir=None,
+                                                          median_sketch_size=100000,
+                                                          transformed_train_dir=str(tmp_path),
+                                                          transformed_test_dir=str(tmp_path),
+                                                          preprocessed_object_file_path=str(tmp_path / "preprocessed.pkl"),
+                                                          preprocessing_kernel_file_path=str(tmp_path / "kernel.bundle"))
+    data_validation_artifact = DataValidationArtifact(schema_file_path=SCHEMA_FILE_PATH, schema_report_file_path=None,
+                                                      is_validated=True, message="")
+    data_transformation = DataTransformation(data_transformation_config=data_transformation_config,
+                                             data_ingestion_artifact=None,
+                                             data_validation_artifact=data_validation_artifact)
+    train_rows = get_input_rows(row_count=500, seed=42)
+    train_rows.loc[::17, "total_bedrooms"] = np.nan
+    preprocessing_obj = data_transformation.get_data_transformer_object()
+    preprocessing_obj.fit(train_rows)
+    return preprocessing_obj
+
+
+@pytest.mark.parametrize("feature_dtype", ["float64", "float32"])
+@pytest.mark.parametrize("add_bedroom_per_room", [True, False])
+def test_kernel_output_is_identical_to_column_transformer(tmp_path, feature_dtype, add_bedroom_per_room):
+    preprocessing_obj = get_fitted_preprocessing_obj(tmp_path=tmp_path, feature_dtype=feature_dtype,
+                                                     add_bedroom_per_room=add_bedroom_per_room)
+    preprocessing_kernel = PreprocessingKernel.from_column_transformer(preprocessing_obj=preprocessing_obj)
+    parity_rows = get_parity_rows()
+
+    expected = preprocessing_obj.transform(parity_rows)
+    assert np.array_equal(preprocessing_kernel.transform(parity_rows), expected)
+
+    # saved kernel is what serving loads
+    kernel_file_path = str(tmp_path / "kernel.bundle")
+    preprocessing_kernel.save(file_path=kernel_file_path)
+    assert np.array_equal(PreprocessingKernel.load(file_path=kernel_file_path).transform(parity_rows), expected)
+
+
+def test_kernel_rejects_unknown_category(tmp_path):
+    preprocessing_obj = get_fitted_preprocessing_obj(tmp_path=tmp_path, feature_dtype="float64", add_bedroom_per_room=True)
+    preprocessing_kernel = PreprocessingKernel.from_column_transformer(preprocessing_obj=preprocessing_obj)
+    parity_rows = get_parity_rows()
+    parity_rows.loc[0, "ocean_proximity"] = "MARS"
+    with pytest.raises(Exception, match="MARS"):
+        preprocessing_kernel.transform(parity_rows)
@@ -0,0 +1,23 @@
+import json
+import sys
+
+from housing.util import run_profiler
+from housing.util.run_profiler import RunProfiler, profile_stage, profile_step
+
+
+def test_profile_is_saved_without_procfs_and_resource_module(tmp_path, monkeypatch):
+    # windows has neither /proc nor the resource module
+    monkeypatch.setattr(run_profiler, "read_proc_status_kb", lambda field_name: None)
+    monkeypatch.setitem(sys.modules, "resource", None)
+    assert run_profiler.get_peak_rss_kb() is None
+
+    with RunProfiler(profile_dir=str(tmp_path)) as profiler:
+        with profile_stage("data_transformation"):
+            with profile_step("fit") as step:
+                step.add(rows=10)
+    with open(profiler.save()) as profile_file:
+        profile = json.load(profile_file)
+
+    stage = profile["stages"][0]
+    assert stage["peak_rss_mb"] is None
+    assert stage["steps"][0]["rows"] == 10
@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import yaml
+
+from housing.config.configuration import Configuration
+from housing.entity.artifact_entity import DataValidationArtifact
+from housing.pipeline.pipeline import Pipeline
+from housing.util import preprocessing_kernel
+from test_data_transformation import write_housing_files
+from test_preprocessing_kernel import SCHEMA_FILE_PATH
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_pipeline(tmp_path, time_stamp:str) -> Pipeline:
+    config_file_path = tmp_path / "config.yaml"
+    if not config_file_path.exists():
+        with open(os.path.join(REPO_DIR, "config", "config.yaml")) as config_file:
+            config_info = yaml.safe_load(config_file)
+        config_info["training_pipeline_config"].update(artifact_dir=str(tmp_path / "artifact"), run_profile=False)
+        config_file_path.write_text(yaml.safe_dump(config_info))
+    return Pipeline(config=Configuration(config_file_path=str(config_file_path), current_time_stamp=time_stamp))
+
+
+def transform(tmp_path, time_stamp:str, data_ingestion_artifact):
+    data_validation_artifact = DataValidationArtifact(schema_file_path=SCHEMA_FILE_PATH, schema_report_file_path=None,
+                                                      is_validated=True, message="")
+    return get_pipeline(tmp_path, time_stamp=time_stamp).start_data_transformation(
+        data_ingstion_artifact=data_ingestion_artifact, data_validation_artifact=data_validation_artifact)
+
+
+def is_run_by(data_transformation_artifact, time_stamp:str) -> bool:
+    return time_stamp in data_transformation_artifact.transformed_train_file_path
+
+
+def test_unchanged_stage_is_reused_and_changed_input_runs_again(tmp_path):
+    data_ingestion_artifact = write_housing_files(tmp_path)
+    assert is_run_by(transform(tmp_path, "run-1", data_ingestion_artifact), "run-1")
+    assert is_run_by(transform(tmp_path, "run-2", data_ingestion_artifact), "run-1")
+
+    with open(data_ingestion_artifact.train_file_path, "a") as train_file:
+        train_file.write("-122.0,37.0,30.0,1000.0,200.0,500.0,150.0,5.0,<1H OCEAN,200000.0\n")
+    assert is_run_by(transform(tmp_path, "run-3", data_ingestion_artifact), "run-3")
+
+    # outputs of the cached run are gone, the entry is stale
+    shutil.rmtree(tmp_path / "artifact" / "data_transformation" / "run-3")
+    assert is_run_by(transform(tmp_path, "run-4", data_ingestion_artifact), "run-4")
+
+
+def test_change_of_helper_module_invalidates_cached_stage(tmp_path, monkeypatch):
+    data_ingestion_artifact = write_housing_files(tmp_path)
+    kernel_file_path = tmp_path / "preprocessing_kernel.py"
+    shutil.copy(preprocessing_kernel.__file__, kernel_file_path)
+    monkeypatch.setattr(preprocessing_kernel, "__file__", str(kernel_file_path))
+
+    assert is_run_by(transform(tmp_path, "run-1", data_ingestion_artifact), "run-1")
+    assert is_run_by(transform(tmp_path, "run-2", data_ingestion_artifact), "run-1")
+
+    with open(kernel_file_path, "a") as kernel_file:
+        kernel_file.write("\n# changed\n")
+    assert is_run_by(transform(tmp_path, "run-3", data_ingestion_artifact), "run-3")
@@ -0,0 +1,71 @@
+import json
+from collections import namedtuple
+
+import pytest
+
+from housing.exception import HousingException
+from housing.pipeline.run_state import PipelineRunState
+from housing.pipeline.stage_scheduler import StageScheduler, PipelineStage
+
+StageArtifact = namedtuple("StageArtifact", ["output_file_path"])
+
+
+class StageRunner:
+    """
+    Stages writing one output file each, failing stages raise until they are fixed
+    """
+
+    def __init__(self, output_dir, failing_stages:set) -> None:
+        self.output_dir = output_dir
+        self.failing_stages = set(failing_stages)
+        self.run_stages = []
+
+    def get_stage(self, name:str, dependencies:list) -> PipelineStage:
+        def run_stage(dependency_artifacts):
+            self.run_stages.append(name)
+            if name in self.failing_stages:
+                raise ValueError(f"{name} failed")
+            output_file_path = self.output_dir / f"{name}.txt"
+            output_file_path.write_text(",".join(sorted(dependency_artifacts)))
+            return StageArtifact(output_file_path=str(output_file_path))
+        return PipelineStage(name=name, dependencies=dependencies, artifact_class=StageArtifact, run_stage=run_stage)
+
+    def run(self, run_state_file_path:str, resume:bool) -> dict:
+        stages = [self.get_stage("ingestion", []),
+                  self.get_stage("drift", ["ingestion"]),
+                  self.get_stage("transformation", ["ingestion"]),
+                  self.get_stage("trainer", ["transformation"])]
+        run_state = PipelineRunState(run_state_file_path=run_state_file_path, time_stamp="run-1", resume=resume)
+        return StageScheduler(stages=stages, max_workers=2, run_state=run_state).run()
+
+
+def test_resumed_run_reuses_finished_stages_and_runs_failed_ones_again(tmp_path):
+    run_state_file_path = str(tmp_path / "run_state.json")
+    stage_runner = StageRunner(output_dir=tmp_path, failing_stages={"transformation"})
+    with pytest.raises(HousingException, match="transformation failed"):
+        stage_runner.run(run_state_file_path=run_state_file_path, resume=False)
+    assert "trainer" not in stage_runner.run_stages
+
+    with open(run_state_file_path) as run_state_file:
+        run_state = json.load(run_state_file)
+    assert run_state["status"] == "failed"
+    assert run_state["stages"]["transformation"]["status"] == "failed"
+    assert run_state["stages"]["ingestion"]["status"] == "completed"
+
+    stage_runner = StageRunner(output_dir=tmp_path, failing_stages=set())
+    artifacts = stage_runner.run(run_state_file_path=run_state_file_path, resume=True)
+    assert sorted(stage_runner.run_stages) == ["trainer", "transformation"]
+    assert set(artifacts) == {"ingestion", "drift", "transformation", "trainer"}
+    with open(run_state_file_path) as run_state_file:
+        assert json.load(run_state_file)["status"] == "completed"
+
+
+def test_finished_stage_with_missing_output_runs_again(tmp_path):
+    run_state_file_path = str(tmp_path / "run_state.json")
+    with pytest.raises(HousingException):
+        StageRunner(output_dir=tmp_path, failing_stages={"trainer"}).run(run_state_file_path=run_state_file_path, resume=False)
+    (tmp_path / "transformation.txt").unlink()
+
+    stage_runner = StageRunner(output_dir=tmp_path, failing_stages=set())
+    stage_runner.run(run_state_file_path=run_state_file_path, resume=True)
+    assert sorted(stage_runner.run_stages) == ["trainer", "transformation"]